@@ -0,0 +1,277 @@
+"""
+多进程采集：每条总线一个工作进程，CRC 校验、帧解析和调度各占一个 CPU 核，不再共用主进程的 GIL
+
+工作进程把采样写入各自的共享内存环形缓冲区（sample_ring.SampleRing），主进程的收集线程定期整批取出，
+交给 SampleHub 写入记录器并推送给流协议客户端（界面、脚本）；日志、事件和命令应答数据量小，经队列传递。
+工作进程中的驱动与守护进程完全相同（BusAgent 复用 AcquisitionDaemon 的驱动启动和命令处理）。
+
+    python daemon.py --processes --bus pump=/dev/ttyUSB0 --bus pump=/dev/ttyUSB1 --bus hotplate=/dev/ttyUSB2
+"""
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from daemon import AcquisitionDaemon, SampleHub, COMMAND_TIMEOUT
+from serial_manager import ROLE_PUMP, ROLE_HOTPLATE, ROLE_SLIDE
+from sample_ring import SampleRing, DEFAULT_CAPACITY
+
+COLLECT_INTERVAL = 0.05  # 主进程取出采样的间隔（秒）
+STOP_TIMEOUT = 3.0  # 等待工作进程退出的时间（秒），超时后强制结束
+
+
+# ---- 工作进程 ----
+
+class RelayHub(SampleHub):
+    """
+    工作进程中的采样出口：采样写入共享环形缓冲区，广播事件经队列交给主进程
+    """
+    def __init__(self, ring, events, name, role):
+        super().__init__(ring)
+        self.events = events
+        self.name = name
+        # 同一角色有多条总线时，设备名以总线名开头（pump2/01），避免与第一条总线的设备混淆
+        self.rename = (role + "/", name + "/") if name != role else None
+        # 环形缓冲区只允许单个写入方，而驱动线程和串口 I/O 线程（写入应答回调）都会记录采样
+        self.ring_lock = threading.Lock()
+
+    def record(self, device, channel, value, timestamp=None):
+        if self.rename is not None and device.startswith(self.rename[0]):
+            device = self.rename[1] + device[len(self.rename[0]):]
+        with self.ring_lock:
+            self.recorder.record(device, channel, value, timestamp)
+
+    def broadcast(self, message):
+        self.events.put(("event", self.name, message))
+
+
+class BusAgent(AcquisitionDaemon):
+    """
+    工作进程中的单条总线：驱动和命令与守护进程相同，日志和命令应答发回主进程
+    """
+    def __init__(self, name, role, serial_manager, ring, events, pump_range=(1, 0x10),
+                 hotplate_addresses=None, slide_address=0x01, hotplate_range=(1, 0x10)):
+        super().__init__(serial_manager, None, pump_range, hotplate_addresses, slide_address, hotplate_range)
+        self.name = name
+        self.events = events
+        self.hub = RelayHub(ring, events, name, role)
+
+    def log(self, text):
+        self.events.put(("log", self.name, text))
+
+    def command_loop(self, commands, stopping):
+        """
+        执行主进程转发的命令；收到 None 时结束
+        """
+        while True:
+            message = commands.get()
+            if message is None:
+                stopping.set()
+                return
+            self.events.put(("reply", self.name, self.execute(message)))
+
+
+def run_bus(name, role, port, baudrate, options, ring, commands, events):
+    """
+    工作进程入口：打开一条总线，运行对应的驱动，直到主进程发出停止命令
+    """
+    from PyQt5.QtCore import QCoreApplication, QTimer
+    from serial_manager import SerialManager
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由主进程统一处理
+    app = QCoreApplication([name])
+    serial_manager = SerialManager()
+    try:
+        connected = serial_manager.connect(port, baudrate, name=role)
+    except Exception as e:
+        events.put(("failed", name, f"无法连接到 {port}: {e}"))
+        return
+    if not connected:
+        events.put(("failed", name, f"无法连接到 {port}"))
+        return
+
+    agent = BusAgent(name, role, serial_manager, ring, events, **options)
+    agent.start_drivers()
+    stopping = threading.Event()
+    threading.Thread(target=agent.command_loop, args=(commands, stopping), daemon=True).start()
+    timer = QTimer()
+    timer.timeout.connect(lambda: stopping.is_set() and app.quit())
+    timer.start(100)
+    events.put(("started", name, os.getpid()))
+
+    app.exec_()
+    agent.close()
+    ring.close()
+
+
+# ---- 主进程 ----
+
+class BusProcess:
+    """
+    主进程中代表一个工作进程：环形缓冲区、命令队列和进程对象
+    """
+    def __init__(self, context, name, role, port, baudrate, options, events, capacity=DEFAULT_CAPACITY):
+        self.name = name
+        self.role = role
+        self.port = port
+        self.ring = SampleRing(capacity=capacity)
+        self.commands = context.Queue()
+        self.process = context.Process(target=run_bus, name=f"bus-{name}", daemon=True,
+                                       args=(name, role, port, baudrate, options, self.ring, self.commands, events))
+
+    def stop(self):
+        if self.process.is_alive():
+            self.commands.put(None)
+            self.process.join(STOP_TIMEOUT)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+
+
+class ProcessAcquisitionDaemon(AcquisitionDaemon):
+    """
+    多进程模式的守护进程：对客户端的接口与 AcquisitionDaemon 相同，命令按角色（或消息中的 bus）转发给工作进程
+    """
+    def __init__(self, buses, baudrate=9600, recorder=None, pump_range=(1, 0x10), hotplate_addresses=None,
+                 slide_address=0x01, hotplate_range=(1, 0x10), capacity=DEFAULT_CAPACITY):
+        """
+        :param buses: [(总线名, 角色, 串口), ...]
+        """
+        super().__init__(None, recorder, pump_range, hotplate_addresses, slide_address, hotplate_range)
+        # spawn：子进程不继承主进程的 Qt 对象、串口和线程
+        context = multiprocessing.get_context("spawn")
+        self.events = context.Queue()
+        options = {"pump_range": tuple(pump_range), "hotplate_addresses": hotplate_addresses,
+                   "slide_address": slide_address, "hotplate_range": tuple(hotplate_range)}
+        self.workers = {name: BusProcess(context, name, role, port, baudrate, options, self.events, capacity)
+                        for name, role, port in buses}
+        self.replies = {}  # 命令 id -> Future
+        self.lock = threading.Lock()  # 保护 replies
+        self.ids = itertools.count(1)
+        self.running = True
+        self.collector = None
+        self.event_reader = None
+
+    def start_drivers(self):
+        for worker in self.workers.values():
+            worker.process.start()
+        self.event_reader = threading.Thread(target=self.event_loop, daemon=True)
+        self.event_reader.start()
+        self.collector = threading.Thread(target=self.collect_loop, daemon=True)
+        self.collector.start()
+
+    def collect_loop(self):
+        while self.running:
+            time.sleep(COLLECT_INTERVAL)
+            try:
+                self.collect()
+            except Exception as e:
+                # 收集线程退出后所有总线的采样都会停止，出错只记录日志
+                self.log(f"取出采样失败: {str(e)}")
+
+    def collect(self):
+        for worker in self.workers.values():
+            for timestamp, device, channel, value in worker.ring.drain():
+                self.hub.record(device, channel, value, timestamp)
+
+    def event_loop(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            kind, name, payload = event
+            if kind == "reply":
+                with self.lock:
+                    future = self.replies.pop(payload.get("id"), None)
+                if future is not None:
+                    future.set_result(payload)
+            elif kind == "event":
+                self.hub.broadcast(dict(payload, bus=name))
+            elif kind == "started":
+                self.log(f"{name}: 工作进程 {payload} 已启动")
+            else:
+                self.log(f"{name}: {payload}")
+
+    def call(self, name, message):
+        """
+        把命令转发给指定总线的工作进程并等待应答，返回结果；失败时抛出 RuntimeError
+        """
+        worker = self.workers.get(name)
+        if worker is None or not worker.process.is_alive():
+            raise RuntimeError(f"总线 {name} 未运行")
+        request_id = next(self.ids)
+        future = Future()
+        with self.lock:
+            self.replies[request_id] = future
+        worker.commands.put(dict(message, id=request_id))
+        try:
+            reply = future.result(COMMAND_TIMEOUT + 1.0)
+        except FutureTimeoutError:
+            raise RuntimeError(f"总线 {name} 未应答")
+        finally:
+            with self.lock:
+                self.replies.pop(request_id, None)
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def bus_for(self, role, message):
+        """
+        命令的目标总线：消息中的 bus，否则为该角色的第一条总线
+        """
+        if message.get("bus"):
+            return message["bus"]
+        for name, worker in self.workers.items():
+            if worker.role == role:
+                return name
+        raise RuntimeError(f"没有{role}总线")
+
+    # ---- 命令 ----
+
+    def command_status(self, message):
+        buses = {}
+        for name, worker in self.workers.items():
+            written, _, dropped = worker.ring.counters()
+            status = {"role": worker.role, "port": worker.port, "alive": worker.process.is_alive(),
+                      "samples": written, "dropped": dropped}
+            if status["alive"]:
+                status.update(self.call(name, message))
+            buses[name] = status
+        return {"buses": buses}
+
+    def command_statistics(self, message):
+        statistics = []
+        for name, worker in self.workers.items():
+            if worker.process.is_alive():
+                for snapshot in self.call(name, message):
+                    if snapshot["bus"] == worker.role:
+                        statistics.append(dict(snapshot, bus=name))
+        return statistics
+
+    def command_set_flow(self, message):
+        return self.call(self.bus_for(ROLE_PUMP, message), message)
+
+    def command_set_temperature(self, message):
+        return self.call(self.bus_for(ROLE_HOTPLATE, message), message)
+
+    def command_move(self, message):
+        return self.call(self.bus_for(ROLE_SLIDE, message), message)
+
+    def command_cancel(self, message):
+        return self.call(self.bus_for(ROLE_SLIDE, message), message)
+
+    def close(self):
+        self.close_clients()
+        self.running = False
+        for worker in self.workers.values():
+            worker.stop()
+        if self.collector is not None:
+            self.collector.join()
+        self.collect()  # 工作进程退出前写入的最后一批采样
+        for worker in self.workers.values():
+            worker.ring.close(unlink=True)
+        self.events.put(None)
+        if self.event_reader is not None:
+            self.event_reader.join()
@@ -0,0 +1,372 @@
+"""
+无硬件、无窗口的端到端基准测试：在模拟器的伪终端上运行真实的驱动代码，结果以 JSON 输出，便于版本间对比
+
+    python benchmark.py --duration 5 --soak 600 --output result.json
+
+测量项：
+    throughput       各总线每秒采样数
+    scan             不同地址范围的扫描耗时
+    setpoint_latency 轮询负载下设定流量从提交到收到回显的延迟
+    chart            qibeng.ModbusScannerApp 与 chart_window.ChartWidget 每次数据更新和每帧刷新的耗时
+    soak             长时间运行（采集 + 界面刷新）期间的常驻内存增长
+    startup          main.py 从启动进程到首个窗口显示的耗时
+    scaling          1..N 条气泵总线同时满负荷读取时的总采样率：同一进程的多个线程 对比 每条总线一个进程
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # 必须在导入 PyQt 之前设置
+
+import argparse
+import json
+import multiprocessing
+import platform
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from PyQt5.QtWidgets import QApplication
+from modbus_client import ModbusClient
+from serial_worker import PRIORITY_USER
+from serial_manager import SerialManager, ROLE_PUMP, ROLE_HOTPLATE, ROLE_SLIDE
+from simulator import SimulatorConfig, build_buses
+from pump_driver import ModbusScannerThread, PollSnapshot, build_set_flow_command
+from hotplate_driver import HotPlatePoller
+from qibeng import ModbusScannerApp
+from slide_motion import build_query, CMD_READ_POSITION, RESPONSE_TIMEOUT
+from chart_window import ChartWidget
+
+BUS_ROLES = {"pump": ROLE_PUMP, "hotplate": ROLE_HOTPLATE, "slide": ROLE_SLIDE}  # 模拟总线名 -> 角色
+SCAN_RANGES = (0x08, 0x10, 0x20)  # 扫描 1..N 的地址范围
+CHART_UPDATES = 5000  # 图表基准的数据更新次数
+CHART_REFRESHES = 200  # 图表基准的刷新帧数
+CHART_DEVICES = 16  # 气泵页每帧快照包含的设备数
+STARTUP_RUNS = 5  # 启动耗时的测量次数
+
+
+def rss_bytes():
+    """
+    当前常驻内存（字节）；没有 /proc 时退回进程峰值
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024  # macOS 以字节计，Linux 以 KB 计
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+
+def timed(function, repeat):
+    """
+    调用 repeat 次，返回每次的平均耗时（秒）
+    """
+    begin = time.perf_counter()
+    for index in range(repeat):
+        function(index)
+    return (time.perf_counter() - begin) / repeat
+
+
+# ---- 总线 ----
+
+def bench_throughput(serial_manager, devices, duration):
+    """
+    每条总线在 duration 秒内连续读取，不经调度器，测总线本身能达到的采样率
+    """
+    results = {}
+
+    pump = ModbusScannerThread(serial_manager.connection(ROLE_PUMP))
+    results["pump"] = measure_rate(lambda address: pump.query_device(address)[0] is not None,
+                                   range(1, devices["pump"] + 1), duration)
+
+    hotplate = HotPlatePoller(serial_manager.connection(ROLE_HOTPLATE), addresses=())
+    results["hotplate"] = measure_rate(lambda address: hotplate.send_read_command(address) is not None,
+                                       range(1, devices["hotplate"] + 1), duration)
+
+    slide = serial_manager.connection(ROLE_SLIDE)
+    results["slide"] = measure_rate(
+        lambda address: slide.transact(build_query(address, CMD_READ_POSITION), 8, timeout=RESPONSE_TIMEOUT) is not None,
+        range(1, devices["slide"] + 1), duration)
+    return results
+
+
+def measure_rate(read, addresses, duration):
+    addresses = list(addresses)
+    if not addresses:
+        return None
+    samples = failures = 0
+    begin = time.perf_counter()
+    while time.perf_counter() - begin < duration:
+        for address in addresses:
+            if read(address):
+                samples += 1
+            else:
+                failures += 1
+    elapsed = time.perf_counter() - begin
+    return {"samples_per_second": samples / elapsed, "samples": samples, "failures": failures}
+
+
+def bench_scan(serial_manager):
+    """
+    扫描 1..N 所需时间；run() 在当前线程同步执行，扫描结束信号到达即停止，不进入轮询
+    """
+    results = {}
+    for end_address in SCAN_RANGES:
+        thread = ModbusScannerThread(serial_manager.connection(ROLE_PUMP), 1, end_address)
+        found = []
+        thread.scan_finished_signal.connect(lambda count, thread=thread: (found.append(count), thread.stop()))
+        begin = time.perf_counter()
+        thread.run()
+        results[f"1-{end_address:02X}"] = {"seconds": time.perf_counter() - begin, "found": found[0] if found else 0}
+    return results
+
+
+def bench_setpoint_latency(serial_manager, devices, count):
+    """
+    轮询线程满负荷运行时，从提交 FC06 到收到回显的延迟
+    """
+    connection = serial_manager.connection(ROLE_PUMP)
+    client = ModbusClient(connection)
+    poller = ModbusScannerThread(connection, 1, devices["pump"])
+    poller.start()
+    deadline = time.monotonic() + 30
+    while not poller.scheduler.keys() and time.monotonic() < deadline:
+        time.sleep(0.05)  # 等待扫描结束、进入轮询
+
+    latencies = []
+    failures = 0
+    for index in range(count):
+        address = index % devices["pump"] + 1
+        frame = build_set_flow_command(address, index % 100)
+        begin = time.perf_counter()
+        response = client.transact(frame, priority=PRIORITY_USER)
+        if response == frame:
+            latencies.append(time.perf_counter() - begin)
+        else:
+            failures += 1
+        time.sleep(0.02)
+
+    poller.stop()
+    poller.wait()
+    result = percentiles(latencies)
+    result["failures"] = failures
+    return result
+
+
+def saturate_bus(port, baudrate, devices, duration):
+    """
+    打开一条总线并连续读取 duration 秒，返回每秒采样数；多进程基准在工作进程中调用
+    """
+    serial_manager = SerialManager()
+    serial_manager.connect(port, baudrate)
+    pump = ModbusScannerThread(serial_manager.connection(ROLE_PUMP))
+    result = measure_rate(lambda address: pump.query_device(address)[0] is not None, range(1, devices + 1), duration)
+    serial_manager.disconnect_all()
+    return result["samples_per_second"]
+
+
+def start_simulators(count, devices):
+    """
+    每条总线一个独立的模拟器进程（零延迟），避免模拟器本身成为瓶颈；返回 (进程列表, 串口列表)
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulator.py")
+    processes, ports = [], []
+    for _ in range(count):
+        process = subprocess.Popen([sys.executable, script, "--mfc", str(devices), "--hotplate", "0", "--slide", "0",
+                                    "--latency", "0"], stdout=subprocess.PIPE, text=True)
+        processes.append(process)
+        ports.append(process.stdout.readline().split(": ", 1)[1].strip())
+    return processes, ports
+
+
+def bench_scaling(max_buses, devices, duration, baudrate):
+    """
+    总采样率随总线数的变化；线程方式受 GIL 限制，多进程方式应随总线数近似线性增长
+    """
+    counts = sorted({count for count in (1, 2, 4, 8, max_buses) if count <= max_buses})
+    simulators, ports = start_simulators(max_buses, devices)
+    context = multiprocessing.get_context("spawn")
+    results = {"devices_per_bus": devices, "threads": {}, "processes": {}}
+    try:
+        for count in counts:
+            rates = [0.0] * count
+
+            def run(index):
+                rates[index] = saturate_bus(ports[index], baudrate, devices, duration)
+
+            threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results["threads"][count] = sum(rates)
+
+            with context.Pool(count) as pool:
+                rates = pool.starmap(saturate_bus, [(port, baudrate, devices, duration) for port in ports[:count]])
+            results["processes"][count] = sum(rates)
+    finally:
+        for simulator in simulators:
+            simulator.terminate()
+            simulator.wait()
+    return results
+
+
+# ---- 界面 ----
+
+def bench_chart(app, serial_manager):
+    """
+    数据更新（信号槽调用）和每帧刷新的耗时，不需要真实总线
+    """
+    results = {}
+
+    window = ModbusScannerApp(serial_manager)
+    window.chart_timer.stop()  # 每帧的处理由基准直接调用
+    addresses = tuple(range(1, CHART_DEVICES + 1))
+    for address in addresses:
+        window.add_device_widget(address, "100")
+
+    def snapshot(i):
+        now = int(time.time() * 1000) + i
+        values = tuple((i + address) % 0x0FFF for address in addresses)
+        return PollSnapshot(addresses, (now,) * len(addresses), values, values)
+
+    # 每帧应用一个包含所有设备的快照；先让曲线不需要重绘，只测数值框和历史，再测包含曲线重绘的整帧
+    chart_address, window.chart_address = window.chart_address, None
+    update = timed(lambda i: (window.pending_snapshots.append(snapshot(i)), window.apply_snapshots()),
+                   CHART_UPDATES // CHART_DEVICES)
+    window.chart_address = chart_address
+    refresh = timed(lambda i: (window.pending_snapshots.append(snapshot(i)), window.apply_snapshots()),
+                    CHART_REFRESHES)
+    results["qibeng"] = {"devices_per_frame": CHART_DEVICES, "update_seconds": update, "refresh_seconds": refresh}
+    window.close()
+
+    widget = ChartWidget(window_length=CHART_UPDATES)
+    widget.refresh_timer.stop()
+    widget.add_device(0x01)
+    update = timed(lambda i: widget.update_chart(0x01, i % 100, (i * 7) % 100), CHART_UPDATES)
+    refresh = timed(lambda i: (widget.update_chart(0x01, i % 100, i % 100), widget.refresh_chart()), CHART_REFRESHES)
+    results["chart_window"] = {"update_seconds": update, "refresh_seconds": refresh}
+    widget.close()
+
+    app.processEvents()
+    return results
+
+
+def bench_soak(app, serial_manager, devices, duration, sample_interval=10.0):
+    """
+    完整的气泵标签页（扫描、轮询、界面刷新）运行 duration 秒，按间隔记录常驻内存
+    """
+    window = ModbusScannerApp(serial_manager)
+    window.start_address_input.setValue(1)
+    window.end_address_input.setValue(devices["pump"])
+    window.start_scan()
+
+    samples = [(0.0, rss_bytes())]
+    begin = time.monotonic()
+    next_sample = begin + sample_interval
+    while time.monotonic() - begin < duration:
+        app.processEvents()
+        time.sleep(0.01)
+        now = time.monotonic()
+        if now >= next_sample:
+            samples.append((now - begin, rss_bytes()))
+            next_sample = now + sample_interval
+    samples.append((time.monotonic() - begin, rss_bytes()))
+
+    window.stop_scan()
+    window.close()
+    return {
+        "seconds": duration,
+        "rss_start": samples[0][1],
+        "rss_end": samples[-1][1],
+        "rss_growth": samples[-1][1] - samples[0][1],
+        "samples": samples,
+    }
+
+
+def bench_startup(runs=STARTUP_RUNS):
+    """
+    在子进程中启动 main.py，显示首个窗口后立即退出；记录主窗口自报的耗时和包含解释器启动的总耗时
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    reported, wall = [], []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        output = subprocess.run([sys.executable, script, "--measure-startup"], capture_output=True, text=True,
+                                env=dict(os.environ, QT_QPA_PLATFORM="offscreen"), timeout=60).stdout
+        wall.append(time.perf_counter() - begin)
+        match = re.search(r"(\d+) ms", output)
+        if match:
+            reported.append(int(match.group(1)) / 1000.0)
+    return {"first_window": percentiles(reported), "process_wall": percentiles(wall)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无硬件端到端基准测试")
+    parser.add_argument("--duration", type=float, default=5.0, help="每项吞吐量测量的时长（秒）")
+    parser.add_argument("--soak", type=float, default=60.0, help="内存浸泡测试时长（秒），0 表示跳过")
+    parser.add_argument("--setpoints", type=int, default=200, help="设定流量延迟的采样次数")
+    parser.add_argument("--mfc", type=int, default=16)
+    parser.add_argument("--hotplate", type=int, default=2)
+    parser.add_argument("--slide", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=5.0, help="模拟器应答延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=1.0, help="模拟器应答延迟抖动（毫秒）")
+    parser.add_argument("--baudrate", type=int, default=9600, help="模拟的线上波特率")
+    parser.add_argument("--buses", type=int, default=4, help="多总线扩展测试的最大总线数，0 表示跳过")
+    parser.add_argument("--output", help="结果写入的 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    config = SimulatorConfig(args.latency / 1000.0, args.jitter / 1000.0, baudrate=args.baudrate, seed=0)
+    buses = build_buses(args.mfc, args.hotplate, args.slide, config)
+    serial_manager = SerialManager()
+    for bus in buses:
+        bus.start()
+        serial_manager.connect(bus.port, args.baudrate, name=BUS_ROLES[bus.name])
+    devices = {"pump": args.mfc, "hotplate": args.hotplate, "slide": args.slide}
+
+    results = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "throughput": bench_throughput(serial_manager, devices, args.duration),
+        "scan": bench_scan(serial_manager),
+        "setpoint_latency": bench_setpoint_latency(serial_manager, devices, args.setpoints),
+        "chart": bench_chart(app, serial_manager),
+        "startup": bench_startup(),
+    }
+    if args.buses > 0:
+        results["scaling"] = bench_scaling(args.buses, args.mfc, args.duration, args.baudrate)
+    if args.soak > 0:
+        results["soak"] = bench_soak(app, serial_manager, devices, args.soak)
+    results["bus_statistics"] = serial_manager.statistics()
+
+    serial_manager.disconnect_all()
+    for bus in buses:
+        bus.stop()
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
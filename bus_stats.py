@@ -0,0 +1,110 @@
+"""
+总线事务统计：按设备累计往返延迟、线上字节数、超时、CRC 错误、重试和重同步次数，延迟按对数分档计入直方图
+"""
+import threading
+import time
+
+# 延迟直方图各档上界（秒），最后一档为超过最大上界的事务
+LATENCY_BUCKETS = (0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+def new_device_stats():
+    return {
+        "transactions": 0,
+        "timeouts": 0,
+        "crc_errors": 0,
+        "retries": 0,
+        "resyncs": 0,
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "latency_sum": 0.0,
+        "latency_max": 0.0,
+        "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+    }
+
+
+def latency_percentile(histogram, fraction):
+    """
+    由直方图估算延迟分位数，返回所在档的上界（秒）；落在最后一档时返回 None
+    """
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    threshold = total * fraction
+    count = 0
+    for index, bucket_count in enumerate(histogram):
+        count += bucket_count
+        if count >= threshold:
+            return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+    return None
+
+
+class BusStatistics:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()  # I/O 线程写入，诊断页读取
+        self.devices = {}
+        self.started = time.time()
+
+    def device(self, device):
+        stats = self.devices.get(device)
+        if stats is None:
+            stats = self.devices[device] = new_device_stats()
+        return stats
+
+    def record_transaction(self, device, latency, bytes_sent, bytes_received, timed_out):
+        with self.lock:
+            stats = self.device(device)
+            stats["transactions"] += 1
+            stats["bytes_sent"] += bytes_sent
+            stats["bytes_received"] += bytes_received
+            if timed_out:
+                stats["timeouts"] += 1
+                return  # 超时事务的耗时就是超时时间，不计入延迟
+            stats["latency_sum"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats["histogram"][index] += 1
+                    break
+            else:
+                stats["histogram"][-1] += 1
+
+    def record_crc_error(self, device):
+        with self.lock:
+            self.device(device)["crc_errors"] += 1
+
+    def record_retry(self, device):
+        with self.lock:
+            self.device(device)["retries"] += 1
+
+    def record_resync(self, device):
+        with self.lock:
+            self.device(device)["resyncs"] += 1
+
+    def reset(self):
+        with self.lock:
+            self.devices.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """
+        返回可序列化的统计快照
+        """
+        with self.lock:
+            devices = {}
+            for device, stats in sorted(self.devices.items(), key=lambda item: str(item[0])):
+                answered = stats["transactions"] - stats["timeouts"]
+                devices[str(device)] = dict(
+                    stats,
+                    histogram=list(stats["histogram"]),
+                    latency_avg=stats["latency_sum"] / answered if answered else 0.0,
+                    latency_p50=latency_percentile(stats["histogram"], 0.5),
+                    latency_p95=latency_percentile(stats["histogram"], 0.95),
+                )
+            return {
+                "bus": self.name,
+                "since": self.started,
+                "latency_buckets": list(LATENCY_BUCKETS),
+                "devices": devices,
+            }
@@ -1,17 +1,46 @@
 from PyQt5.QtChart import QChart, QChartView, QLineSeries
+from PyQt5.QtCore import QTimer, QPointF
 from PyQt5.QtWidgets import QVBoxLayout, QWidget, QComboBox, QLabel
+from ring_buffer import RingBuffer
+
+DEFAULT_WINDOW_LENGTH = 50  # 每个设备保留的点数
+DEFAULT_MAX_POINTS = 2000  # 单条曲线最多绘制的点数，超过时抽稀
+DEFAULT_REFRESH_INTERVAL = 33  # 刷新间隔（毫秒），约 30 帧/秒
+
+
+def decimate(values, max_points):
+    """
+    最小/最大值抽稀：把数据分桶，每桶保留最小值和最大值，保持曲线轮廓
+    :return: [(逻辑位置, 值), ...]
+    """
+    count = len(values)
+    if count <= max_points:
+        return list(enumerate(values))
+    step = -(-count * 2 // max_points)  # 向上取整，每桶产出 2 个点
+    points = []
+    for begin in range(0, count, step):
+        chunk = values[begin:begin + step]
+        low = chunk.index(min(chunk))
+        high = chunk.index(max(chunk))
+        for offset in sorted({low, high}):
+            points.append((begin + offset, chunk[offset]))
+    return points
 
 
 class ChartWidget(QWidget):
     """
     折线图显示模块
     """
-    def __init__(self):
+    def __init__(self, window_length=DEFAULT_WINDOW_LENGTH, max_points=DEFAULT_MAX_POINTS,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL):
         super().__init__()
         self.setWindowTitle("折线图")
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
 
+        self.window_length = window_length
+        self.max_points = max_points
+
         self.device_selector = QComboBox()
         self.device_selector.currentIndexChanged.connect(self.change_device)
         self.layout.addWidget(self.device_selector)
@@ -34,42 +63,60 @@ class ChartWidget(QWidget):
         self.layout.addWidget(self.chart_view)
 
         self.device_data = {}
+        self.dirty = False
+
+        # 数据只写入缓冲区，由定时器按帧率批量刷新曲线
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_chart)
+        self.refresh_timer.start(refresh_interval)
 
     def add_device(self, address):
         """
         添加新设备到选择器
         """
         self.device_selector.addItem(f"设备 {address:02X}")
-        self.device_data[address] = {"set_flow": [], "display_flow": []}
+        self.device_data[address] = {
+            "set_flow": RingBuffer(self.window_length),
+            "display_flow": RingBuffer(self.window_length),
+        }
+
+    def current_address(self):
+        current_text = self.device_selector.currentText()
+        if current_text.startswith("设备 "):
+            return int(current_text.split()[1], 16)
+        return None
 
     def update_chart(self, address, set_flow, display_flow):
         """
-        更新指定设备的折线图
+        记录指定设备的新数据，当前设备的曲线在下一次刷新时更新
         """
         if address in self.device_data:
             data = self.device_data[address]
             data["set_flow"].append(set_flow)
             data["display_flow"].append(display_flow)
+            if address == self.current_address():
+                self.dirty = True
 
-            # 限制显示点数
-            if len(data["set_flow"]) > 50:
-                data["set_flow"].pop(0)
-                data["display_flow"].pop(0)
+    def refresh_chart(self):
+        """
+        每帧最多一次：把当前设备的窗口数据整体 replace 到曲线中
+        """
+        if not self.dirty:
+            return
+        self.dirty = False
 
-            # 更新图表
-            if self.device_selector.currentText() == f"设备 {address:02X}":
-                self.set_series.clear()
-                self.display_series.clear()
-                for i, (s, d) in enumerate(zip(data["set_flow"], data["display_flow"])):
-                    self.set_series.append(i, s)
-                    self.display_series.append(i, d)
+        address = self.current_address()
+        if address not in self.device_data:
+            return
+        data = self.device_data[address]
+        for series, buffer in ((self.set_series, data["set_flow"]), (self.display_series, data["display_flow"])):
+            series.replace([QPointF(i, v) for i, v in decimate(buffer.values(), self.max_points)])
+        self.chart.axisX().setRange(0, max(len(data["set_flow"]) - 1, 1))
 
     def change_device(self):
         """
         切换设备时更新图表
         """
-        current_text = self.device_selector.currentText()
-        if current_text.startswith("设备 "):
-            address = int(current_text.split()[1], 16)
-            if address in self.device_data:
-                self.update_chart(address, 0, 0)
+        if self.current_address() in self.device_data:
+            self.dirty = True
+            self.refresh_chart()
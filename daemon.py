@@ -0,0 +1,385 @@
+"""
+无界面采集守护进程：不创建任何窗口，直接运行气泵、热台和滑台的驱动线程，
+采样通过本地流协议（见 stream_protocol）推送给任意数量的客户端，并接受命令
+
+    python daemon.py --pump /dev/ttyUSB0 --hotplate /dev/ttyUSB1 --slide /dev/ttyUSB2 --listen tcp://127.0.0.1:5020
+    python main.py --headless ...   # 同上
+    python daemon.py --processes --bus pump=/dev/ttyUSB0 --bus pump=/dev/ttyUSB1 ...   # 每条总线一个进程
+    python main.py --connect tcp://127.0.0.1:5020   # 界面作为客户端连接（见 remote_monitor）
+
+只导入 QtCore 和各驱动模块（pump_driver、hotplate_driver、slide_motion），不需要 QtWidgets/QtChart
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from PyQt5.QtCore import QCoreApplication, QTimer
+from modbus_client import ModbusClient
+from serial_worker import PRIORITY_USER
+from serial_manager import SerialManager, ROLE_PUMP, ROLE_HOTPLATE, ROLE_SLIDE
+from recorder import TelemetryRecorder, DEFAULT_MAX_BYTES
+from pump_driver import ModbusScannerThread, build_set_flow_command
+from hotplate_driver import HotPlatePoller
+from slide_motion import SlideController
+from port_inventory import shared_inventory
+from stream_protocol import DEFAULT_ADDRESS, ProtocolError, encode, read_message, parse_address
+
+BATCH_INTERVAL = 0.1  # 样本推送间隔（秒）
+MAX_PENDING_SAMPLES = 100000  # 每个客户端积压的样本上限，读取过慢的客户端丢弃最旧的样本
+COMMAND_TIMEOUT = 2.0  # 等待设备应答的最长时间（秒）
+
+
+class SampleHub:
+    """
+    与 TelemetryRecorder 接口相同的采样出口：写入记录器的同时分发给所有已连接的客户端
+    """
+    def __init__(self, recorder=None):
+        self.recorder = recorder
+        self.sessions = []
+        self.lock = threading.Lock()  # 保护 sessions
+
+    def record(self, device, channel, value, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.recorder is not None:
+            self.recorder.record(device, channel, value, timestamp)
+        sample = (timestamp, device, channel, float(value))
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.offer(sample)
+
+    def add(self, session):
+        with self.lock:
+            self.sessions.append(session)
+
+    def remove(self, session):
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def broadcast(self, message):
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.send(message)
+
+
+class ClientSession:
+    """
+    一个客户端连接：读取线程处理命令，推送线程按批发送样本
+    """
+    def __init__(self, daemon, sock, peer):
+        self.daemon = daemon
+        self.sock = sock
+        self.peer = peer
+        self.samples = deque(maxlen=MAX_PENDING_SAMPLES)  # deque.append 可在任意线程调用
+        self.prefixes = None  # 订阅的设备名前缀，None 表示全部
+        self.send_lock = threading.Lock()
+        self.open = True
+
+    def start(self):
+        threading.Thread(target=self.read_loop, daemon=True).start()
+        threading.Thread(target=self.push_loop, daemon=True).start()
+
+    def offer(self, sample):
+        prefixes = self.prefixes
+        if prefixes is None or any(sample[1].startswith(prefix) for prefix in prefixes):
+            self.samples.append(sample)
+
+    def send(self, message):
+        try:
+            with self.send_lock:
+                self.sock.sendall(encode(message))
+            return True
+        except OSError:
+            self.close()
+            return False
+
+    def push_loop(self):
+        while self.open:
+            time.sleep(BATCH_INTERVAL)
+            if not self.samples:
+                continue
+            batch = []
+            while self.samples:
+                batch.append(self.samples.popleft())
+            self.send({"type": "samples", "samples": batch})
+
+    def read_loop(self):
+        try:
+            while self.open:
+                message = read_message(self.sock)
+                if message is None:
+                    break
+                kind = message.get("type")
+                if kind == "subscribe":
+                    devices = message.get("devices") or []
+                    self.prefixes = tuple(devices) if devices else None
+                elif kind == "command":
+                    self.send(self.daemon.execute(message))
+        except (OSError, ProtocolError, ValueError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self.daemon.hub.remove(self)
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+
+class AcquisitionDaemon:
+    """
+    打开各角色的串口，启动驱动线程，并在 listen 地址上接受客户端
+    """
+    def __init__(self, serial_manager, recorder=None, pump_range=(1, 0x10), hotplate_addresses=None,
+                 slide_address=0x01, hotplate_range=(1, 0x10)):
+        self.serial_manager = serial_manager
+        self.hub = SampleHub(recorder)
+        self.pump_range = pump_range
+        self.hotplate_addresses = hotplate_addresses  # None 表示在 hotplate_range 内自动发现
+        self.hotplate_range = hotplate_range
+        self.slide_address = slide_address
+        self.pump = None
+        self.hotplate = None
+        self.slide = None
+        self.server = None
+        self.unix_path = None
+
+    def start_drivers(self):
+        if self.serial_manager.get_connection_status(ROLE_PUMP):
+            self.pump = ModbusScannerThread(self.serial_manager.connection(ROLE_PUMP), *self.pump_range, self.hub)
+            self.pump.result_signal.connect(lambda text: self.log(f"气泵: {text}"))
+            self.pump.discovery_signal.connect(
+                lambda event: self.log(f"气泵: 发现地址 {event.address:02X}，量程 {event.range_value} {event.unit or ''}"))
+            self.pump.scan_finished_signal.connect(self.pump_scan_finished)
+            self.pump.start()
+        if self.serial_manager.get_connection_status(ROLE_HOTPLATE):
+            self.hotplate = HotPlatePoller(self.serial_manager.connection(ROLE_HOTPLATE), self.hotplate_addresses,
+                                           *self.hotplate_range, recorder=self.hub)
+            self.hotplate.log_signal.connect(lambda text, level, device: self.log(f"热台 {device}: {text}"))
+            self.hotplate.discovery_signal.connect(
+                lambda status: self.log(f"热台: 发现地址 {status.address:02X}，测量值 {status.pv:.1f}°C"))
+            self.hotplate.scan_finished_signal.connect(self.hotplate_scan_finished)
+            self.hotplate.start()
+        if self.serial_manager.get_connection_status(ROLE_SLIDE):
+            self.slide = SlideController(self.serial_manager.connection(ROLE_SLIDE), self.slide_address,
+                                         recorder=self.hub)
+            self.slide.error_signal.connect(lambda text: self.log(f"滑台: {text}"))
+            self.slide.sequence_finished_signal.connect(
+                lambda: self.hub.broadcast({"type": "event", "event": "sequence_finished"}))
+            self.slide.start()
+
+    def pump_scan_finished(self, count):
+        self.log(f"气泵扫描完成，找到 {count} 个设备")
+        self.hub.broadcast({"type": "event", "event": "pump_scan_finished", "addresses": self.pump.scheduler.keys()})
+
+    def hotplate_scan_finished(self, count):
+        self.log(f"热台发现完成，找到 {count} 个温控器")
+        self.hub.broadcast({"type": "event", "event": "hotplate_scan_finished",
+                            "addresses": self.hotplate.scheduler.keys()})
+
+    def log(self, text):
+        print(time.strftime("%H:%M:%S"), text, flush=True)
+
+    def listen(self, address):
+        family, target = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.unlink(target)  # 上次异常退出遗留的套接字文件
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            self.unix_path = target
+        self.server.bind(target)
+        self.server.listen()
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        self.log(f"监听 {address}")
+
+    def accept_loop(self):
+        while True:
+            try:
+                sock, peer = self.server.accept()
+            except OSError:
+                break  # 监听套接字已关闭
+            if sock.family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            session = ClientSession(self, sock, peer)
+            self.hub.add(session)
+            session.start()
+
+    # ---- 命令 ----
+
+    def execute(self, message):
+        """
+        执行一条命令，返回应答消息；在客户端的读取线程中调用
+        """
+        reply = {"type": "reply", "id": message.get("id")}
+        handler = getattr(self, f"command_{message.get('command')}", None)
+        if handler is None:
+            return dict(reply, ok=False, error=f"未知命令: {message.get('command')}")
+        try:
+            return dict(reply, ok=True, result=handler(message))
+        except Exception as e:
+            return dict(reply, ok=False, error=str(e))
+
+    def command_status(self, message):
+        return {
+            "connections": {role: self.serial_manager.get_connection_status(role)
+                            for role in (ROLE_PUMP, ROLE_HOTPLATE, ROLE_SLIDE)},
+            "pumps": self.pump.scheduler.keys() if self.pump is not None else [],
+            "hotplates": self.hotplate.scheduler.keys() if self.hotplate is not None else [],
+        }
+
+    def command_statistics(self, message):
+        return self.serial_manager.statistics()
+
+    def command_set_flow(self, message):
+        address, percent = int(message["address"]), float(message["percent"])
+        if not 0 <= percent <= 100:
+            raise ValueError("百分比应在 0-100 范围内")
+        command = build_set_flow_command(address, percent)
+        response = ModbusClient(self.serial_manager.connection(ROLE_PUMP)).submit(
+            command, priority=PRIORITY_USER
+        ).result(COMMAND_TIMEOUT)
+        if response != command:
+            raise RuntimeError("设定流量未收到应答")
+        if self.pump is not None:
+            self.pump.scheduler.boost(address)
+        return True
+
+    def command_set_temperature(self, message):
+        if self.hotplate is None:
+            raise RuntimeError("热台未连接")
+        status = self.hotplate.write_setpoint(int(message["address"]), float(message["value"])).result(COMMAND_TIMEOUT)
+        if status is None:
+            raise RuntimeError("设定温度未收到应答")
+        return status._asdict()
+
+    def command_move(self, message):
+        if self.slide is None:
+            raise RuntimeError("滑台未连接")
+        self.slide.run_sequence([int(position) for position in message["positions"]])
+        return True
+
+    def command_cancel(self, message):
+        if self.slide is not None:
+            self.slide.cancel()
+        return True
+
+    def close(self):
+        self.close_clients()
+        for thread in (self.pump, self.hotplate, self.slide):
+            if thread is not None:
+                thread.stop()
+                thread.wait()
+        self.serial_manager.disconnect_all()
+
+    def close_clients(self):
+        """
+        关闭监听套接字和所有客户端连接
+        """
+        if self.server is not None:
+            self.server.close()
+            if self.unix_path is not None and os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+        with self.hub.lock:
+            sessions = list(self.hub.sessions)
+        for session in sessions:
+            session.close()
+
+
+def parse_range(text):
+    start, _, end = text.partition("-")
+    return int(start, 0), int(end or start, 0)
+
+
+def parse_bus(text):
+    role, _, port = text.partition("=")
+    if role not in (ROLE_PUMP, ROLE_HOTPLATE, ROLE_SLIDE) or not port:
+        raise argparse.ArgumentTypeError(f"应为 角色=串口，角色为 {ROLE_PUMP}/{ROLE_HOTPLATE}/{ROLE_SLIDE}")
+    return role, port
+
+
+def name_buses(buses):
+    """
+    为每条总线命名：每个角色的第一条总线用角色名，之后依次为 pump2、pump3……
+    """
+    counts = {}
+    named = []
+    for role, port in buses:
+        counts[role] = counts.get(role, 0) + 1
+        named.append((role if counts[role] == 1 else f"{role}{counts[role]}", role, port))
+    return named
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面采集守护进程")
+    parser.add_argument("--pump", help="气泵总线串口")
+    parser.add_argument("--hotplate", help="热台总线串口")
+    parser.add_argument("--slide", help="滑台总线串口")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--pump-range", type=parse_range, default=(1, 0x10), help="气泵扫描地址范围，如 0x01-0x10")
+    parser.add_argument("--hotplate-addresses", type=lambda text: [int(a, 0) for a in text.split(",")],
+                        default=None, help="温控器地址，逗号分隔；不指定时在 --hotplate-range 内自动发现")
+    parser.add_argument("--hotplate-range", type=parse_range, default=(1, 0x10), help="温控器发现范围，如 0x01-0x20")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS, help="tcp://host:port 或 unix:///path")
+    parser.add_argument("--no-record", action="store_true", help="不写入遥测记录")
+    parser.add_argument("--record-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="遥测记录合计上限（MB），超过时删除最旧的分段，0 表示不限制")
+    parser.add_argument("--record-max-days", type=float, default=None, help="遥测记录保留天数，不指定时不按时间删除")
+    parser.add_argument("--processes", action="store_true", help="每条总线一个工作进程（见 acquisition）")
+    parser.add_argument("--bus", action="append", default=[], type=parse_bus, metavar="ROLE=PORT",
+                        help="多进程模式下追加一条总线，可重复，如 pump=/dev/ttyUSB3")
+    args = parser.parse_args(argv)
+
+    buses = [(role, port) for role, port in ((ROLE_PUMP, args.pump), (ROLE_HOTPLATE, args.hotplate),
+                                             (ROLE_SLIDE, args.slide)) if port] + args.bus
+    if args.bus and not args.processes:
+        parser.error("--bus 需要 --processes")
+
+    app = QCoreApplication(sys.argv[:1])
+    recorder = None if args.no_record else TelemetryRecorder(
+        max_bytes=args.record_max_mb * 1024 * 1024 or None,
+        max_age=args.record_max_days * 86400 if args.record_max_days is not None else None)
+    if args.processes:
+        from acquisition import ProcessAcquisitionDaemon
+        daemon = ProcessAcquisitionDaemon(name_buses(buses), args.baudrate, recorder, args.pump_range,
+                                          args.hotplate_addresses, hotplate_range=args.hotplate_range)
+    else:
+        serial_manager = SerialManager()
+        for role, port in buses:
+            if not serial_manager.connect(port, args.baudrate, name=role):
+                print(f"无法连接到 {port}", file=sys.stderr)
+                return 1
+        shared_inventory().attach(serial_manager)  # 适配器插拔后自动重连
+        daemon = AcquisitionDaemon(serial_manager, recorder, args.pump_range, args.hotplate_addresses,
+                                   hotplate_range=args.hotplate_range)
+    daemon.listen(args.listen)
+    daemon.start_drivers()
+
+    # Python 的信号处理只在解释器获得控制权时运行，定时器让事件循环定期返回
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(200)
+
+    result = app.exec_()
+    daemon.close()
+    if recorder is not None:
+        recorder.close()
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+按设备地址保存的历史数据：每台设备一个列式环形缓冲（时间戳 + 各数值列），内存上限固定
+"""
+from ring_buffer import TimeSeriesBuffer
+
+DEFAULT_CAPACITY = 20000  # 每台设备保留的点数，300 ms 轮询约 1.7 小时
+
+
+class DeviceHistory:
+    def __init__(self, channels, capacity_per_device=DEFAULT_CAPACITY):
+        self.channels = channels
+        self.capacity_per_device = capacity_per_device
+        self.buffers = {}
+
+    def __contains__(self, address):
+        return address in self.buffers
+
+    def addresses(self):
+        return sorted(self.buffers)
+
+    def record(self, address, timestamp, *values):
+        """
+        记录一条数据，首次出现的设备自动分配缓冲区
+        """
+        buffer = self.buffers.get(address)
+        if buffer is None:
+            buffer = self.buffers[address] = TimeSeriesBuffer(self.capacity_per_device, self.channels)
+        buffer.append(timestamp, *values)
+
+    def latest_timestamp(self, address):
+        buffer = self.buffers.get(address)
+        if not buffer:
+            return None
+        return buffer.timestamps[-1]
+
+    def window(self, address, since):
+        """
+        返回设备在 since 之后的数据：(时间戳列, [数值列, ...])，没有数据时返回 None
+        """
+        buffer = self.buffers.get(address)
+        if not buffer:
+            return None
+        return buffer.since(since)
+
+    def remove(self, address):
+        self.buffers.pop(address, None)
@@ -0,0 +1,86 @@
+"""
+诊断页：显示每条总线、每个设备的事务统计，可导出快照
+"""
+import json
+import time
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem, QLabel, QFileDialog
+)
+from PyQt5.QtCore import QTimer
+from bus_stats import LATENCY_BUCKETS
+
+REFRESH_INTERVAL = 1000  # 刷新间隔（毫秒）
+COLUMNS = ["总线", "设备", "事务数", "平均延迟(ms)", "P50(ms)", "P95(ms)", "最大延迟(ms)",
+           "超时", "CRC错误", "重试", "重同步", "发送字节", "接收字节", "延迟分布"]
+
+
+def format_ms(seconds):
+    if seconds is None:
+        return f">{LATENCY_BUCKETS[-1] * 1000:.0f}"
+    return f"{seconds * 1000:.1f}"
+
+
+class DiagnosticsPage(QWidget):
+    def __init__(self, serial_manager):
+        super().__init__()
+        self.serial_manager = serial_manager
+        self.init_ui()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        button_layout = QHBoxLayout()
+        self.reset_button = QPushButton("清零")
+        self.reset_button.clicked.connect(self.reset)
+        self.export_button = QPushButton("导出快照")
+        self.export_button.clicked.connect(self.export_snapshot)
+        button_layout.addWidget(self.reset_button)
+        button_layout.addWidget(self.export_button)
+        button_layout.addStretch(1)
+        layout.addLayout(button_layout)
+
+        bounds = ", ".join(f"≤{bound * 1000:g}" for bound in LATENCY_BUCKETS)
+        layout.addWidget(QLabel(f"延迟分布各档上界(ms)：{bounds}, 更慢"))
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
+
+    def refresh(self):
+        """
+        只在页面可见时重绘表格
+        """
+        if not self.isVisible():
+            return
+        rows = []
+        for snapshot in self.serial_manager.statistics():
+            for device, stats in snapshot["devices"].items():
+                rows.append([
+                    snapshot["bus"], device, stats["transactions"], format_ms(stats["latency_avg"]),
+                    format_ms(stats["latency_p50"]), format_ms(stats["latency_p95"]), format_ms(stats["latency_max"]),
+                    stats["timeouts"], stats["crc_errors"], stats["retries"], stats["resyncs"],
+                    stats["bytes_sent"], stats["bytes_received"], " ".join(map(str, stats["histogram"])),
+                ])
+        self.table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def reset(self):
+        self.serial_manager.reset_statistics()
+        self.refresh()
+
+    def export_snapshot(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "导出快照", time.strftime("bus_stats_%Y%m%d_%H%M%S.json"), "JSON (*.json)"
+        )
+        if path:
+            with open(path, 'w') as f:
+                json.dump({"time": time.time(), "buses": self.serial_manager.statistics()}, f, indent=2)
@@ -1,65 +1,103 @@
 # homepage.py
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QComboBox, QLabel
-from serial_manager import SerialManager  # 确保你已经有 SerialManager 类
-import serial.tools.list_ports  # 导入串口工具库
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QComboBox, QLabel
+from port_inventory import shared_inventory
+from serial_manager import ROLE_NAMES
 
 class HomePage(QWidget):
     def __init__(self, serial_manager):
         super().__init__()
         self.serial_manager = serial_manager
+        self.role_widgets = {}  # 角色 -> 串口选择框、连接按钮、状态标签
+        self.inventory = shared_inventory()  # 各页面共用的串口清单，插拔时自动更新
         self.init_ui()
 
+        self.inventory.ports_changed.connect(self.update_ports)
+        self.inventory.scan_finished.connect(self.scan_finished)
+        self.inventory.connection_lost.connect(self.connection_lost)
+        self.inventory.reconnected.connect(self.reconnected)
+        if self.inventory.scanned:
+            self.update_ports(self.inventory.ports)
+            self.scan_finished(self.inventory.ports)
+
     def init_ui(self):
         layout = QVBoxLayout()
 
-        # 串口连接选择
-        self.port_combo = QComboBox()
-
         # 扫描串口按钮
         self.scan_button = QPushButton("扫描串口")
         self.scan_button.clicked.connect(self.scan_ports)
+        layout.addWidget(self.scan_button)
 
-        # 连接按钮
-        self.connect_button = QPushButton("连接")
-        self.connect_button.clicked.connect(self.toggle_connection)
+        # 每类仪器一行：串口选择、连接按钮、状态
+        for role, role_name in ROLE_NAMES.items():
+            row = QHBoxLayout()
+            port_combo = QComboBox()
+            port_combo.setEditable(True)  # 允许直接输入未被枚举到的串口（如模拟器的伪终端）
+            connect_button = QPushButton("连接")
+            connect_button.clicked.connect(lambda _, role=role: self.toggle_connection(role))
+            role_status = QLabel("未连接")
+            row.addWidget(QLabel(f"{role_name}："))
+            row.addWidget(port_combo, 1)
+            row.addWidget(connect_button)
+            row.addWidget(role_status)
+            layout.addLayout(row)
+            self.role_widgets[role] = {"port_combo": port_combo, "connect_button": connect_button, "status": role_status}
 
-        # 显示连接状态
+        # 显示扫描状态
         self.status_label = QLabel("状态：未连接")
-
-        # 初始扫描并填充串口列表
-        self.scan_ports()
-
-        layout.addWidget(self.scan_button)
-        layout.addWidget(self.port_combo)
-        layout.addWidget(self.connect_button)
         layout.addWidget(self.status_label)
+        layout.addStretch(1)
 
         self.setLayout(layout)
 
     def scan_ports(self):
-        """扫描并填充可用的串口"""
-        ports = serial.tools.list_ports.comports()
-        self.port_combo.clear()  # 清空之前的串口列表
-        for port in ports:
-            self.port_combo.addItem(port.device)
+        """在后台重新枚举串口，结果通过串口清单的信号返回"""
+        self.status_label.setText("正在扫描串口…")
+        self.inventory.refresh()
+
+    def update_ports(self, ports):
+        """填充可用的串口"""
+        for widgets in self.role_widgets.values():
+            port_combo = widgets["port_combo"]
+            current = port_combo.currentText()
+            port_combo.clear()  # 清空之前的串口列表
+            port_combo.addItems(ports)
+            if current:
+                port_combo.setCurrentText(current)
 
+    def scan_finished(self, ports):
         if not ports:
             self.status_label.setText("没有找到可用的串口")
         else:
             self.status_label.setText(f"找到 {len(ports)} 个可用串口")
 
-    def toggle_connection(self):
-        """切换串口连接或断开"""
-        port = self.port_combo.currentText()
-        
-        if not self.serial_manager.get_connection_status():  # 当前没有连接
-            success = self.serial_manager.connect(port)
+    def connection_lost(self, role, port):
+        widgets = self.role_widgets[role]
+        widgets["status"].setText(f"{port} 已拔出，等待重新连接")
+        widgets["connect_button"].setText("连接")
+
+    def reconnected(self, role, port):
+        widgets = self.role_widgets[role]
+        widgets["status"].setText(f"已重新连接到 {port}")
+        widgets["connect_button"].setText("断开")
+
+    def toggle_connection(self, role):
+        """切换指定角色的串口连接或断开"""
+        widgets = self.role_widgets[role]
+        port = widgets["port_combo"].currentText()
+
+        self.inventory.forget(role)  # 手动操作后不再自动重连
+        if not self.serial_manager.get_connection_status(role):  # 当前没有连接
+            try:
+                success = self.serial_manager.connect(port, name=role)
+            except Exception as e:
+                widgets["status"].setText(f"无法连接: {str(e)}")
+                return
             if success:
-                self.status_label.setText(f"已连接到 {port}")
-                self.connect_button.setText("断开")
+                widgets["status"].setText(f"已连接到 {port}")
+                widgets["connect_button"].setText("断开")
             else:
-                self.status_label.setText(f"无法连接到 {port}")
+                widgets["status"].setText(f"无法连接到 {port}")
         else:  # 当前已连接
-            self.serial_manager.disconnect()
-            self.status_label.setText("已断开连接")
-            self.connect_button.setText("连接")
+            self.serial_manager.disconnect(role)
+            widgets["status"].setText("已断开连接")
+            widgets["connect_button"].setText("连接")
@@ -0,0 +1,233 @@
+"""
+热台温控器总线驱动：帧构造、应答解析和后台轮询线程。
+只依赖 QtCore，界面（retai）和无界面守护进程（daemon）共用
+"""
+import struct
+from collections import namedtuple
+from concurrent.futures import Future
+from PyQt5.QtCore import QThread, pyqtSignal
+from log_levels import DEBUG, WARNING, ERROR
+from serial_worker import PRIORITY_USER
+from poll_scheduler import AdaptivePollScheduler
+
+RESPONSE_LENGTH = 10  # 读参数应答：测量值、设定值、输出值/报警、参数值、校验码
+RESPONSE_TIMEOUT = 1.0  # 应答超时（秒）
+DISCOVERY_TIMEOUT = 0.2  # 发现温控器时每个地址的等待时间（秒），空地址只等这么久
+
+# 自适应轮询：温度变化的温控器每秒读取一次，稳定后逐步放慢到最大周期（秒）
+POLL_MIN_INTERVAL = 1.0
+POLL_MAX_INTERVAL = 5.0
+POLL_CHANGE_THRESHOLD = 0.1  # 温度变化超过 0.1°C 视为变化
+POLL_WAKEUP_INTERVAL = 50  # 最长休眠（毫秒）
+
+MIN_CONTROLLER_ADDRESS = 0
+MAX_CONTROLLER_ADDRESS = 80  # 温控器可设置的最大地址
+DEFAULT_END_ADDRESS = 0x10  # 默认发现范围 0x01-0x10
+PARAM_SV = 0x00  # 设定值参数
+STATUS_PARAM = 0x1B  # 轮询时随状态块一起读回的参数
+
+# 报警状态字节的各位
+ALARM_FLAGS = (
+    (0x01, "上限报警"),
+    (0x02, "下限报警"),
+    (0x04, "正偏差报警"),
+    (0x08, "负偏差报警"),
+    (0x10, "输入超量程"),
+    (0x20, "AL1 动作"),
+    (0x40, "AL2 动作"),
+)
+
+# 一次读/写应答中的完整状态块；温度单位为 °C，output 为输出百分比，alarm 为报警状态字节
+HotPlateStatus = namedtuple("HotPlateStatus", ["address", "pv", "sv", "output", "alarm", "param_code", "param_value"])
+
+
+def calculate_checksum(command_type, param_code, addr, value=0):
+    """
+    根据给定的校验码计算方式计算校验码
+    :param command_type: 指令类型（"read" 或 "write"）
+    :param param_code: 参数代码
+    :param addr: 地址
+    :param value: 写入的值（仅对写命令有效）
+    :return: 校验和的低字节和高字节
+    """
+    if command_type == "read":
+        checksum = param_code * 256 + 0x52 + addr
+    elif command_type == "write":
+        checksum = param_code * 256 + 0x43 + value + addr
+    else:
+        raise ValueError("Invalid command type")
+    
+    checksum &= 0xFFFF
+    return checksum & 0xFF, (checksum >> 8) & 0xFF
+
+
+def build_read_frame(addr, param_code):
+    """构造读参数指令"""
+    checksum_low, checksum_high = calculate_checksum("read", param_code, addr)
+    return bytes([addr + 0x80, addr + 0x80, 0x52, param_code, 0x00, 0x00, checksum_low, checksum_high])
+
+
+def build_write_frame(addr, param_code, value):
+    """构造写参数指令，value 为带符号的 16 位整数"""
+    if not -0x8000 <= value <= 0x7FFF:
+        raise ValueError(f"参数值超出范围: {value}")
+    raw = value & 0xFFFF
+    checksum_low, checksum_high = calculate_checksum("write", param_code, addr, raw)
+    return bytes([addr + 0x80, addr + 0x80, 0x43, param_code, raw & 0xFF, raw >> 8, checksum_low, checksum_high])
+
+
+def to_signed(raw):
+    return raw - 0x10000 if raw & 0x8000 else raw
+
+
+def parse_status(addr, param_code, data):
+    """
+    解析 10 字节应答（均为小端）：测量值、设定值、输出值 + 报警状态、参数值、校验和；
+    校验和为前四个字与地址之和，长度不符或校验失败时返回 None
+    """
+    if not data or len(data) != RESPONSE_LENGTH:
+        return None
+    pv, sv, output_alarm, param_value, checksum = struct.unpack("<5H", data)
+    if (pv + sv + output_alarm + param_value + addr) & 0xFFFF != checksum:
+        return None
+    return HotPlateStatus(addr, to_signed(pv) / 10.0, to_signed(sv) / 10.0, output_alarm & 0xFF, output_alarm >> 8,
+                          param_code, to_signed(param_value))
+
+
+def alarm_text(alarm):
+    return "、".join(name for bit, name in ALARM_FLAGS if alarm & bit) or "无"
+
+
+class HotPlatePoller(QThread):
+    """
+    后台轮询线程：先在地址范围内发现温控器（或使用给定的地址），之后所有温控器共用一个自适应调度依次读取；
+    每次读取都解析完整的状态块，不需要额外查询，每个轮询周期通过信号报告一次，串口阻塞不影响界面
+    """
+    snapshot_signal = pyqtSignal(object)  # (HotPlateStatus, ...)，每个轮询周期一次
+    discovery_signal = pyqtSignal(object)  # HotPlateStatus：新发现的温控器及其首次读数
+    scan_finished_signal = pyqtSignal(int)  # 发现的温控器数量
+    log_signal = pyqtSignal(str, int, str)  # 日志文本, 级别, 设备
+
+    def __init__(self, connection, addresses=None, start_address=0x01, end_address=DEFAULT_END_ADDRESS,
+                 min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL, recorder=None):
+        """
+        :param addresses: 温控器地址列表；为 None 时在 start_address..end_address 范围内自动发现
+        """
+        super().__init__()
+        self.connection = connection  # 热台总线，由串口池的 I/O 线程收发
+        self.scheduler = AdaptivePollScheduler(min_interval, max_interval, threshold=POLL_CHANGE_THRESHOLD)
+        self.addresses = addresses
+        if addresses is not None:
+            for addr in addresses:
+                self.scheduler.add(addr)
+        self.start_address = max(MIN_CONTROLLER_ADDRESS, start_address)
+        self.end_address = min(MAX_CONTROLLER_ADDRESS, end_address)
+        self.recorder = recorder
+        self.verbose = False  # 关闭时不生成报文十六进制日志
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        if self.addresses is None:
+            self.discover()
+        while self.running:
+            statuses = []
+            for addr in self.scheduler.due():
+                if not self.running:
+                    break
+                status = self.send_read_command(addr)
+                if status is not None:
+                    self.scheduler.report(addr, status[1:5])
+                    statuses.append(status)
+                else:
+                    self.scheduler.report_failure(addr)
+            if statuses:
+                self.snapshot_signal.emit(tuple(statuses))
+            wait = self.scheduler.time_until_next()
+            self.msleep(POLL_WAKEUP_INTERVAL if wait is None else min(int(wait * 1000), POLL_WAKEUP_INTERVAL))
+
+    def discover(self):
+        """
+        逐个地址读取一次状态块，有有效应答的地址加入轮询调度
+        """
+        found = 0
+        for addr in range(self.start_address, self.end_address + 1):
+            if not self.running:
+                break
+            status = self.send_read_command(addr, DISCOVERY_TIMEOUT, probing=True)
+            if status is not None:
+                found += 1
+                self.scheduler.add(addr)
+                self.discovery_signal.emit(status)
+        self.scan_finished_signal.emit(found)
+
+    def send_read_command(self, addr, timeout=RESPONSE_TIMEOUT, probing=False):
+        """发送读取命令，返回 HotPlateStatus，失败时返回 None；probing 为 True 时失败不记警告也不计入错误统计"""
+        try:
+            data = build_read_frame(addr, STATUS_PARAM)
+            # flush=True：丢弃上一个温控器迟到的应答，发现时每个地址只等很短时间，迟到应答尤其常见
+            response = self.connection.transact(data, RESPONSE_LENGTH, timeout=timeout, flush=True, device=addr)
+            if self.verbose:
+                self.log_signal.emit(f"发送: {data.hex().upper()}", DEBUG, f"0x{addr:02X}")
+            return self.read_response(addr, STATUS_PARAM, response, probing)
+        except Exception as e:
+            self.log_signal.emit(f"发送失败: {str(e)}", ERROR, f"0x{addr:02X}")
+        return None
+
+    def read_response(self, addr, param_code, data, probing=False):
+        """解析返回的状态块并记录，返回 HotPlateStatus，失败时返回 None"""
+        try:
+            if data and len(data) == RESPONSE_LENGTH:
+                if self.verbose:
+                    self.log_signal.emit(f"接收: {data.hex().upper()}", DEBUG, f"0x{addr:02X}")
+                status = parse_status(addr, param_code, data)
+                if status is None:
+                    if not probing:
+                        self.connection.stats.record_crc_error(addr)
+                        self.log_signal.emit("接收数据校验错误", WARNING, f"0x{addr:02X}")
+                    return None
+                self.record(status)
+                return status
+            elif not probing:
+                self.log_signal.emit("接收数据不完整", WARNING, f"0x{addr:02X}")
+        except Exception as e:
+            self.log_signal.emit(f"接收失败: {str(e)}", ERROR, f"0x{addr:02X}")
+        return None
+
+    def record(self, status):
+        if self.recorder is not None:
+            device = f"hotplate/{status.address:02X}"
+            self.recorder.record(device, "pv", status.pv)
+            self.recorder.record(device, "sv", status.sv)
+            self.recorder.record(device, "output", status.output)
+            self.recorder.record(device, "alarm", status.alarm)
+
+    def write_setpoint(self, addr, value):
+        """
+        写入设定值（°C），见 write_parameter
+        """
+        return self.write_parameter(addr, PARAM_SV, int(round(value * 10)))
+
+    def write_parameter(self, addr, param_code, value):
+        """
+        以用户优先级插队写入参数，可在任意线程调用；返回 Future，结果为写入后的 HotPlateStatus，
+        未收到应答或参数值未生效时为 None。写入成功后该温控器立即按最快周期轮询
+        """
+        result = Future()
+        future = self.connection.submit(build_write_frame(addr, param_code, value), RESPONSE_LENGTH,
+                                        priority=PRIORITY_USER, timeout=RESPONSE_TIMEOUT, device=addr)
+        future.add_done_callback(lambda f: self.write_finished(f, addr, param_code, value, result))
+        return result
+
+    def write_finished(self, future, addr, param_code, value, result):
+        status = None
+        if not future.cancelled() and future.exception() is None:
+            status = parse_status(addr, param_code, future.result())
+        if status is not None and status.param_value == value:
+            self.record(status)
+            self.scheduler.boost(addr)
+            result.set_result(status)
+        else:
+            result.set_result(None)
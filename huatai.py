@@ -1,40 +1,71 @@
 import sys
-import serial
-import serial.tools.list_ports
-import json
+import os
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QTextEdit, QPushButton, QLabel, QHBoxLayout, 
+    QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout, 
     QComboBox, QLineEdit, QFormLayout
 )
-from PyQt5.QtCore import QTimer
+from log_console import LogConsole, INFO, WARNING, ERROR
+from serial_manager import SerialManager, ROLE_SLIDE
+from settings_store import SettingsStore, DEFAULT_DIRECTORY
+from slide_motion import SlideController
+
+POSITIONS_PATH = os.path.join(DEFAULT_DIRECTORY, "positions.json")
+STATION_FEED = "feed"  # 进料工位
+STATION_UNLOAD = "unload"  # 退料工位
+
+
+class PositionStore(SettingsStore):
+    """
+    滑台工位位置：{"stations": {工位名称: 位置}}，可保存任意数量的命名工位；
+    读取旧格式（feed_position / unload_position）时自动转换
+    """
+    def __init__(self, path=POSITIONS_PATH):
+        super().__init__(path)
+        if "stations" not in self.data:
+            self.data = {"stations": {
+                STATION_FEED: self.data.get("feed_position", 0),
+                STATION_UNLOAD: self.data.get("unload_position", 0),
+            }}
+
+    def stations(self):
+        return dict(self.get("stations", {}))
+
+    def station(self, name, default=0):
+        return self.stations().get(name, default)
+
+    def set_stations(self, positions):
+        """
+        更新若干工位位置，延迟写盘
+        """
+        stations = self.stations()
+        stations.update(positions)
+        self.set("stations", stations)
 
-# 读取和保存位置到文件
-def load_positions():
-    try:
-        with open('positions.json', 'r') as f:
-            data = json.load(f)
-            return data.get('feed_position', 0), data.get('unload_position', 0)
-    except FileNotFoundError:
-        return 0, 0
-
-def save_positions(feed_position, unload_position):
-    with open('positions.json', 'w') as f:
-        json.dump({'feed_position': feed_position, 'unload_position': unload_position}, f)
 
 class SerialCommunication(QWidget):
-    def __init__(self, serial_manager):
+    def __init__(self, serial_manager, recorder=None):
         super().__init__()
         self.serial_manager = serial_manager
+        self.connection = serial_manager.connection(ROLE_SLIDE)  # 滑台独占一条总线
+        self.recorder = recorder  # 可选的遥测记录器
         self.setWindowTitle("串口控制")
         self.resize(600, 400)
 
         # 加载位置
-        self.feed_position, self.unload_position = load_positions()
+        self.positions = PositionStore()
+        self.feed_position = self.positions.station(STATION_FEED)
+        self.unload_position = self.positions.station(STATION_UNLOAD)
 
         # 创建界面
         self.init_ui()
 
-        self.timer = QTimer()
+        # 运动控制线程：执行运动并查询实时位置
+        self.controller = SlideController(self.connection, recorder=recorder)
+        self.controller.position_signal.connect(self.update_position)
+        self.controller.arrived_signal.connect(self.move_arrived)
+        self.controller.sequence_finished_signal.connect(self.sequence_finished)
+        self.controller.error_signal.connect(lambda message: self.log_console.log(message, ERROR))
+        self.controller.start()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -55,47 +86,58 @@ class SerialCommunication(QWidget):
         layout.addWidget(self.feed_button)
         layout.addWidget(self.unload_button)
 
-        # 显示发送和接收数据
-        self.send_text = QTextEdit()
-        self.receive_text = QTextEdit()
-        self.send_text.setReadOnly(True)
-        self.receive_text.setReadOnly(True)
-        layout.addWidget(QLabel("发送数据："))
-        layout.addWidget(self.send_text)
-        layout.addWidget(QLabel("接收数据："))
-        layout.addWidget(self.receive_text)
+        # 送料后自动退料，到位即切换下一段
+        self.cycle_button = QPushButton("送料并退料")
+        self.cycle_button.clicked.connect(self.send_cycle_command)
+        layout.addWidget(self.cycle_button)
 
-        self.setLayout(layout)
+        # 实时位置
+        self.position_label = QLabel("当前位置：--")
+        layout.addWidget(self.position_label)
 
-    def scan_ports(self):
-        ports = serial.tools.list_ports.comports()
-        self.port_combo.clear()
-        for port in ports:
-            self.port_combo.addItem(port.device)
+        # 通信日志
+        self.log_console = LogConsole()
+        layout.addWidget(QLabel("通信日志："))
+        layout.addWidget(self.log_console)
+
+        self.setLayout(layout)
 
     def send_feed_command(self):
         feed_position = int(self.feed_position_input.text())
-        frame = [0x01, 0xFD, 0x01, 0x00, 0x50, 0x01, 0x00, 0x00, feed_position >> 8, feed_position & 0xFF, 0x01, 0x00, 0x6B]
-        self.send_command(frame, "送料中")
+        self.send_command([feed_position], "送料中")
 
     def send_unload_command(self):
         unload_position = int(self.unload_position_input.text())
-        frame = [0x01, 0xFD, 0x01, 0x00, 0x50, 0x01, 0x00, 0x00, unload_position >> 8, unload_position & 0xFF, 0x01, 0x00, 0x6B]
-        self.send_command(frame, "退料中")
-
-    def send_command(self, frame, action):
-        if self.serial_manager.get_connection_status():
-            data = bytes(frame)
-            self.serial_manager.send_data(data)
-            self.send_text.append(f"发送数据: {data.hex().upper()}")
-            self.receive_text.append(f"{action}: {data.hex().upper()}")
-            # 保存最新位置
-            save_positions(int(self.feed_position_input.text()), int(self.unload_position_input.text()))
+        self.send_command([unload_position], "退料中")
+
+    def send_cycle_command(self):
+        feed_position = int(self.feed_position_input.text())
+        unload_position = int(self.unload_position_input.text())
+        self.send_command([feed_position, unload_position], "送料并退料")
+
+    def send_command(self, positions, action):
+        if self.connection.get_connection_status():
+            self.controller.run_sequence(positions)
+            self.log_console.log(f"{action}: 目标位置 {', '.join(map(str, positions))}", INFO)
+            # 保存最新位置（合并连续修改，后台原子写入）
+            self.positions.set_stations({
+                STATION_FEED: int(self.feed_position_input.text()),
+                STATION_UNLOAD: int(self.unload_position_input.text()),
+            })
         else:
-            self.status_label.setText("请先连接串口")
+            self.log_console.log("请先连接串口", WARNING)
+
+    def update_position(self, position):
+        self.position_label.setText(f"当前位置：{position}")
+
+    def move_arrived(self, position):
+        self.log_console.log(f"已到达位置 {position}")
+
+    def sequence_finished(self):
+        self.log_console.log("运动完成")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = SerialCommunication()
+    window = SerialCommunication(SerialManager())
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,118 @@
+"""
+各标签页共用的日志控件：行数有上限，按显示帧率批量刷新，支持按级别和设备过滤
+"""
+from collections import deque
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QComboBox, QCheckBox
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QTextCursor
+from log_levels import DEBUG, INFO, WARNING, ERROR, LEVEL_NAMES
+
+DEFAULT_MAX_LINES = 2000
+DEFAULT_FLUSH_INTERVAL = 100  # 刷新间隔（毫秒）
+ALL_DEVICES = "全部设备"
+
+
+class LogConsole(QWidget):
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, flush_interval=DEFAULT_FLUSH_INTERVAL, verbose=False):
+        super().__init__()
+        self.entries = deque(maxlen=max_lines)  # (级别, 设备, 文本)，过滤条件变化时据此重绘
+        self.pending = deque()  # 等待下一次刷新的日志，deque.append 可在任意线程调用
+        self.verbose = verbose
+        self.min_level = DEBUG if verbose else INFO
+        self.device_filter = None
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        filter_layout = QHBoxLayout()
+
+        self.level_combo = QComboBox()
+        for level, name in LEVEL_NAMES.items():
+            self.level_combo.addItem(name, level)
+        self.level_combo.setCurrentIndex(self.level_combo.findData(self.min_level))
+        self.level_combo.currentIndexChanged.connect(self.change_filter)
+
+        self.device_combo = QComboBox()
+        self.device_combo.addItem(ALL_DEVICES)
+        self.device_combo.currentIndexChanged.connect(self.change_filter)
+
+        self.verbose_check = QCheckBox("报文跟踪")
+        self.verbose_check.setChecked(verbose)
+        self.verbose_check.toggled.connect(self.set_verbose)
+
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addWidget(self.device_combo)
+        filter_layout.addWidget(self.verbose_check)
+        layout.addLayout(filter_layout)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(max_lines)
+        layout.addWidget(self.text)
+        self.setLayout(layout)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(flush_interval)
+
+    def log(self, text, level=INFO, device=None):
+        """
+        记录一行日志，下一次刷新时显示
+        """
+        self.pending.append((level, device, text))
+
+    def append(self, text):
+        """
+        兼容 QTextEdit.append 的写法
+        """
+        self.log(text)
+
+    def trace(self, device, prefix, data):
+        """
+        报文十六进制跟踪；未开启详细模式时直接返回，不做任何格式化
+        """
+        if self.verbose:
+            self.log(f"{prefix}: {data.hex().upper()}", DEBUG, device)
+
+    def set_verbose(self, verbose):
+        self.verbose = verbose
+        if verbose and self.min_level > DEBUG:
+            self.level_combo.setCurrentIndex(self.level_combo.findData(DEBUG))
+
+    def accepts(self, level, device):
+        return level >= self.min_level and (self.device_filter is None or device == self.device_filter)
+
+    def format(self, level, device, text):
+        if device is None:
+            return text
+        return f"[{device}] {text}"
+
+    def flush(self):
+        """
+        把积压的日志一次性追加到文本框
+        """
+        if not self.pending:
+            return
+        lines = []
+        while self.pending:
+            level, device, text = entry = self.pending.popleft()
+            self.entries.append(entry)
+            if device is not None and self.device_combo.findText(device) < 0:
+                self.device_combo.addItem(device)
+            if self.accepts(level, device):
+                lines.append(self.format(level, device, text))
+        if lines:
+            self.text.appendPlainText("\n".join(lines))
+
+    def change_filter(self):
+        self.min_level = self.level_combo.currentData()
+        device = self.device_combo.currentText()
+        self.device_filter = None if device == ALL_DEVICES else device
+        self.text.setPlainText("\n".join(
+            self.format(level, device, text) for level, device, text in self.entries if self.accepts(level, device)
+        ))
+        self.text.moveCursor(QTextCursor.End)
+
+    def clear(self):
+        self.entries.clear()
+        self.pending.clear()
+        self.text.clear()
@@ -0,0 +1,8 @@
+"""
+日志级别：驱动线程通过信号报告级别，界面的日志控件按级别过滤；这里不依赖 Qt，守护进程也可导入
+"""
+DEBUG = 10  # 报文十六进制跟踪，仅在详细模式下产生
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "调试", INFO: "信息", WARNING: "警告", ERROR: "错误"}
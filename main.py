@@ -1,10 +1,23 @@
+import time
+STARTED = time.perf_counter()  # 进程启动时刻，用于测量首个窗口的显示耗时
+
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QDesktopWidget
-from retai import ModbusRTUMaster
-from qibeng import ModbusScannerApp
-from huatai import SerialCommunication  
+import importlib
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QDesktopWidget, QWidget
+from PyQt5.QtCore import QTimer
 from home import HomePage
+from port_inventory import shared_inventory
 from serial_manager import SerialManager
+from recorder import TelemetryRecorder
+
+# 除首页外的标签页在第一次切换到时才导入模块并创建（QtChart 等较重的模块随之延后加载）
+# (标题, 模块, 类, 是否传入记录器)
+LAZY_TABS = [
+    ("热台", "retai", "ModbusRTUMaster", True),
+    ("气泵", "qibeng", "ModbusScannerApp", True),
+    ("滑台", "huatai", "SerialCommunication", True),
+    ("诊断", "diagnostics", "DiagnosticsPage", False),
+]
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -12,21 +25,29 @@ class MainWindow(QMainWindow):
         
         # 创建一个串口管理器实例
         self.serial_manager = SerialManager()
+
+        # 共用的串口清单：适配器拔出后自动断开，重新插入后自动重连
+        shared_inventory().attach(self.serial_manager)
+
+        # 所有标签页共用的遥测记录器
+        self.recorder = TelemetryRecorder()
         
         # 创建 QTabWidget
         self.tab_widget = QTabWidget()
         
         # 首页（串口管理）
         self.home_page = HomePage(self.serial_manager)
-        
-        self.qibeng = ModbusScannerApp(self.serial_manager)
-        self.huatai = SerialCommunication(self.serial_manager)
-        # 创建页面并将它们添加到 QTabWidget
         self.tab_widget.addTab(self.home_page, "首页")
-        self.tab_widget.addTab(ModbusRTUMaster(), "热台")
-        self.tab_widget.addTab(self.qibeng, "气泵")
-        self.tab_widget.addTab(self.huatai, "滑台")
-        
+
+        # 其余标签页先放占位控件
+        self.pages = {}  # 模块名 -> 已创建的页面
+        self.placeholders = {}  # 占位控件 -> 标签页定义
+        for spec in LAZY_TABS:
+            placeholder = QWidget()
+            self.placeholders[placeholder] = spec
+            self.tab_widget.addTab(placeholder, spec[0])
+        self.tab_widget.currentChanged.connect(self.build_tab)
+
         # 设置主窗口的中央小部件
         self.setCentralWidget(self.tab_widget)
 
@@ -37,6 +58,44 @@ class MainWindow(QMainWindow):
         self.resize(800, 600)  # 设置窗口大小
         self.center()          # 调用居中方法
 
+    def build_tab(self, index):
+        """第一次切换到某个标签页时创建页面，替换占位控件"""
+        spec = self.placeholders.pop(self.tab_widget.widget(index), None)
+        if spec is None:
+            return
+        title, module_name, class_name, with_recorder = spec
+        page_class = getattr(importlib.import_module(module_name), class_name)
+        if with_recorder:
+            page = page_class(self.serial_manager, self.recorder)
+        else:
+            page = page_class(self.serial_manager)
+        self.pages[module_name] = page
+
+        placeholder = self.tab_widget.widget(index)
+        self.tab_widget.blockSignals(True)  # 替换过程中不再触发 currentChanged
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, page, title)
+        self.tab_widget.setCurrentIndex(index)
+        self.tab_widget.blockSignals(False)
+        placeholder.deleteLater()
+
+    def closeEvent(self, event):
+        """关闭窗口时先停止已创建页面的驱动线程，再断开串口，最后写完剩余的记录"""
+        qibeng = self.pages.get("qibeng")
+        if qibeng is not None:
+            qibeng.stop_scan()
+        retai = self.pages.get("retai")
+        if retai is not None:
+            retai.stop_polling()
+        huatai = self.pages.get("huatai")
+        if huatai is not None:
+            huatai.controller.stop()
+            huatai.controller.wait()
+            huatai.positions.close()
+        self.serial_manager.disconnect_all()
+        self.recorder.close()
+        super().closeEvent(event)
+
     def center(self):
         """让窗口显示在屏幕中央"""
         # 获取屏幕的矩形对象
@@ -49,7 +108,28 @@ class MainWindow(QMainWindow):
         self.move(window_geometry.topLeft())
 
 if __name__ == "__main__":
+    if "--headless" in sys.argv:
+        # 无界面模式：只运行采集守护进程，界面可用 --connect 作为客户端另行连接
+        import daemon
+        sys.exit(daemon.main([arg for arg in sys.argv[1:] if arg != "--headless"]))
     app = QApplication(sys.argv)
-    main_window = MainWindow()
+    if "--connect" in sys.argv:
+        # 客户端模式：不打开串口，连接正在运行的守护进程，python main.py --connect tcp://127.0.0.1:5020
+        from remote_monitor import RemoteMonitor
+        from stream_protocol import DEFAULT_ADDRESS
+        index = sys.argv.index("--connect") + 1
+        main_window = RemoteMonitor(sys.argv[index] if index < len(sys.argv) else DEFAULT_ADDRESS)
+        main_window.resize(800, 600)
+    else:
+        main_window = MainWindow()
     main_window.show()
+
+    if "--measure-startup" in sys.argv:
+        # 供 benchmark 使用：事件循环处理完第一批绘制事件后报告首个窗口的显示耗时并退出
+        def report_startup():
+            elapsed = time.perf_counter() - STARTED
+            print(f"首个窗口显示耗时: {elapsed * 1000:.0f} ms", flush=True)
+            main_window.close()
+            app.quit()
+        QTimer.singleShot(0, report_startup)
     sys.exit(app.exec_())
@@ -0,0 +1,71 @@
+"""
+ModBus RTU 事务层：在串口连接之上按地址和功能码匹配应答，丢弃残留字节重新同步，
+未收到有效应答时按有上限的指数退避重试；重试和重同步次数计入总线统计
+"""
+import threading
+from concurrent.futures import Future
+from modbus_rtu import MatchingFrameDecoder
+from serial_worker import PRIORITY_POLL
+
+DEFAULT_RETRIES = 2  # 首次之外的最多重试次数
+DEFAULT_BACKOFF = 0.02  # 第一次重试前的等待（秒），之后每次加倍
+MAX_BACKOFF = 0.2  # 重试等待的上限（秒）
+
+
+class ModbusClient:
+    def __init__(self, connection, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.connection = connection  # SerialConnection
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def submit(self, request, priority=PRIORITY_POLL, timeout=None, flush=False, retries=None):
+        """
+        异步执行一次请求，返回 Future：结果为匹配的应答帧（可能是异常应答），重试用尽仍失败或连接断开时为 None；
+        完成时 future.elapsed 为最后一次尝试的耗时。重试的等待由定时器完成，不占用 I/O 线程
+        """
+        result = Future()
+        result.elapsed = 0.0
+        self.attempt(bytes(request), priority, timeout, flush, self.retries if retries is None else retries, 0, result)
+        return result
+
+    def transact(self, request, priority=PRIORITY_POLL, timeout=None, flush=False, retries=None):
+        """
+        同步执行一次请求
+        """
+        return self.submit(request, priority, timeout, flush, retries).result()
+
+    def attempt(self, request, priority, timeout, flush, retries, attempt, result):
+        decoder = MatchingFrameDecoder(request[0], request[1])
+        # 重试前丢弃接收缓冲区，避免上一次迟到的应答再次干扰
+        future = self.connection.submit(request, priority=priority, timeout=timeout, flush=flush or attempt > 0,
+                                        decoder=decoder)
+        future.add_done_callback(
+            lambda f: self.finished(f, decoder, request, priority, timeout, flush, retries, attempt, result)
+        )
+
+    def finished(self, future, decoder, request, priority, timeout, flush, retries, attempt, result):
+        if future.cancelled() or future.exception() is not None:
+            result.set_result(None)  # 连接已断开，不重试
+            return
+
+        address = request[0]
+        stats = self.connection.stats
+        result.elapsed = getattr(future, "elapsed", 0.0)
+        if decoder.crc_error:
+            stats.record_crc_error(address)
+        elif decoder.discarded:
+            stats.record_resync(address)
+        if decoder.matched:
+            result.set_result(future.result())
+            return
+
+        if attempt < retries and self.connection.get_connection_status():
+            stats.record_retry(address)
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            timer = threading.Timer(delay, self.attempt,
+                                    (request, priority, timeout, flush, retries, attempt + 1, result))
+            timer.daemon = True
+            timer.start()
+        else:
+            result.set_result(None)
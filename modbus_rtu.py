@@ -0,0 +1,201 @@
+"""
+ModBus RTU 协议工具：CRC 校验、读请求规划与响应解析
+"""
+
+
+def calculate_checksum(data):
+    """
+    计算ModBus RTU CRC16校验和
+    """
+    crc = 0xFFFF
+    for pos in data:
+        crc ^= pos
+        for _ in range(8):
+            if crc & 0x0001:
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+    return crc.to_bytes(2, byteorder='little')  # ModBus CRC16要求小端序
+
+
+def plan_reads(registers, max_gap=4, max_count=125):
+    """
+    将需要读取的寄存器合并为尽量少的连续读取块
+    :param registers: 寄存器地址列表
+    :param max_gap: 两个寄存器之间允许顺带读取的最大空洞数
+    :param max_count: 单帧最多读取的寄存器数量（FC03 上限为 125）
+    :return: [(起始地址, 数量), ...]
+    """
+    blocks = []
+    for register in sorted(set(registers)):
+        if blocks:
+            start, count = blocks[-1]
+            gap = register - (start + count)
+            if gap <= max_gap and register - start + 1 <= max_count:
+                blocks[-1] = (start, register - start + 1)
+                continue
+        blocks.append((register, 1))
+    return blocks
+
+
+def build_read_request(address, start, count, function=0x03):
+    """
+    构造读寄存器请求帧（含 CRC）
+    """
+    data = bytearray([address, function]) + start.to_bytes(2, byteorder='big') + count.to_bytes(2, byteorder='big')
+    return data + calculate_checksum(data)
+
+
+def read_response_length(count):
+    """
+    读取 count 个寄存器时的正常响应长度：地址 + 功能码 + 字节数 + 数据 + CRC
+    """
+    return 5 + 2 * count
+
+
+def parse_read_response(address, response, count, function=0x03):
+    """
+    校验并解析读寄存器响应
+    :return: 寄存器值列表，校验失败时返回 None
+    """
+    if not response or len(response) != read_response_length(count):
+        return None
+    if response[0] != address or response[1] != function or response[2] != 2 * count:
+        return None
+    if response[-2:] != calculate_checksum(response[:-2]):
+        return None
+    return [int.from_bytes(response[3 + 2 * i:5 + 2 * i], byteorder='big') for i in range(count)]
+
+
+def character_time(baudrate, bits_per_char=11):
+    """
+    单个字符在总线上的传输时间（起始位 + 8 数据位 + 校验/停止位 = 11 位）
+    """
+    return bits_per_char / baudrate
+
+
+def silence_interval(baudrate):
+    """
+    帧间 3.5 字符静默时间；波特率高于 19200 时按规范固定为 1.75 ms
+    """
+    if baudrate > 19200:
+        return 0.00175
+    return 3.5 * character_time(baudrate)
+
+
+def response_timeout(baudrate, request_length, response_length, turnaround):
+    """
+    根据波特率估算一次事务的应答超时：请求发送时间 + 从站响应时间 + 应答传输时间 + 帧间静默
+    """
+    wire_time = (request_length + response_length) * character_time(baudrate)
+    return wire_time + turnaround + silence_interval(baudrate)
+
+
+class RTUFrameDecoder:
+    """
+    增量式 ModBus RTU 应答帧解析器：根据功能码和字节数推算帧长，数据到一段喂一段，
+    帧完整时立即返回；功能码未知时由调用方依据 3.5 字符静默判断帧结束
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def reset(self):
+        self.buffer.clear()
+
+    def expected_length(self):
+        """
+        返回完整帧长度，已收数据不足以判断时返回 None
+        """
+        if len(self.buffer) < 2:
+            return None
+        function = self.buffer[1]
+        if function & 0x80:
+            return 5  # 异常应答：地址 + 功能码 + 异常码 + CRC
+        if function in (0x01, 0x02, 0x03, 0x04):
+            if len(self.buffer) < 3:
+                return None
+            return 5 + self.buffer[2]
+        if function in (0x05, 0x06, 0x0F, 0x10):
+            return 8  # 写操作回显：地址 + 功能码 + 地址/数量 + 值 + CRC
+        return None
+
+    def feed(self, data):
+        """
+        追加收到的数据，帧完整时返回该帧，否则返回 None
+        """
+        self.buffer += data
+        length = self.expected_length()
+        if length is not None and len(self.buffer) >= length:
+            return bytes(self.buffer[:length])
+        return None
+
+    def pending(self):
+        """
+        已收到但尚未组成完整帧的数据
+        """
+        return bytes(self.buffer)
+
+
+class MatchingFrameDecoder(RTUFrameDecoder):
+    """
+    只接受与请求对应的应答：从站地址相同、功能码相同（或为其异常应答）且 CRC 正确。
+    缓冲区开头的残留数据（如上一次写操作迟到的回显、错位或损坏的字节）会被丢弃，
+    解析器重新同步后继续等待真正的应答，不必等到超时
+    """
+    def __init__(self, address, function):
+        super().__init__()
+        self.address = address
+        self.function = function
+        self.discarded = 0  # 丢弃的字节数
+        self.crc_error = False  # 是否丢弃过长度完整但 CRC 错误的本从站应答
+        self.matched = False
+
+    def skip(self, count):
+        del self.buffer[:count]
+        self.discarded += count
+
+    def feed(self, data):
+        self.buffer += data
+        while self.buffer:
+            if self.buffer[0] != self.address:
+                self.skip(1)
+                continue
+            if len(self.buffer) < 2:
+                return None
+            length = self.expected_length()
+            if length is None:
+                if self.buffer[1] in (0x01, 0x02, 0x03, 0x04):
+                    return None  # 还没收到字节数
+                self.skip(1)  # 不认识的功能码，不可能是帧头
+                continue
+            if len(self.buffer) < length:
+                return None
+            frame = bytes(self.buffer[:length])
+            if has_crc_error(frame):
+                if frame[1] & 0x7F == self.function:
+                    self.crc_error = True  # 很可能是应答本身在线路上损坏
+                self.skip(1)  # 错位或损坏，逐字节滑动寻找帧头
+            elif frame[1] & 0x7F != self.function:
+                self.skip(length)  # 本从站的另一帧完整应答，整帧丢弃
+            else:
+                self.matched = True
+                return frame
+        return None
+
+
+def has_crc_error(frame):
+    """
+    收到了完整长度的帧但 CRC 不符（区别于超时未应答）
+    """
+    return frame is not None and len(frame) >= 4 and frame[-2:] != calculate_checksum(frame[:-2])
+
+
+def is_exception_response(frame):
+    """
+    判断是否为 CRC 正确的异常应答帧
+    """
+    return (
+        frame is not None and len(frame) == 5 and frame[1] & 0x80
+        and frame[-2:] == calculate_checksum(frame[:-2])
+    )
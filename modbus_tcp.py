@@ -0,0 +1,446 @@
+"""
+网络传输：经以太网网关访问 ModBus 从站，替代本地串口
+
+    tcp://192.168.1.20:502?pipeline=4        ModBus TCP（MBAP 报文头，按事务号匹配应答，可流水线）
+    rtu+tcp://192.168.1.21:4001?baudrate=9600 RTU over TCP（透明转发 RTU 帧，相当于一个网络串口）
+
+两种传输都提供与 SerialIOWorker 相同的 submit 接口，由 SerialConnection 按地址选择，扫描和轮询代码不用修改。
+ModBus TCP 的请求和应答仍以 RTU 帧（带 CRC）的形式出入，报文转换在这里完成。
+同一网关的 ModBus TCP 连接在进程内共用（按主机和端口），多个角色同时使用时只保持一条 TCP 连接。
+"""
+import heapq
+import itertools
+import select
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlsplit, parse_qs
+from modbus_rtu import calculate_checksum
+from serial_worker import SerialIOWorker, PRIORITY_POLL
+
+SCHEME_TCP = "tcp"
+SCHEME_RTU_TCP = "rtu+tcp"
+MBAP = struct.Struct(">HHHB")  # 事务号, 协议号(0), 长度(单元号 + PDU), 单元号
+CONNECT_TIMEOUT = 3.0  # 建立 TCP 连接的超时（秒）
+DEFAULT_PIPELINE = 1  # 同时在途的事务数，网关支持时可在地址中用 pipeline= 调大
+RECONNECT_INTERVAL = 1.0  # 连接断开后两次重连尝试的最小间隔（秒）
+
+
+def is_network_url(port):
+    return port.startswith((SCHEME_TCP + "://", SCHEME_RTU_TCP + "://"))
+
+
+def parse_url(url):
+    """
+    :return: (协议, 主机, 端口, 选项字典)
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in (SCHEME_TCP, SCHEME_RTU_TCP) or not parts.hostname or not parts.port:
+        raise ValueError(f"无法识别的网络地址: {url}")
+    options = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    return parts.scheme, parts.hostname, parts.port, options
+
+
+def rtu_to_mbap(transaction_id, frame):
+    """
+    RTU 请求帧（地址 + PDU + CRC）转换为 ModBus TCP 报文
+    """
+    pdu = frame[1:-2]
+    return MBAP.pack(transaction_id, 0, len(pdu) + 1, frame[0]) + pdu
+
+
+def mbap_to_rtu(unit, pdu):
+    """
+    ModBus TCP 应答转换为带 CRC 的 RTU 帧，供现有的解析函数直接使用
+    """
+    frame = bytes([unit]) + pdu
+    return frame + calculate_checksum(frame)
+
+
+def open_transport(url, default_timeout, stats):
+    """
+    按地址打开网络传输
+    :return: (工作对象, 需要在断开时关闭的端口对象或 None)
+    """
+    scheme, host, port, options = parse_url(url)
+    if scheme == SCHEME_RTU_TCP:
+        socket_port = SocketPort(host, port, default_timeout, int(options.get("baudrate", 9600)))
+        return SerialIOWorker(socket_port, default_timeout, stats), socket_port
+    channel = POOL.acquire(host, port, int(options.get("pipeline", DEFAULT_PIPELINE)))
+    return ModbusTCPWorker(channel, default_timeout, stats), None
+
+
+# ---- RTU over TCP ----
+
+class SocketPort:
+    """
+    把 TCP 连接包装成 SerialIOWorker 需要的串口接口（read/write/in_waiting/reset_input_buffer/timeout）
+    """
+    def __init__(self, host, port, timeout, baudrate=9600):
+        self.address = (host, port)
+        self.sock = None
+        self.last_attempt = 0.0
+        self.buffer = bytearray()
+        self.timeout = timeout
+        self.baudrate = baudrate  # 网关串口侧的波特率，用于推算静默间隔
+        self.is_open = True
+        self.connect()  # 首次连接失败时抛出异常，与打不开串口相同
+
+    def connect(self):
+        self.last_attempt = time.monotonic()
+        sock = socket.create_connection(self.address, CONNECT_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setblocking(False)
+        self.sock = sock
+
+    def ensure_connected(self):
+        """
+        网关断开后在下一次写入时重连，两次尝试至少间隔 RECONNECT_INTERVAL；返回是否已连接
+        """
+        if self.sock is None and time.monotonic() - self.last_attempt >= RECONNECT_INTERVAL:
+            try:
+                self.connect()
+            except OSError:
+                pass
+        return self.sock is not None
+
+    def drop(self):
+        """
+        网关断开：关闭套接字，之后的读取像没有应答的串口一样超时，写入时重连
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.buffer.clear()
+
+    def fill(self, timeout):
+        if self.sock is None:
+            time.sleep(timeout)
+            return
+        try:
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if readable:
+                data = self.sock.recv(4096)
+                if not data:
+                    self.drop()
+                    return
+                self.buffer += data
+        except OSError:
+            self.drop()
+
+    @property
+    def in_waiting(self):
+        self.fill(0)
+        return len(self.buffer)
+
+    def read(self, size=1):
+        if not self.buffer:
+            self.fill(self.timeout)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def write(self, data):
+        if not self.ensure_connected():
+            return 0
+        self.sock.setblocking(True)
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            self.drop()
+            return 0
+        finally:
+            if self.sock is not None:
+                self.sock.setblocking(False)
+        return len(data)
+
+    def reset_input_buffer(self):
+        while self.in_waiting:
+            self.buffer.clear()
+
+    def close(self):
+        self.is_open = False
+        self.drop()
+
+
+# ---- ModBus TCP ----
+
+class Transaction:
+    __slots__ = ("priority", "sequence", "frame", "response_length", "timeout", "decoder", "device", "future",
+                 "stats", "owner", "transaction_id", "started", "deadline")
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class ModbusTCPChannel:
+    """
+    到一个网关的共享 TCP 连接：分配事务号，最多 pipeline 个事务同时在途，其余按优先级排队；
+    接收线程按事务号把应答交给对应的事务，超时的事务以空应答结束。连接断开后在下一个请求时重连
+    """
+    def __init__(self, host, port, pipeline=DEFAULT_PIPELINE):
+        self.host = host
+        self.port = port
+        self.pipeline = max(1, pipeline)
+        self.sock = None
+        self.lock = threading.RLock()  # 保护以下所有状态；Future 回调在持锁时执行，可能再次提交
+        self.waiting = []  # 排队中的事务（堆）
+        self.in_flight = {}  # 事务号 -> 事务
+        self.transaction_ids = itertools.count(1)
+        self.sequence = itertools.count()
+        self.references = 0
+        self.last_attempt = 0.0
+        self.running = True
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()  # 让接收线程立即处理新的截止时间
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+
+    def ensure_connected(self):
+        """
+        在持锁状态下调用；连接失败时抛出异常
+        """
+        if self.sock is not None:
+            return
+        now = time.monotonic()
+        if now - self.last_attempt < RECONNECT_INTERVAL:
+            raise ConnectionError(f"{self.host}:{self.port} 暂不可用")
+        self.last_attempt = now
+        sock = socket.create_connection((self.host, self.port), CONNECT_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.wake()
+
+    def wake(self):
+        """
+        让接收线程重新计算等待的套接字和截止时间；接收线程自身调用时不需要
+        """
+        if threading.current_thread() is self.reader:
+            return
+        try:
+            self.wakeup_writer.send(b"\0")
+        except OSError:
+            pass
+
+    def enqueue(self, transaction):
+        with self.lock:
+            transaction.sequence = next(self.sequence)
+            heapq.heappush(self.waiting, transaction)
+            self.dispatch()
+
+    def dispatch(self):
+        """
+        在持锁状态下调用：在途事务未满时发送排队的事务
+        """
+        sent = False
+        while self.waiting and len(self.in_flight) < self.pipeline:
+            transaction = heapq.heappop(self.waiting)
+            if transaction.future.cancelled():
+                continue
+            try:
+                self.ensure_connected()
+                transaction.transaction_id = next(self.transaction_ids) & 0xFFFF
+                transaction.started = time.perf_counter()
+                transaction.deadline = time.monotonic() + transaction.timeout
+                self.in_flight[transaction.transaction_id] = transaction
+                self.sock.sendall(rtu_to_mbap(transaction.transaction_id, transaction.frame))
+                sent = True
+            except OSError:
+                self.in_flight.pop(transaction.transaction_id, None)
+                self.drop_connection()
+                self.finish(transaction, b"", True)
+        if sent:
+            self.wake()
+
+    def drop_connection(self):
+        """
+        在持锁状态下调用：关闭连接，在途事务按超时结束
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        in_flight, self.in_flight = self.in_flight, {}
+        for transaction in in_flight.values():
+            self.finish(transaction, b"", True)
+
+    def finish(self, transaction, response, timed_out):
+        elapsed = time.perf_counter() - transaction.started if transaction.started else 0.0
+        if transaction.decoder is not None and response:
+            frame = transaction.decoder.feed(response)
+            response = frame if frame is not None else transaction.decoder.pending()
+        if transaction.stats is not None and (transaction.decoder is not None or transaction.response_length):
+            transaction.stats.record_transaction(transaction.device, elapsed, len(transaction.frame),
+                                                 len(response), timed_out)
+        future = transaction.future
+        future.elapsed = elapsed
+        if future.set_running_or_notify_cancel():
+            future.set_result(response)
+
+    def read_loop(self):
+        buffer = bytearray()
+        while self.running:
+            with self.lock:
+                sock = self.sock
+                deadline = min((t.deadline for t in self.in_flight.values()), default=None)
+            wait = 0.5 if deadline is None else max(0.0, min(0.5, deadline - time.monotonic()))
+            sockets = [self.wakeup_reader] + ([sock] if sock is not None else [])
+            try:
+                readable, _, _ = select.select(sockets, [], [], wait)
+            except (OSError, ValueError):
+                readable = []  # 连接刚被关闭
+            if self.wakeup_reader in readable:
+                self.wakeup_reader.recv(4096)
+            if sock is not None and sock in readable:
+                try:
+                    data = sock.recv(4096)
+                except OSError:
+                    data = b""
+                with self.lock:
+                    if not data:
+                        if sock is self.sock:
+                            self.drop_connection()
+                        buffer.clear()
+                    else:
+                        buffer += data
+                        self.take_responses(buffer)
+            with self.lock:
+                self.expire()
+                self.dispatch()
+
+    def take_responses(self, buffer):
+        """
+        在持锁状态下调用：取出缓冲区中所有完整的应答；未知事务号（已超时的迟到应答）直接丢弃
+        """
+        while len(buffer) >= MBAP.size:
+            transaction_id, protocol, length, unit = MBAP.unpack_from(buffer)
+            if protocol != 0 or length < 2:
+                # 报文头无效（长度至少含单元号和功能码），之后的字节无法再对齐：断开连接，在途事务按超时结束
+                buffer.clear()
+                self.drop_connection()
+                return
+            end = MBAP.size - 1 + length
+            if len(buffer) < end:
+                return
+            pdu = bytes(buffer[MBAP.size:end])
+            del buffer[:end]
+            transaction = self.in_flight.pop(transaction_id, None)
+            if transaction is not None:
+                self.finish(transaction, mbap_to_rtu(unit, pdu), False)
+
+    def expire(self):
+        now = time.monotonic()
+        for transaction_id, transaction in list(self.in_flight.items()):
+            if transaction.deadline <= now:
+                del self.in_flight[transaction_id]
+                self.finish(transaction, b"", True)
+
+    def release_owner(self, owner):
+        """
+        取消某个使用者尚在排队的事务
+        """
+        with self.lock:
+            remaining = []
+            for transaction in self.waiting:
+                if transaction.owner is owner:
+                    transaction.future.cancel()
+                else:
+                    remaining.append(transaction)
+            heapq.heapify(remaining)
+            self.waiting = remaining
+
+    def close(self):
+        with self.lock:
+            self.running = False
+            self.drop_connection()
+            for transaction in self.waiting:
+                transaction.future.cancel()
+            self.waiting = []
+        self.wake()
+        self.reader.join()
+        self.wakeup_reader.close()
+        self.wakeup_writer.close()
+
+
+class ConnectionPool:
+    """
+    按 (主机, 端口) 共用 ModbusTCPChannel，最后一个使用者释放时关闭
+    """
+    def __init__(self):
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, host, port, pipeline=DEFAULT_PIPELINE):
+        with self.lock:
+            channel = self.channels.get((host, port))
+            if channel is None:
+                channel = self.channels[(host, port)] = ModbusTCPChannel(host, port, pipeline)
+            else:
+                channel.pipeline = max(channel.pipeline, pipeline)
+            channel.references += 1
+        try:
+            with channel.lock:
+                channel.ensure_connected()  # 地址不可达时立即报错，与打开串口失败一致
+        except OSError:
+            self.release(channel)
+            raise
+        return channel
+
+    def release(self, channel):
+        with self.lock:
+            channel.references -= 1
+            if channel.references > 0:
+                return
+            self.channels.pop((channel.host, channel.port), None)
+        channel.close()
+
+
+POOL = ConnectionPool()
+
+
+class ModbusTCPWorker:
+    """
+    一个角色在共享连接上的工作对象，接口与 SerialIOWorker 相同
+    """
+    def __init__(self, channel, default_timeout, stats=None):
+        self.channel = channel
+        self.default_timeout = default_timeout
+        self.stats = stats
+
+    def start(self):
+        pass  # 接收线程属于共享连接
+
+    def submit(self, data, response_length=0, priority=PRIORITY_POLL, timeout=None, flush=False, decoder=None,
+               device=None):
+        """
+        参数与 SerialIOWorker.submit 相同；flush 对按事务号匹配的 TCP 没有意义，忽略
+        """
+        future = Future()
+        data = bytes(data)
+        if len(data) < 4:
+            # 只读或只清缓冲区的请求：TCP 上没有残留字节
+            future.elapsed = 0.0
+            future.set_result(b"")
+            return future
+        transaction = Transaction()
+        transaction.priority = priority
+        transaction.frame = data
+        transaction.response_length = response_length
+        transaction.timeout = self.default_timeout if timeout is None else timeout
+        transaction.decoder = decoder
+        transaction.device = data[0] if device is None else device
+        transaction.future = future
+        transaction.stats = self.stats
+        transaction.owner = self
+        transaction.transaction_id = None
+        transaction.started = None
+        transaction.deadline = None
+        self.channel.enqueue(transaction)
+        return future
+
+    def stop(self):
+        self.channel.release_owner(self)
+        POOL.release(self.channel)
+
+    def join(self):
+        pass
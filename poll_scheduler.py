@@ -0,0 +1,113 @@
+"""
+自适应轮询调度：数值在变化或刚写入设定值的设备按最小周期轮询，
+数值稳定的设备逐次放慢，直到最大周期，以便把总线带宽留给正在变化的回路
+"""
+import threading
+import time
+
+DEFAULT_BACKOFF = 1.5  # 数值未变化时周期的放大倍数
+
+
+class AdaptivePollScheduler:
+    def __init__(self, min_interval, max_interval, backoff=DEFAULT_BACKOFF, threshold=0):
+        """
+        :param min_interval: 默认最小轮询周期（秒）
+        :param max_interval: 默认最大轮询周期（秒）
+        :param backoff: 数值稳定时每次放大的倍数
+        :param threshold: 判定为“变化”的最小差值
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.threshold = threshold
+        self.devices = {}
+        self.lock = threading.Lock()  # boost 可能在界面线程中调用
+
+    def add(self, key, min_interval=None, max_interval=None):
+        """
+        加入设备，立即到期；可单独指定该设备的最小/最大周期
+        """
+        with self.lock:
+            self.devices[key] = {
+                "min": self.min_interval if min_interval is None else min_interval,
+                "max": self.max_interval if max_interval is None else max_interval,
+                "interval": self.min_interval if min_interval is None else min_interval,
+                "due": time.monotonic(),
+                "value": None,
+            }
+
+    def configure(self, key, min_interval, max_interval):
+        with self.lock:
+            device = self.devices[key]
+            device["min"], device["max"] = min_interval, max_interval
+            device["interval"] = min(max(device["interval"], min_interval), max_interval)
+
+    def remove(self, key):
+        with self.lock:
+            self.devices.pop(key, None)
+
+    def keys(self):
+        with self.lock:
+            return list(self.devices)
+
+    def due(self, now=None):
+        """
+        返回已到期的设备，最早到期的在前
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            ready = [(device["due"], key) for key, device in self.devices.items() if device["due"] <= now]
+        return [key for _, key in sorted(ready)]
+
+    def time_until_next(self, now=None):
+        """
+        距离下一个设备到期的秒数，没有设备时返回 None
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if not self.devices:
+                return None
+            return max(0.0, min(device["due"] for device in self.devices.values()) - now)
+
+    def changed(self, previous, value):
+        if previous is None:
+            return True
+        if isinstance(value, (tuple, list)):
+            return any(abs(a - b) > self.threshold for a, b in zip(previous, value))
+        return abs(value - previous) > self.threshold
+
+    def report(self, key, value, now=None):
+        """
+        记录一次成功的读数：有变化时回到最小周期，否则逐步放慢
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            device = self.devices.get(key)
+            if device is None:
+                return
+            if self.changed(device["value"], value):
+                device["interval"] = device["min"]
+            else:
+                device["interval"] = min(device["max"], device["interval"] * self.backoff)
+            device["value"] = value
+            device["due"] = now + device["interval"]
+
+    def report_failure(self, key, now=None):
+        """
+        读取失败时保持当前周期
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            device = self.devices.get(key)
+            if device is not None:
+                device["due"] = now + device["interval"]
+
+    def boost(self, key):
+        """
+        刚写入设定值等场合：立即轮询并回到最小周期
+        """
+        with self.lock:
+            device = self.devices.get(key)
+            if device is not None:
+                device["interval"] = device["min"]
+                device["due"] = time.monotonic()
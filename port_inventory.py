@@ -0,0 +1,166 @@
+"""
+串口清单：所有串口选择框共用的缓存。
+
+comports() 在部分工控机上需要数百毫秒，只在后台线程中执行；平时每秒列一次 /dev 下的串口设备节点，
+有变化时才重新枚举。已连接的适配器被拔出时断开对应角色并记住它，同一串口重新出现后自动重连。
+"""
+import os
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+MONITOR_INTERVAL = 1000  # 检查 /dev 的间隔（毫秒）
+FALLBACK_INTERVAL = 5.0  # 没有 /dev 的平台上完整枚举的间隔（秒）
+DEVICE_DIRECTORY = "/dev"
+DEVICE_PREFIXES = ("ttyUSB", "ttyACM", "ttyAMA", "ttyS", "rfcomm", "cu.")  # 串口设备节点的文件名前缀
+
+
+def list_port_names():
+    """
+    返回当前可用串口的设备名列表；pyserial 在这里才导入，不拖慢启动
+    """
+    import serial.tools.list_ports
+    return [port.device for port in serial.tools.list_ports.comports()]
+
+
+def device_signature():
+    """
+    /dev 下串口设备节点的集合，用于廉价地判断是否有适配器插拔；没有 /dev 时返回 None
+    """
+    try:
+        names = os.listdir(DEVICE_DIRECTORY)
+    except OSError:
+        return None
+    return frozenset(name for name in names if name.startswith(DEVICE_PREFIXES))
+
+
+class PortScanThread(QThread):
+    """
+    枚举一次串口后结束
+    """
+    ports_signal = pyqtSignal(list)  # 设备名列表
+
+    def run(self):
+        try:
+            ports = list_port_names()
+        except Exception:
+            ports = []
+        self.ports_signal.emit(ports)
+
+
+class PortInventory(QObject):
+    """
+    共享的串口清单，须在界面线程中创建；通过 shared_inventory() 获取
+    """
+    ports_changed = pyqtSignal(list)  # 完整的串口列表，仅在有变化时发出
+    scan_finished = pyqtSignal(list)  # 每次枚举结束
+    connection_lost = pyqtSignal(str, str)  # 角色, 串口：适配器被拔出，已自动断开
+    reconnected = pyqtSignal(str, str)  # 角色, 串口：适配器重新出现，已自动重连
+
+    def __init__(self, interval=MONITOR_INTERVAL):
+        super().__init__()
+        self.ports = []  # 最近一次枚举的结果
+        self.scanned = False
+        self.serial_manager = None
+        self.lost = {}  # 角色 -> (串口, 波特率)，等待重连
+        self.signature = device_signature()
+        self.scan_thread = None
+        self.rescan_pending = False
+        self.since_scan = 0.0
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check)
+        self.timer.start(interval)
+        self.refresh()
+
+    def attach(self, serial_manager):
+        """
+        监视该串口池中的连接，适配器拔出后自动断开、重新插入后自动重连
+        """
+        self.serial_manager = serial_manager
+
+    def refresh(self):
+        """
+        在后台重新枚举串口；正在枚举时合并为结束后再枚举一次
+        """
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.rescan_pending = True
+            return
+        self.since_scan = 0.0
+        self.scan_thread = PortScanThread()
+        self.scan_thread.ports_signal.connect(self.update_ports)
+        self.scan_thread.start()
+
+    def update_ports(self, ports):
+        self.scanned = True
+        if ports != self.ports:
+            self.ports = ports
+            self.ports_changed.emit(list(ports))
+        self.scan_finished.emit(list(ports))
+        if self.rescan_pending:
+            self.rescan_pending = False
+            self.refresh()
+        self.check_connections()
+
+    def present(self, port):
+        """
+        串口是否存在：设备路径直接检查文件，COM 口等名称按缓存判断；网络地址不受插拔影响。
+        第一次枚举完成前缓存为空，此时 COM 口等名称一律视为存在，避免刚打开的串口被当作拔出
+        """
+        if "://" in port:
+            return True
+        if port.startswith("/"):
+            return os.path.exists(port)
+        return not self.scanned or port in self.ports
+
+    def check(self):
+        signature = device_signature()
+        if signature is None:
+            self.since_scan += self.timer.interval() / 1000.0
+            if self.since_scan >= FALLBACK_INTERVAL:
+                self.refresh()
+        elif signature != self.signature:
+            self.signature = signature
+            self.refresh()
+        self.check_connections()
+
+    def check_connections(self):
+        if self.serial_manager is None:
+            return
+        for connection in self.serial_manager.connected():
+            if not self.present(connection.port):
+                self.lost[connection.name] = (connection.port, connection.baudrate)
+                try:
+                    self.serial_manager.disconnect(connection.name)
+                except Exception:
+                    pass  # 设备已消失，关闭时的错误可以忽略
+                self.connection_lost.emit(connection.name, connection.port)
+
+        for role, (port, baudrate) in list(self.lost.items()):
+            if self.serial_manager.get_connection_status(role):
+                del self.lost[role]  # 已被手动重新连接
+            elif self.present(port):
+                try:
+                    connected = self.serial_manager.connect(port, baudrate, name=role)
+                except Exception:
+                    connected = False  # 设备节点刚出现时可能还不可用，下次再试
+                if connected:
+                    del self.lost[role]
+                    self.reconnected.emit(role, port)
+
+    def forget(self, role):
+        """
+        用户手动断开或改用其他串口时，不再自动重连该角色
+        """
+        self.lost.pop(role, None)
+
+
+_inventory = None
+
+
+def shared_inventory():
+    """
+    进程内唯一的串口清单，第一次调用时创建
+    """
+    global _inventory
+    if _inventory is None:
+        _inventory = PortInventory()
+    return _inventory
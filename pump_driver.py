@@ -0,0 +1,199 @@
+"""
+气泵总线驱动：扫描 ModBus 从站并按自适应周期轮询设定流量和显示流量。
+只依赖 QtCore，界面（qibeng）和无界面守护进程（daemon）共用
+"""
+import time
+from collections import namedtuple
+from PyQt5.QtCore import QThread, pyqtSignal
+from modbus_rtu import (
+    calculate_checksum, plan_reads, build_read_request, read_response_length, parse_read_response,
+    character_time, response_timeout
+)
+from modbus_client import ModbusClient
+from poll_scheduler import AdaptivePollScheduler
+
+# 轮询寄存器：0x0010 显示流量，0x0011 设定流量
+DISPLAY_FLOW_REGISTER = 0x0010
+SET_FLOW_REGISTER = 0x0011
+POLL_REGISTERS = (DISPLAY_FLOW_REGISTER, SET_FLOW_REGISTER)
+RANGE_REGISTER = 0x0030  # 量程，同时用于在线检测
+UNIT_COIL = 0x0006  # 单位线圈，00=ml/min，01=L/min
+
+# ModBus 从站地址范围（0 为广播地址，不会应答）
+MIN_SLAVE_ADDRESS = 0x01
+MAX_SLAVE_ADDRESS = 0xF7
+
+# 未测得从站响应时间前使用的保守值，以及测量值的放大倍数和下限（秒）
+DEFAULT_TURNAROUND = 0.05
+TURNAROUND_MARGIN = 2.0
+MIN_TURNAROUND = 0.005
+# 衰减最大值：每收到一次有效应答，已测得的最大响应时间乘以该系数，单次慢应答的影响在数百次应答后消失
+TURNAROUND_DECAY = 0.98
+
+# 自适应轮询：流量变化或刚写入设定值的设备按最小周期轮询，稳定后逐步放慢到最大周期（秒）
+POLL_MIN_INTERVAL = 0.3
+POLL_MAX_INTERVAL = 3.0
+POLL_CHANGE_THRESHOLD = 2  # 原始值变化超过该值才视为变化，滤掉显示流量的末位抖动
+POLL_WAKEUP_INTERVAL = 50  # 等待下一个到期设备时的最长休眠（毫秒），保证 boost 及时生效
+
+# 一个轮询周期的全部读数，各字段为按下标对应的元组，时间戳为毫秒；每个周期只发一次信号
+PollSnapshot = namedtuple("PollSnapshot", ["addresses", "timestamps", "set_flows", "display_flows"])
+# 扫描发现的设备，unit 为 None 表示单位查询失败
+DeviceDiscovered = namedtuple("DeviceDiscovered", ["address", "range_value", "unit"])
+
+
+def to_percentage(raw):
+    """
+    流量原始值（0-0x0FFF）换算为百分比，超出范围时为 0
+    """
+    return round((raw / 0x0FFF) * 100, 2) if 0 <= raw <= 0x0FFF else 0.0
+
+
+def build_set_flow_command(address, percentage):
+    """
+    写设定流量寄存器（FC06），percentage 为 0-100 的百分比；从站应答为原样回显
+    """
+    set_value = int((percentage / 100) * 0x0FFF)
+    frame = bytearray([address, 0x06]) + SET_FLOW_REGISTER.to_bytes(2, byteorder='big') \
+        + set_value.to_bytes(2, byteorder='big')
+    return bytes(frame + calculate_checksum(frame))
+
+
+class ModbusScannerThread(QThread):
+    """
+    线程：用于扫描地址并实时查询数据
+    """
+    result_signal = pyqtSignal(str)  # 错误等文本信息，只用于显示
+    discovery_signal = pyqtSignal(object)  # DeviceDiscovered
+    snapshot_signal = pyqtSignal(object)  # PollSnapshot，每个轮询周期一次
+    scan_progress_signal = pyqtSignal(int, int)  # 当前扫描地址, 结束地址
+    scan_finished_signal = pyqtSignal(int)  # 找到的设备数量
+
+    def __init__(self, connection, start_address=MIN_SLAVE_ADDRESS, end_address=0x10, recorder=None):
+        super().__init__()
+        self.connection = connection  # 气泵总线的串口连接
+        self.client = ModbusClient(connection)  # 按地址/功能码匹配应答，失败时重试
+        self.recorder = recorder  # 可选的遥测记录器，只入队不阻塞轮询
+        self.running = True
+        self.start_address = max(MIN_SLAVE_ADDRESS, start_address)
+        self.end_address = min(MAX_SLAVE_ADDRESS, end_address)
+        # 将轮询寄存器合并为尽量少的读取帧（0x0010-0x0011 合并为一帧）
+        self.read_plan = plan_reads(POLL_REGISTERS)
+        # 近期测得的最大从站响应时间（衰减最大值），None 表示尚未测到
+        self.measured_turnaround = None
+        self.scheduler = AdaptivePollScheduler(POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, threshold=POLL_CHANGE_THRESHOLD)
+
+    def stop(self):
+        """
+        取消扫描并停止轮询
+        """
+        self.running = False
+
+    def turnaround(self):
+        """
+        当前使用的从站响应时间：有测量值时按测量值放大，否则使用保守默认值
+        """
+        if self.measured_turnaround is None:
+            return DEFAULT_TURNAROUND
+        return max(MIN_TURNAROUND, self.measured_turnaround * TURNAROUND_MARGIN)
+
+    def transact(self, request, response_length, retries=None):
+        """
+        发送请求并在按波特率推算的超时内按帧读取应答（异常应答等短帧到齐即返回），同时更新响应时间测量值
+        """
+        baudrate = self.connection.baudrate
+        timeout = response_timeout(baudrate, len(request), response_length, self.turnaround())
+        # flush=True：丢弃上一个从站迟到的应答
+        future = self.client.submit(request, timeout=timeout, flush=True, retries=retries)
+        response = future.result()
+
+        if response and len(response) == response_length:
+            measured = max(0.0, future.elapsed - (len(request) + response_length) * character_time(baudrate))
+            if self.measured_turnaround is None:
+                self.measured_turnaround = measured
+            else:
+                self.measured_turnaround = max(measured, self.measured_turnaround * TURNAROUND_DECAY)
+        return response
+
+    def probe_device(self, address):
+        """
+        读取量程寄存器检测设备是否在线，在线时返回量程，否则返回 None
+        """
+        request = build_read_request(address, RANGE_REGISTER, 1)
+        # 扫描时不重试，空地址只等一次超时
+        registers = parse_read_response(address, self.transact(request, read_response_length(1), retries=0), 1)
+        return registers[0] if registers is not None else None
+
+    def query_unit(self, address):
+        """
+        读取单位线圈，返回单位字符串，失败时返回 None
+        """
+        unit_response = self.transact(build_read_request(address, UNIT_COIL, 1, function=0x01), 6)
+        if unit_response and len(unit_response) == 6 and unit_response[-2:] == calculate_checksum(unit_response[:-2]):
+            unit_code = unit_response[3]  # 单位代码，00=ml/min，01=L/min
+            return "ml/min" if unit_code == 0 else "L/min"
+        return None
+
+    def query_device(self, address):
+        """
+        查询设备的设定流量和显示流量
+        """
+        values = {}
+        for start, count in self.read_plan:
+            request = build_read_request(address, start, count)
+            registers = parse_read_response(address, self.transact(request, read_response_length(count)), count)
+            if registers is None:
+                return None, None
+            values.update(zip(range(start, start + count), registers))
+
+        return values.get(SET_FLOW_REGISTER), values.get(DISPLAY_FLOW_REGISTER)
+
+    def run(self):
+        try:
+            online_devices = []
+
+            for address in range(self.start_address, self.end_address + 1):
+                if not self.running:
+                    break
+                self.scan_progress_signal.emit(address, self.end_address)
+
+                # 检查设备是否在线
+                range_value = self.probe_device(address)
+                if range_value is not None:
+                    # 设备在线，记录地址
+                    online_devices.append(address)
+
+                    # 查询单位，发现即通过信号发送到主线程
+                    self.discovery_signal.emit(DeviceDiscovered(address, range_value, self.query_unit(address)))
+
+            # 先加入调度再发信号：槽函数在主线程中排队执行，届时 scheduler.keys() 已包含全部设备
+            for address in online_devices:
+                self.scheduler.add(address)
+
+            self.scan_finished_signal.emit(len(online_devices))
+
+            while self.running:
+                readings = []
+                for address in self.scheduler.due():
+                    try:
+                        set_flow, display_flow = self.query_device(address)
+                    except Exception as e:
+                        # 单次事务出错（如适配器刚被拔出）只算这台设备一次失败，轮询继续，重连后自动恢复
+                        self.result_signal.emit(f"错误1: {str(e)}")
+                        set_flow = display_flow = None
+                    if set_flow is not None and display_flow is not None:
+                        timestamp = time.time()
+                        self.scheduler.report(address, (set_flow, display_flow))
+                        readings.append((address, int(timestamp * 1000), set_flow, display_flow))
+                        if self.recorder is not None:
+                            device = f"pump/{address:02X}"
+                            self.recorder.record(device, "set_flow", set_flow, timestamp)
+                            self.recorder.record(device, "display_flow", display_flow, timestamp)
+                    else:
+                        self.scheduler.report_failure(address)
+                if readings:
+                    self.snapshot_signal.emit(PollSnapshot(*zip(*readings)))
+                wait = self.scheduler.time_until_next()
+                self.msleep(POLL_WAKEUP_INTERVAL if wait is None else min(int(wait * 1000), POLL_WAKEUP_INTERVAL))
+        except Exception as e:
+            self.result_signal.emit(f"错误1: {str(e)}")
@@ -1,112 +1,38 @@
 import sys
 import serial
 import serial.tools.list_ports
-import threading
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QWidget, QComboBox, QTextEdit, QLabel,
-    QGroupBox, QHBoxLayout, QLineEdit, QPushButton, QSplitter, QScrollArea
+    QApplication, QMainWindow, QVBoxLayout, QWidget, QComboBox, QLabel,
+    QGroupBox, QHBoxLayout, QLineEdit, QPushButton, QSplitter, QScrollArea, QSpinBox
 )
 from PyQt5.QtChart import QChart, QChartView, QLineSeries, QValueAxis, QDateTimeAxis
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer, QPointF
 from PyQt5.QtCore import QDateTime
+from collections import deque
+from modbus_client import ModbusClient
+from serial_worker import PRIORITY_USER
+from serial_manager import SerialManager, ROLE_PUMP
+from device_history import DeviceHistory, DEFAULT_CAPACITY as HISTORY_CAPACITY
+from log_console import LogConsole, WARNING, ERROR
+# 驱动线程和帧构造在不依赖界面的 pump_driver 中，这里导入供界面和旧代码使用
+from pump_driver import (
+    ModbusScannerThread, PollSnapshot, DeviceDiscovered, build_set_flow_command, to_percentage,
+    MIN_SLAVE_ADDRESS, MAX_SLAVE_ADDRESS
+)
 
-def calculate_checksum(data):
-    """
-    计算ModBus RTU CRC16校验和
-    """
-    crc = 0xFFFF
-    for pos in data:
-        crc ^= pos
-        for _ in range(8):
-            if crc & 0x0001:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    return crc.to_bytes(2, byteorder='little')  # ModBus CRC16要求小端序
-
-
-class ModbusScannerThread(QThread):
-    """
-    线程：用于扫描地址并实时查询数据
-    """
-    result_signal = pyqtSignal(str)  # 用于传递设备信息
-    device_data_signal = pyqtSignal(int, int, int)  # 地址, 设定流量, 显示流量
-
-    def __init__(self, serial_manager, lock):
-        super().__init__()
-        self.serial_manager = serial_manager  # 保存传递进来的 serial_manager
-        self.running = True
-        self.lock = lock
-
-    def query_device(self, address):
-        """
-        查询设备的设定流量和显示流量
-        """
-        def send_and_receive(data):
-            data += calculate_checksum(data)
-            with self.lock:
-                self.serial_manager.send_data(data)
-                response = self.serial_manager.receive_data(7)
-            if len(response) == 7 and response[-2:] == calculate_checksum(response[:-2]):
-                return int.from_bytes(response[3:5], byteorder='big')
-            return None
-
-        set_flow = send_and_receive(bytearray([address, 0x03, 0x00, 0x11, 0x00, 0x01]))
-        display_flow = send_and_receive(bytearray([address, 0x03, 0x00, 0x10, 0x00, 0x01]))
-        return set_flow, display_flow
-
-    def run(self):
-        try:
-            online_devices = []
-
-            for address in range(0x00, 0x10):
-                if not self.running:
-                    break
-
-                # 检查设备是否在线
-                data = bytearray([address, 0x03, 0x00, 0x30, 0x00, 0x01])
-                data += calculate_checksum(data)
-                with self.lock:
-                    self.serial_manager.send_data(data)
-                    response = self.serial_manager.receive_data(7)
-                if len(response) == 7 and response[-2:] == calculate_checksum(response[:-2]):
-                    # 设备在线，记录地址
-                    online_devices.append(address)
-
-                    # 查询单位和量程
-                    unit_data = bytearray([address, 0x01, 0x00, 0x06, 0x00, 0x01])
-                    unit_data += calculate_checksum(unit_data)
-                    with self.lock:
-                        self.serial_manager.send_data(unit_data)
-                        unit_response = self.serial_manager.receive_data(7)
-
-                    if len(unit_response) == 6 and unit_response[-2:] == calculate_checksum(unit_response[:-2]):
-                        # 解析单位和量程数据
-                        unit_code = unit_response[3]  # 单位代码，00=ml/min，01=L/min
-                        unit = "ml/min" if unit_code == 0 else "L/min"
-                        range_value = int.from_bytes(response[3:5], byteorder='big')  # 量程
-
-                        # 通过信号将信息发送到主线程
-                        self.result_signal.emit(f"地址: {address:02X}, 量程: {range_value} {unit}")
-                    else:
-                        self.result_signal.emit(f"地址: {address:02X} 查询单位失败")
-
-            while self.running:
-                for address in online_devices:
-                    set_flow, display_flow = self.query_device(address)
-                    if set_flow is not None and display_flow is not None:
-                        self.device_data_signal.emit(address, set_flow, display_flow)
-                self.msleep(300)
-        except Exception as e:
-            self.result_signal.emit(f"错误1: {str(e)}")
+# 折线图：显示最近 5 秒，按约 30 帧/秒批量刷新
+CHART_WINDOW_MS = 5 * 1000
+CHART_REFRESH_INTERVAL = 33
 
 
 class ModbusScannerApp(QMainWindow):
-    device_found_signal = pyqtSignal(str)  # 信号，用于传递设备信息
-    def __init__(self, serial_manager):
+    set_flow_result_signal = pyqtSignal(int, float, bool)  # 地址, 设定百分比, 是否收到应答
+    def __init__(self, serial_manager, recorder=None):
         super().__init__()
         self.serial_manager = serial_manager
+        self.connection = serial_manager.connection(ROLE_PUMP)  # 气泵独占一条总线
+        self.client = ModbusClient(self.connection)
+        self.recorder = recorder
         self.setWindowTitle("ModBus 扫描工具")
         self.resize(1200, 600)
 
@@ -128,19 +54,37 @@ class ModbusScannerApp(QMainWindow):
         scroll_area.setWidgetResizable(True)
         self.left_layout.addWidget(scroll_area)
 
+        # 扫描地址范围（十六进制显示）
+        range_layout = QHBoxLayout()
+        self.start_address_input = QSpinBox()
+        self.end_address_input = QSpinBox()
+        for spin_box, value in ((self.start_address_input, MIN_SLAVE_ADDRESS), (self.end_address_input, 0x10)):
+            spin_box.setRange(MIN_SLAVE_ADDRESS, MAX_SLAVE_ADDRESS)
+            spin_box.setDisplayIntegerBase(16)
+            spin_box.setValue(value)
+        range_layout.addWidget(QLabel("起始地址:"))
+        range_layout.addWidget(self.start_address_input)
+        range_layout.addWidget(QLabel("结束地址:"))
+        range_layout.addWidget(self.end_address_input)
+
         scan_button = QPushButton("开始扫描")
         scan_button.clicked.connect(self.start_scan)
+        self.stop_button = QPushButton("停止")
+        self.stop_button.clicked.connect(self.stop_scan)
+        self.scan_status_label = QLabel("")
         self.left_layout.addWidget(QLabel("选择串口:"))
+        self.left_layout.addLayout(range_layout)
         self.left_layout.addWidget(scan_button)
+        self.left_layout.addWidget(self.stop_button)
+        self.left_layout.addWidget(self.scan_status_label)
 
         # 扫描结果
-        self.result_text = QTextEdit()
-        self.result_text.setReadOnly(True)
+        self.result_text = LogConsole()
         self.left_layout.addWidget(self.result_text)
 
         # 初始化设备小窗字典
         self.device_widgets = {}
-        self.lock = threading.Lock()
+        self.set_flow_result_signal.connect(self.set_flow_finished)
 
         # 右侧布局：折线图
         right_widget = QWidget()
@@ -193,30 +137,68 @@ class ModbusScannerApp(QMainWindow):
         main_splitter.setStretchFactor(0, 1)  # 左侧占 1 份
         main_splitter.setStretchFactor(1, 3)  # 右侧占 3 份
 
+        # 所有在线设备的历史数据：时间戳 + 设定流量 + 显示流量，每台设备定长
+        self.history = DeviceHistory(2, HISTORY_CAPACITY)
+        self.chart_address = None  # 折线图当前显示的设备
+        self.chart_dirty = False
+        self.pending_snapshots = deque()  # 尚未应用的轮询快照，每帧统一处理
+        self.chart_timer = QTimer(self)
+        self.chart_timer.timeout.connect(self.apply_snapshots)
+        self.chart_timer.start(CHART_REFRESH_INTERVAL)
+
 
     def start_scan(self):
-        if not self.serial_manager.get_connection_status():  # 检查是否已连接
-            print(self.serial_manager.get_connection_status())
-            self.result_text.append("请先连接串口！")
+        if not self.connection.get_connection_status():  # 检查是否已连接
+            self.result_text.log("请先连接串口！", WARNING)
             return
 
+        # 重新扫描前先停止正在运行的线程
+        self.stop_scan()
+
         # 直接调用扫描线程
-        self.scan_thread = ModbusScannerThread(self.serial_manager, self.lock)
+        self.scan_thread = ModbusScannerThread(
+            self.connection, self.start_address_input.value(), self.end_address_input.value(), self.recorder
+        )
         self.scan_thread.result_signal.connect(self.display_result)
-        self.scan_thread.device_data_signal.connect(self.update_device_data)
+        self.scan_thread.discovery_signal.connect(self.device_discovered)
+        self.scan_thread.snapshot_signal.connect(self.pending_snapshots.append)
+        self.scan_thread.scan_progress_signal.connect(self.update_scan_progress)
+        self.scan_thread.scan_finished_signal.connect(self.scan_finished)
         self.scan_thread.start()
-    
+
+    def stop_scan(self):
+        """
+        取消扫描/轮询线程并等待其退出
+        """
+        scan_thread = getattr(self, "scan_thread", None)
+        if scan_thread is not None and scan_thread.isRunning():
+            scan_thread.stop()
+            scan_thread.wait()
+            self.scan_status_label.setText("已停止")
+
+    def update_scan_progress(self, address, end_address):
+        self.scan_status_label.setText(f"正在扫描地址 {address:02X} / {end_address:02X}")
+
+    def scan_finished(self, count):
+        self.scan_status_label.setText(f"扫描完成，找到 {count} 个设备")
+
     def display_result(self, result):
         """
-        接收线程信号并更新 UI
+        显示线程发来的文本信息
         """
-        self.result_text.append(result)  # 更新扫描结果
-        if "地址" in result and "量程" in result:
-            parts = result.split(",")
-            address = int(parts[0].split(":")[1].strip(), 16)
-            range_value = parts[1].split(":")[1].strip()
-            if address not in self.device_widgets:
-                self.add_device_widget(address, range_value)
+        self.result_text.log(result, ERROR)
+
+    def device_discovered(self, event):
+        """
+        扫描发现设备：记录日志，单位查询成功时添加设备窗口
+        """
+        if event.unit is None:
+            self.result_text.log(f"地址: {event.address:02X} 查询单位失败", WARNING, f"{event.address:02X}")
+            return
+        range_value = f"{event.range_value} {event.unit}"
+        self.result_text.log(f"地址: {event.address:02X}, 量程: {range_value}")
+        if event.address not in self.device_widgets:
+            self.add_device_widget(event.address, range_value)
 
     def add_device_widget(self, address, range_value):
         """
@@ -265,52 +247,86 @@ class ModbusScannerApp(QMainWindow):
         }
 
         # 更新设备选择器
-        self.device_selector.addItem(f"设备地址: {address:02X}, 量程: {range_value}")
+        self.device_selector.addItem(f"设备地址: {address:02X}, 量程: {range_value}", address)
 
     def send_set_flow(self, address, input_widget):
         try:
             percentage = float(input_widget.text())
             if not (0 <= percentage <= 100):
-                self.result_text.append(f"地址 {address:02X}: 输入百分比无效，应在 0-100 范围内")
+                self.result_text.log("输入百分比无效，应在 0-100 范围内", WARNING, f"{address:02X}")
                 return
 
-            set_value = int((percentage / 100) * 0x0FFF)
-            command = bytearray([address, 0x06, 0x00, 0x11]) + set_value.to_bytes(2, byteorder='big') + calculate_checksum(
-                bytearray([address, 0x06, 0x00, 0x11]) + set_value.to_bytes(2, byteorder='big'))
+            command = build_set_flow_command(address, percentage)
 
-            with self.lock:
-                self.scan_thread.serial_manager.send_data(command)
+            # 以用户优先级插队执行，应答由 I/O 线程回调后通过信号回到界面线程
+            future = self.client.submit(command, priority=PRIORITY_USER)
+            future.add_done_callback(
+                lambda f: self.set_flow_result_signal.emit(
+                    address, percentage, not f.cancelled() and f.exception() is None and bool(f.result())
+                )
+            )
 
-            self.result_text.append(f"地址 {address:02X}: 已发送设定流量 {percentage}%")
+            self.result_text.log(f"已发送设定流量 {percentage}%", device=f"{address:02X}")
+            self.result_text.trace(f"{address:02X}", "发送", command)
         except Exception as e:
-            self.result_text.append(f"地址 {address:02X}: 发送失败 - {str(e)}")
-
-    def update_device_data(self, address, set_flow, display_flow):
-        if address in self.device_widgets:
-        # 计算百分比值
-            set_flow_percentage = round((set_flow / 0x0FFF) * 100, 2) if 0 <= set_flow <= 0x0FFF else 0.0
-            display_flow_percentage = round((display_flow / 0x0FFF) * 100, 2) if 0 <= display_flow <= 0x0FFF else 0.0
-
-            # 更新设备窗口
+            self.result_text.log(f"发送失败 - {str(e)}", ERROR, f"{address:02X}")
+
+    def set_flow_finished(self, address, percentage, acknowledged):
+        if acknowledged:
+            self.result_text.log(f"设定流量 {percentage}% 已确认", device=f"{address:02X}")
+            # 设定值刚改变，立即按最快周期跟踪响应过程
+            scan_thread = getattr(self, "scan_thread", None)
+            if scan_thread is not None:
+                scan_thread.scheduler.boost(address)
+        else:
+            self.result_text.log(f"设定流量 {percentage}% 未收到应答", WARNING, f"{address:02X}")
+
+    def apply_snapshots(self):
+        """
+        每帧一次：把积压的轮询快照写入历史，每台设备的数值框只按最新读数更新一次，然后刷新曲线
+        """
+        latest = {}
+        while self.pending_snapshots:
+            snapshot = self.pending_snapshots.popleft()
+            for address, timestamp, set_flow, display_flow in zip(*snapshot):
+                set_flow_percentage = to_percentage(set_flow)
+                display_flow_percentage = to_percentage(display_flow)
+                # 所有设备都写入历史，当前设备的曲线在本帧统一刷新
+                self.history.record(address, timestamp, set_flow_percentage, display_flow_percentage)
+                latest[address] = (set_flow_percentage, display_flow_percentage)
+                if address == self.chart_address:
+                    self.chart_dirty = True
+
+        for address, (set_flow_percentage, display_flow_percentage) in latest.items():
+            if address not in self.device_widgets:
+                continue  # 单位查询失败的设备没有数值框，只写入历史
             self.device_widgets[address]["set_flow"].setText(f"{set_flow_percentage}%")
             self.device_widgets[address]["display_flow"].setText(f"{display_flow_percentage}%")
+        self.refresh_chart()
 
-            # 检查当前选中的设备
-            current_device = self.device_selector.currentText()
-            if current_device[0:8] == f"设备地址: {address:02X}":
-                # 获取当前时间戳
-                current_time = QDateTime.currentDateTime().toMSecsSinceEpoch()
-
-                # 更新曲线数据
-                self.set_series.append(current_time, set_flow_percentage)
-                self.display_series.append(current_time, display_flow_percentage)
+    def refresh_chart(self):
+        """
+        定时刷新：只把时间窗口内的数据一次性 replace 到曲线中
+        """
+        if not self.chart_dirty:
+            return
+        self.chart_dirty = False
 
-                # 动态更新时间范围
-                self.axis_x.setRange(
-                    QDateTime.fromMSecsSinceEpoch(current_time - 5 * 1000),  # 显示最近 1 分钟数据
-                    QDateTime.fromMSecsSinceEpoch(current_time)
-                )
-                # self.update_chart_axis()
+        latest = self.history.latest_timestamp(self.chart_address)
+        if latest is None:
+            return
+        current_time = int(latest)
+        timestamps, (set_values, display_values) = self.history.window(
+            self.chart_address, current_time - CHART_WINDOW_MS
+        )
+        self.set_series.replace([QPointF(t, v) for t, v in zip(timestamps, set_values)])
+        self.display_series.replace([QPointF(t, v) for t, v in zip(timestamps, display_values)])
+
+        # 动态更新时间范围
+        self.axis_x.setRange(
+            QDateTime.fromMSecsSinceEpoch(current_time - CHART_WINDOW_MS),  # 显示最近 5 秒数据
+            QDateTime.fromMSecsSinceEpoch(current_time)
+        )
 
     def update_chart_axis(self):
         """
@@ -333,25 +349,30 @@ class ModbusScannerApp(QMainWindow):
     
     def switch_device(self):
         """
-        切换显示设备时，清空当前数据并重置横轴范围
+        切换显示设备时，立即显示该设备已保存的历史数据；没有历史时清空曲线并重置横轴范围
         """
-        current_text = self.device_selector.currentText()
-        if current_text.startswith("设备地址: "):
-            # address = int(current_text.split(":")[1], 16)
+        address = self.device_selector.currentData()
+        if address is not None:
+            self.chart_address = address
+            if self.chart_address in self.history:
+                self.chart_dirty = True
+                self.refresh_chart()
+                return
 
             # 清空当前折线图数据
+            self.chart_dirty = False
             self.set_series.clear()
             self.display_series.clear()
 
             # 重置时间范围为当前时间
             current_time = QDateTime.currentDateTime().toMSecsSinceEpoch()
             self.axis_x.setRange(
-                QDateTime.fromMSecsSinceEpoch(current_time - 5 * 1000),
+                QDateTime.fromMSecsSinceEpoch(current_time - CHART_WINDOW_MS),
                 QDateTime.fromMSecsSinceEpoch(current_time)
             )
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    main_window = ModbusScannerApp()
+    main_window = ModbusScannerApp(SerialManager())
     main_window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,280 @@
+"""
+遥测数据记录器：所有采样写入只追加的二进制分段文件
+
+每个分段文件以 SEGMENT_MAGIC 开头，之后是定长记录 <时间戳(double), 序列号(uint32), 数值(double)>；
+序列号与 (设备, 通道) 的对应关系保存在 series.json 中。分段写满后轮换，文件名带有首条记录的毫秒时间戳，
+查询时先按文件名筛选分段，再用 mmap 二分定位时间范围。
+采样的时间戳由各采集线程/进程各自生成，入队顺序与时间顺序不完全一致：每批记录排序后写入，
+并保证任一记录不早于此前已写入的最大时间戳 ORDER_SLACK 秒以上，查询时把二分和提前结束的边界放宽 ORDER_SLACK。
+分段轮换时按保留限制（总字节数、保留时间）删除最旧的分段，正在写入的分段不会被删除。
+采集线程只把数据放入队列，打包和写盘都在后台写入线程中完成。
+"""
+import csv
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+SEGMENT_MAGIC = b"DTSEG001"
+RECORD = struct.Struct("<dId")
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024  # 单个分段文件上限（字节）
+DEFAULT_FLUSH_INTERVAL = 0.5  # 写入线程批量落盘的间隔（秒）
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 所有分段合计的上限（字节），超过时删除最旧的分段
+DEFAULT_MAX_AGE = None  # 分段保留时间（秒），None 表示不按时间删除
+SERIES_FILE = "series.json"
+BATCH_RECORDS = 4096  # 积压超过该条数时在写入循环内先落盘一批
+ORDER_SLACK = 10.0  # 写入顺序与时间顺序的最大偏差（秒），更晚到达的采样时间戳被提到该下限
+
+
+class TelemetryRecorder:
+    def __init__(self, directory=DEFAULT_DIRECTORY, segment_size=DEFAULT_SEGMENT_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        """
+        :param max_bytes: 所有分段合计的上限（字节），None 表示不限制
+        :param max_age: 全部记录都早于 max_age 秒之前的分段被删除，None 表示不限制
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+        self.series = {}  # (设备, 通道) -> 序列号
+        self.series_names = {}  # 序列号 -> (设备, 通道)
+        self.series_lock = threading.Lock()  # 写入线程新增序列时与查询互斥
+        self.load_series()
+
+        self.queue = queue.SimpleQueue()
+        self.file_lock = threading.Lock()  # 保护当前分段文件
+        self.segment = None
+        self.segment_written = 0
+        self.latest_timestamp = float("-inf")  # 已写入的最大时间戳
+        self.running = True
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def record(self, device, channel, value, timestamp=None):
+        """
+        记录一个采样，只入队，可以在任意线程中调用
+        """
+        self.queue.put((time.time() if timestamp is None else timestamp, device, channel, float(value)))
+
+    def close(self):
+        """
+        写完队列中剩余的数据并关闭文件
+        """
+        if self.running:
+            self.running = False
+            self.queue.put(None)
+            self.writer.join()
+
+    # ---- 写入线程 ----
+
+    def load_series(self):
+        try:
+            with open(os.path.join(self.directory, SERIES_FILE), 'r') as f:
+                for series_id, (device, channel) in json.load(f).items():
+                    self.series[(device, channel)] = int(series_id)
+                    self.series_names[int(series_id)] = (device, channel)
+        except FileNotFoundError:
+            pass
+
+    def save_series(self):
+        path = os.path.join(self.directory, SERIES_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump({str(k): list(v) for k, v in self.series_names.items()}, f)
+        os.replace(path + ".tmp", path)
+
+    def series_id(self, device, channel):
+        key = (device, channel)
+        series_id = self.series.get(key)
+        if series_id is None:
+            with self.series_lock:
+                series_id = self.series[key] = len(self.series)
+                self.series_names[series_id] = key
+            self.save_series()
+        return series_id
+
+    def open_segment(self, timestamp):
+        if self.segment is not None:
+            self.segment.close()
+        path = os.path.join(self.directory, f"seg_{int(timestamp * 1000):013d}.bin")
+        self.segment = open(path, 'ab')
+        if self.segment.tell() == 0:
+            self.segment.write(SEGMENT_MAGIC)
+        self.segment_written = self.segment.tell()
+
+    def write_loop(self):
+        batch = []
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+            # 一次取完队列中积压的数据，合并成一次写入
+            while item is not False:
+                if item is None:
+                    stopping = True
+                    break
+                timestamp, device, channel, value = item
+                batch.append((timestamp, self.series_id(device, channel), value))
+                if len(batch) >= BATCH_RECORDS:
+                    self.write_batch(batch)
+                    batch = []
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = False
+            if batch and (stopping or time.monotonic() - last_flush >= self.flush_interval):
+                self.write_batch(batch)
+                batch = []
+                last_flush = time.monotonic()
+
+        with self.file_lock:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment = None
+
+    def write_batch(self, records):
+        """
+        按时间排序后写入一批 (时间戳, 序列号, 数值)；早于已写入最大时间戳 ORDER_SLACK 以上的记录
+        （采集端停顿过久后才送达）时间戳提到该下限，分段以本批第一条记录命名
+        """
+        records.sort()
+        floor = self.latest_timestamp - ORDER_SLACK
+        data = bytearray()
+        for timestamp, series_id, value in records:
+            data += RECORD.pack(max(timestamp, floor), series_id, value)
+        self.latest_timestamp = max(self.latest_timestamp, records[-1][0])
+        with self.file_lock:
+            if self.segment is None or self.segment_written + len(data) > self.segment_size:
+                self.open_segment(max(records[0][0], floor))
+                self.enforce_retention()
+            self.segment.write(data)
+            self.segment.flush()
+            self.segment_written += len(data)
+
+    def enforce_retention(self):
+        """
+        从最旧的分段开始删除，直到总大小不超过 max_bytes 且没有整段早于 max_age 的分段；
+        分段内最新记录的时间取下一个分段的首条记录时间，因此最新的分段和正在写入的分段总是保留
+        """
+        if self.max_bytes is None and self.max_age is None:
+            return
+        segments = self.segments()
+        sizes = []
+        for _, path in segments:
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                sizes.append(0)
+        total = sum(sizes)
+        cutoff = time.time() - self.max_age if self.max_age is not None else None
+        current = self.segment.name if self.segment is not None else None
+        for index in range(len(segments) - 1):
+            path = segments[index][1]
+            expired = cutoff is not None and segments[index + 1][0] < cutoff
+            if not expired and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            if path == current:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # 例如 Windows 上正被查询映射的分段，下次轮换时再删除
+            total -= sizes[index]
+
+    # ---- 查询 ----
+
+    def segments(self):
+        """
+        按时间顺序返回 [(首条记录时间戳, 路径), ...]
+        """
+        result = []
+        for name in os.listdir(self.directory):
+            if name.startswith("seg_") and name.endswith(".bin"):
+                result.append((int(name[4:-4]) / 1000.0, os.path.join(self.directory, name)))
+        return sorted(result)
+
+    def query(self, device, channel=None, start=None, end=None):
+        """
+        查询设备在 [start, end] 内已落盘的数据（写入线程每 flush_interval 秒落盘一次）
+        :return: [(时间戳, 通道, 数值), ...]
+        """
+        with self.series_lock:
+            wanted = {series_id: name[1] for series_id, name in self.series_names.items()
+                      if name[0] == device and (channel is None or name[1] == channel)}
+        if not wanted:
+            return []
+        result = [(t, wanted[s], v) for t, s, v in self.scan(start, end) if s in wanted]
+        result.sort(key=lambda item: item[0])
+        return result
+
+    def scan(self, start=None, end=None):
+        """
+        按写入顺序遍历 [start, end] 内的所有记录 (时间戳, 序列号, 数值)，与时间顺序的偏差不超过 ORDER_SLACK
+        """
+        segments = self.segments()
+        for index, (first, path) in enumerate(segments):
+            following = segments[index + 1][0] if index + 1 < len(segments) else None
+            # 之后写入的记录都不早于 first - ORDER_SLACK；下一分段之前的记录都不晚于 following + ORDER_SLACK
+            if end is not None and first > end + ORDER_SLACK:
+                break
+            if start is not None and following is not None and following < start - ORDER_SLACK:
+                continue
+            yield from self.scan_segment(path, start, end)
+
+    def scan_segment(self, path, start, end):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return  # 列出分段后被保留策略删除
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            count = (size - len(SEGMENT_MAGIC)) // RECORD.size
+            if count <= 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                first = 0
+                if start is not None:
+                    # 二分查找时把边界放宽 ORDER_SLACK：某条记录早于 start - ORDER_SLACK 时，它之前的记录都早于 start
+                    low, high = 0, count
+                    while low < high:
+                        middle = (low + high) // 2
+                        if RECORD.unpack_from(view, len(SEGMENT_MAGIC) + middle * RECORD.size)[0] \
+                                < start - ORDER_SLACK:
+                            low = middle + 1
+                        else:
+                            high = middle
+                    first = low
+                offset = len(SEGMENT_MAGIC) + first * RECORD.size
+                for timestamp, series_id, value in RECORD.iter_unpack(
+                        view[offset:len(SEGMENT_MAGIC) + count * RECORD.size]):
+                    if end is not None and timestamp > end:
+                        if timestamp > end + ORDER_SLACK:
+                            break  # 之后的记录都晚于 end
+                        continue
+                    if start is not None and timestamp < start:
+                        continue
+                    yield timestamp, series_id, value
+
+    def export_csv(self, path, device=None, start=None, end=None):
+        """
+        导出 CSV：时间戳, 设备, 通道, 数值
+        """
+        with self.series_lock:
+            series_names = dict(self.series_names)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "device", "channel", "value"])
+            for timestamp, series_id, value in self.scan(start, end):
+                series_device, channel = series_names[series_id]
+                if device is None or series_device == device:
+                    writer.writerow([f"{timestamp:.3f}", series_device, channel, value])
@@ -0,0 +1,151 @@
+"""
+远程监视页面：界面不打开串口，而是作为客户端连接正在运行的采集守护进程（见 daemon），
+显示各设备通道的最新读数，并通过守护进程下发设定流量和设定温度
+
+    python main.py --connect tcp://127.0.0.1:5020
+"""
+import sys
+import time
+from collections import deque
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox, QDoubleSpinBox,
+    QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PyQt5.QtCore import QTimer
+from log_console import LogConsole, INFO, WARNING, ERROR
+from stream_protocol import DEFAULT_ADDRESS, StreamClient
+from pump_driver import MIN_SLAVE_ADDRESS, MAX_SLAVE_ADDRESS
+from hotplate_driver import MIN_CONTROLLER_ADDRESS, MAX_CONTROLLER_ADDRESS
+
+REFRESH_INTERVAL = 100  # 把接收线程收到的样本刷新到表格的间隔（毫秒）
+COLUMNS = ("设备", "通道", "数值", "时间")
+
+
+class RemoteMonitor(QWidget):
+    def __init__(self, address=DEFAULT_ADDRESS):
+        super().__init__()
+        self.setWindowTitle(f"远程监视 - {address}")
+        self.address = address
+        # 接收线程只向队列追加，由界面线程的定时器取出，deque.extend 可在任意线程调用
+        self.samples = deque()
+        self.rows = {}  # (设备, 通道) -> 表格行号
+
+        layout = QVBoxLayout()
+        self.status_label = QLabel(f"已连接 {address}")
+        layout.addWidget(self.status_label)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        flow_layout = QHBoxLayout()
+        self.pump_address_input = QSpinBox()
+        self.pump_address_input.setRange(MIN_SLAVE_ADDRESS, MAX_SLAVE_ADDRESS)
+        self.pump_address_input.setPrefix("气泵地址 ")
+        self.flow_input = QDoubleSpinBox()
+        self.flow_input.setRange(0, 100)
+        self.flow_input.setSuffix(" %")
+        flow_button = QPushButton("设定流量")
+        flow_button.clicked.connect(self.set_flow)
+        for widget in (self.pump_address_input, self.flow_input, flow_button):
+            flow_layout.addWidget(widget)
+        layout.addLayout(flow_layout)
+
+        temperature_layout = QHBoxLayout()
+        self.hotplate_address_input = QSpinBox()
+        self.hotplate_address_input.setRange(MIN_CONTROLLER_ADDRESS, MAX_CONTROLLER_ADDRESS)
+        self.hotplate_address_input.setValue(1)
+        self.hotplate_address_input.setPrefix("温控器地址 ")
+        self.temperature_input = QDoubleSpinBox()
+        self.temperature_input.setRange(-999.9, 3276.7)
+        self.temperature_input.setDecimals(1)
+        self.temperature_input.setSuffix(" °C")
+        temperature_button = QPushButton("设定温度")
+        temperature_button.clicked.connect(self.set_temperature)
+        for widget in (self.hotplate_address_input, self.temperature_input, temperature_button):
+            temperature_layout.addWidget(widget)
+        layout.addLayout(temperature_layout)
+
+        self.log_console = LogConsole()
+        layout.addWidget(self.log_console)
+        self.setLayout(layout)
+
+        # 日志控件的 log 可在任意线程调用，事件和命令结果在接收线程中直接写入
+        self.client = StreamClient(address, on_samples=self.samples.extend, on_event=self.on_event)
+        self.client.subscribe()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(REFRESH_INTERVAL)
+
+    def on_event(self, message):
+        """接收线程中调用"""
+        event = message.get("event")
+        if "addresses" in message:
+            addresses = " ".join(f"{address:02X}" for address in message["addresses"])
+            self.log_console.log(f"{event}: {addresses or '无设备'}", INFO)
+        else:
+            self.log_console.log(event, INFO)
+
+    def refresh(self):
+        latest = {}
+        while self.samples:
+            timestamp, device, channel, value = self.samples.popleft()
+            latest[(device, channel)] = (timestamp, value)
+        for key, (timestamp, value) in latest.items():
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.table.rowCount()
+                self.table.insertRow(row)
+                self.table.setItem(row, 0, QTableWidgetItem(key[0]))
+                self.table.setItem(row, 1, QTableWidgetItem(key[1]))
+            self.table.setItem(row, 2, QTableWidgetItem(f"{value:g}"))
+            self.table.setItem(row, 3, QTableWidgetItem(time.strftime("%H:%M:%S", time.localtime(timestamp))))
+        if not self.client.connected and self.refresh_timer.isActive():
+            self.refresh_timer.stop()
+            self.status_label.setText(f"与 {self.address} 的连接已断开")
+            self.log_console.log("与守护进程的连接已断开", ERROR)
+
+    def run_command(self, description, command, **arguments):
+        """
+        发送命令，不等待应答；结果在接收线程中回调并写入日志
+        """
+        try:
+            future = self.client.command(command, **arguments)
+        except OSError as e:
+            self.log_console.log(f"{description} 发送失败: {str(e)}", ERROR)
+            return
+        future.add_done_callback(lambda f: self.command_finished(f, description))
+
+    def command_finished(self, future, description):
+        error = future.exception()
+        if error is None:
+            self.log_console.log(f"{description} 成功", INFO)
+        else:
+            self.log_console.log(f"{description} 失败: {str(error)}", WARNING)
+
+    def set_flow(self):
+        address = self.pump_address_input.value()
+        percent = self.flow_input.value()
+        self.run_command(f"气泵 {address:02X} 设定流量 {percent}%", "set_flow", address=address, percent=percent)
+
+    def set_temperature(self):
+        address = self.hotplate_address_input.value()
+        value = self.temperature_input.value()
+        self.run_command(f"温控器 {address:02X} 设定温度 {value:.1f}°C", "set_temperature",
+                         address=address, value=value)
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        self.client.close()
+        super().closeEvent(event)
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = RemoteMonitor(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS)
+    window.resize(700, 600)
+    window.show()
+    sys.exit(app.exec_())
@@ -1,49 +1,38 @@
 import sys
-import serial
-import serial.tools.list_ports
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QTextEdit, QPushButton, QLabel, QHBoxLayout, QComboBox, QLineEdit
+    QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout, QComboBox, QLineEdit, QScrollArea,
+    QSpinBox, QDoubleSpinBox
+)
+from PyQt5.QtCore import pyqtSignal
+from log_console import LogConsole, INFO, WARNING, ERROR
+from serial_manager import SerialManager, ROLE_HOTPLATE
+from port_inventory import shared_inventory
+# 轮询线程、帧构造和应答解析在不依赖界面的 hotplate_driver 中，这里导入供界面和旧代码使用
+from hotplate_driver import (
+    HotPlatePoller, HotPlateStatus, build_read_frame, build_write_frame, calculate_checksum, parse_status,
+    alarm_text, MIN_CONTROLLER_ADDRESS, MAX_CONTROLLER_ADDRESS, DEFAULT_END_ADDRESS
 )
-from PyQt5.QtCore import QTimer
-
-
-def calculate_checksum(command_type, param_code, addr, value=0):
-    """
-    根据给定的校验码计算方式计算校验码
-    :param command_type: 指令类型（"read" 或 "write"）
-    :param param_code: 参数代码
-    :param addr: 地址
-    :param value: 写入的值（仅对写命令有效）
-    :return: 校验和的低字节和高字节
-    """
-    if command_type == "read":
-        checksum = param_code * 256 + 0x52 + addr
-    elif command_type == "write":
-        checksum = param_code * 256 + 0x43 + value + addr
-    else:
-        raise ValueError("Invalid command type")
-    
-    checksum &= 0xFFFF
-    return checksum & 0xFF, (checksum >> 8) & 0xFF
 
 
 class ModbusRTUMaster(QWidget):
-    def __init__(self):
+    setpoint_result_signal = pyqtSignal(int, float, bool)  # 地址, 设定值, 是否已确认
+
+    def __init__(self, serial_manager, recorder=None):
         super().__init__()
+        self.serial_manager = serial_manager
+        self.connection = serial_manager.connection(ROLE_HOTPLATE)  # 热台独占一条总线
+        self.recorder = recorder  # 可选的遥测记录器
         self.setWindowTitle("Modbus RTU 温度显示器")
         self.resize(600, 400)
 
-        # 初始化串口
-        self.serial_port = serial.Serial()
-        self.serial_port.baudrate = 9600
-        self.serial_port.timeout = 1
+        # 后台轮询线程，连接后创建
+        self.poller = None
+        self.inventory = shared_inventory()  # 共用的串口清单
+        self.device_labels = {}  # 地址 -> 状态标签，发现温控器时添加
 
         # 创建界面
         self.init_ui()
-
-        # 定时器读取和发送指令
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.poll_devices)
+        self.setpoint_result_signal.connect(self.setpoint_finished)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -52,6 +41,7 @@ class ModbusRTUMaster(QWidget):
         port_layout = QHBoxLayout()
         self.port_label = QLabel("串口：")
         self.port_combo = QComboBox()
+        self.port_combo.setEditable(True)
         self.scan_ports()
         self.connect_button = QPushButton("连接")
         self.connect_button.clicked.connect(self.toggle_connection)
@@ -60,85 +50,161 @@ class ModbusRTUMaster(QWidget):
         port_layout.addWidget(self.connect_button)
         layout.addLayout(port_layout)
 
-        # 温度显示
-        self.temperature_label_1 = QLabel("设备 0x01 温度：测量值=0.0°C, 设定值=0.0°C")
-        self.temperature_label_2 = QLabel("设备 0x02 温度：测量值=0.0°C, 设定值=0.0°C")
-        layout.addWidget(self.temperature_label_1)
-        layout.addWidget(self.temperature_label_2)
-
-        # 显示发送和接收数据
-        self.send_text = QTextEdit()
-        self.receive_text = QTextEdit()
-        self.send_text.setReadOnly(True)
-        self.receive_text.setReadOnly(True)
-        layout.addWidget(QLabel("发送数据："))
-        layout.addWidget(self.send_text)
-        layout.addWidget(QLabel("接收数据："))
-        layout.addWidget(self.receive_text)
+        # 发现温控器的地址范围（十六进制显示），连接时扫描
+        range_layout = QHBoxLayout()
+        self.start_address_input = QSpinBox()
+        self.end_address_input = QSpinBox()
+        for spin_box, value in ((self.start_address_input, 0x01), (self.end_address_input, DEFAULT_END_ADDRESS)):
+            spin_box.setRange(MIN_CONTROLLER_ADDRESS, MAX_CONTROLLER_ADDRESS)
+            spin_box.setDisplayIntegerBase(16)
+            spin_box.setValue(value)
+        range_layout.addWidget(QLabel("起始地址:"))
+        range_layout.addWidget(self.start_address_input)
+        range_layout.addWidget(QLabel("结束地址:"))
+        range_layout.addWidget(self.end_address_input)
+        layout.addLayout(range_layout)
+
+        # 温度显示：每个发现的温控器一行
+        scroll_area = QScrollArea()
+        scroll_widget = QWidget()
+        self.device_layout = QVBoxLayout()
+        self.device_layout.addStretch()
+        scroll_widget.setLayout(self.device_layout)
+        scroll_area.setWidget(scroll_widget)
+        scroll_area.setWidgetResizable(True)
+        layout.addWidget(scroll_area)
+
+        # 设定温度
+        setpoint_layout = QHBoxLayout()
+        self.device_combo = QComboBox()
+        self.setpoint_input = QDoubleSpinBox()
+        self.setpoint_input.setRange(-999.9, 999.9)
+        self.setpoint_input.setDecimals(1)
+        self.setpoint_input.setSuffix("°C")
+        self.setpoint_button = QPushButton("设定")
+        self.setpoint_button.clicked.connect(self.send_setpoint)
+        setpoint_layout.addWidget(QLabel("设定温度:"))
+        setpoint_layout.addWidget(self.device_combo)
+        setpoint_layout.addWidget(self.setpoint_input)
+        setpoint_layout.addWidget(self.setpoint_button)
+        layout.addLayout(setpoint_layout)
+
+        # 通信日志
+        self.log_console = LogConsole()
+        self.log_console.verbose_check.toggled.connect(self.set_verbose)
+        layout.addWidget(QLabel("通信日志："))
+        layout.addWidget(self.log_console)
 
         self.setLayout(layout)
 
     def scan_ports(self):
-        ports = serial.tools.list_ports.comports()
+        """从共用的串口清单填充列表，插拔适配器时自动更新"""
+        self.inventory.ports_changed.connect(self.update_ports)
+        self.update_ports(self.inventory.ports)
+
+    def update_ports(self, ports):
+        current = self.port_combo.currentText()
         self.port_combo.clear()
-        for port in ports:
-            self.port_combo.addItem(port.device)
+        self.port_combo.addItems(ports)
+        if current:
+            self.port_combo.setCurrentText(current)
 
     def toggle_connection(self):
-        if self.serial_port.is_open:
-            self.serial_port.close()
+        if self.poller is not None:
+            self.stop_polling()
+            self.inventory.forget(ROLE_HOTPLATE)  # 手动断开后不再自动重连
+            self.serial_manager.disconnect(ROLE_HOTPLATE)
             self.connect_button.setText("连接")
-            self.timer.stop()
-            self.send_text.append("串口已断开")
+            self.log_console.log("串口已断开")
         else:
             try:
-                self.serial_port.port = self.port_combo.currentText()
-                self.serial_port.open()
+                # 首页已为热台分配串口时直接开始轮询
+                if not self.connection.get_connection_status():
+                    port = self.port_combo.currentText()
+                    if not self.serial_manager.connect(port, name=ROLE_HOTPLATE):
+                        self.log_console.log(f"无法连接到 {port}", ERROR)
+                        return
                 self.connect_button.setText("断开")
-                self.send_text.append(f"已连接到 {self.serial_port.port}")
-                self.timer.start(1000)  # 每秒发送指令
+                self.log_console.log(f"已连接到 {self.connection.port}")
+                self.start_polling()  # 先发现温控器，再按自适应周期轮询
             except Exception as e:
-                self.send_text.append(f"连接失败: {str(e)}")
-
-    def poll_devices(self):
-        """每秒发送指令并解析返回值"""
-        for addr in [0x01, 0x02]:
-            self.send_read_command(addr)
-
-    def send_read_command(self, addr):
-        """发送读取命令"""
+                self.log_console.log(f"连接失败: {str(e)}", ERROR)
+
+    def start_polling(self):
+        self.clear_devices()
+        self.poller = HotPlatePoller(self.connection, start_address=self.start_address_input.value(),
+                                     end_address=self.end_address_input.value(), recorder=self.recorder)
+        self.poller.discovery_signal.connect(self.device_discovered)
+        self.poller.scan_finished_signal.connect(
+            lambda count: self.log_console.log(f"发现 {count} 个温控器", INFO if count else WARNING))
+        self.poller.snapshot_signal.connect(self.update_snapshot)
+        self.poller.log_signal.connect(self.log_console.log)
+        self.poller.verbose = self.log_console.verbose
+        self.poller.start()
+
+    def set_verbose(self, verbose):
+        if self.poller is not None:
+            self.poller.verbose = verbose
+
+    def stop_polling(self):
+        """停止轮询线程并等待当前读取结束，之后才能断开串口"""
+        if self.poller is not None:
+            self.poller.stop()
+            self.poller.wait()
+            self.poller = None
+
+    def clear_devices(self):
+        for label in self.device_labels.values():
+            self.device_layout.removeWidget(label)
+            label.deleteLater()
+        self.device_labels.clear()
+        self.device_combo.clear()
+
+    def device_discovered(self, status):
+        """发现温控器时添加一行状态标签，并加入设定温度的设备列表"""
+        label = QLabel()
+        self.device_layout.insertWidget(self.device_layout.count() - 1, label)  # 保持在末尾的弹簧之前
+        self.device_labels[status.address] = label
+        self.device_combo.addItem(f"0x{status.address:02X}", status.address)
+        if self.device_combo.count() == 1:
+            self.setpoint_input.setValue(status.sv)
+        self.update_status(status)
+
+    def update_snapshot(self, statuses):
+        """接收轮询线程每个周期的读数并更新界面"""
+        for status in statuses:
+            self.update_status(status)
+
+    def update_status(self, status):
+        label = self.device_labels.get(status.address)
+        if label is not None:
+            label.setText(f"设备 0x{status.address:02X} 温度：测量值={status.pv:.1f}°C, 设定值={status.sv:.1f}°C, "
+                          f"输出={status.output}%, 报警={alarm_text(status.alarm)}")
+
+    def send_setpoint(self):
+        address = self.device_combo.currentData()
+        if self.poller is None or address is None:
+            self.log_console.log("尚未发现温控器", WARNING)
+            return
+        value = self.setpoint_input.value()
         try:
-            param_code = 0x1B
-            checksum_low, checksum_high = calculate_checksum("read", param_code, addr)
-            frame = [addr + 0x80, addr + 0x80, 0x52, param_code, 0x00, 0x00, checksum_low, checksum_high]
-            data = bytes(frame)
-            self.serial_port.write(data)
-            self.send_text.append(f"发送到设备 0x{addr:02X}: {data.hex().upper()}")
-            self.read_response(addr)
+            # 以用户优先级插队执行，应答由 I/O 线程回调后通过信号回到界面线程
+            future = self.poller.write_setpoint(address, value)
+            future.add_done_callback(
+                lambda f: self.setpoint_result_signal.emit(address, value, f.result() is not None))
+            self.log_console.log(f"已发送设定温度 {value:.1f}°C", device=f"0x{address:02X}")
         except Exception as e:
-            self.send_text.append(f"发送失败: {str(e)}")
+            self.log_console.log(f"发送失败: {str(e)}", ERROR, f"0x{address:02X}")
 
-    def read_response(self, addr):
-        """读取返回数据并解析温度"""
-        try:
-            data = self.serial_port.read(10)
-            if len(data) == 10:
-                self.receive_text.append(f"设备 0x{addr:02X} 接收: {data.hex().upper()}")
-                # 解析测量值和设定值
-                measured_value = (data[1] << 8 | data[0]) / 10.0
-                set_value = (data[3] << 8 | data[2]) / 10.0
-                if addr == 0x01:
-                    self.temperature_label_1.setText(f"设备 0x01 温度：测量值={measured_value:.1f}°C, 设定值={set_value:.1f}°C")
-                elif addr == 0x02:
-                    self.temperature_label_2.setText(f"设备 0x02 温度：测量值={measured_value:.1f}°C, 设定值={set_value:.1f}°C")
-            else:
-                self.receive_text.append(f"设备 0x{addr:02X} 接收数据不完整")
-        except Exception as e:
-            self.receive_text.append(f"接收失败: {str(e)}")
+    def setpoint_finished(self, address, value, acknowledged):
+        if acknowledged:
+            self.log_console.log(f"设定温度 {value:.1f}°C 已确认", device=f"0x{address:02X}")
+        else:
+            self.log_console.log(f"设定温度 {value:.1f}°C 未收到应答", WARNING, f"0x{address:02X}")
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = ModbusRTUMaster()
+    window = ModbusRTUMaster(SerialManager())
     window.show()
     sys.exit(app.exec_())
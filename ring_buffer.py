@@ -0,0 +1,95 @@
+"""
+定长环形缓冲区：数据保存在紧凑的 array 中，写满后覆盖最旧的数据，内存占用固定
+"""
+from array import array
+
+
+class RingBuffer:
+    """
+    单列环形缓冲区
+    """
+    def __init__(self, capacity, typecode='d'):
+        self.capacity = capacity
+        self.data = array(typecode, [0]) * capacity
+        self.start = 0  # 最旧数据的位置
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def append(self, value):
+        index = (self.start + self.size) % self.capacity
+        self.data[index] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def __getitem__(self, index):
+        """
+        按逻辑顺序取值，0 为最旧的数据，-1 为最新的数据
+        """
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("RingBuffer index out of range")
+        return self.data[(self.start + index) % self.capacity]
+
+    def values(self, first=0):
+        """
+        按时间顺序返回从逻辑位置 first 开始的全部数据（array 副本）
+        """
+        begin = (self.start + first) % self.capacity
+        count = self.size - first
+        if count <= 0:
+            return self.data[0:0]
+        end = begin + count
+        if end <= self.capacity:
+            return self.data[begin:end]
+        return self.data[begin:] + self.data[:end - self.capacity]
+
+
+class TimeSeriesBuffer:
+    """
+    时间序列环形缓冲区：一列时间戳加若干列数值，按列存储，共用同一写入位置
+    """
+    def __init__(self, capacity, channels):
+        self.timestamps = RingBuffer(capacity)
+        self.channels = [RingBuffer(capacity) for _ in range(channels)]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def clear(self):
+        self.timestamps.clear()
+        for channel in self.channels:
+            channel.clear()
+
+    def append(self, timestamp, *values):
+        self.timestamps.append(timestamp)
+        for channel, value in zip(self.channels, values):
+            channel.append(value)
+
+    def index_since(self, timestamp):
+        """
+        二分查找第一个时间戳不早于 timestamp 的逻辑位置（时间戳需单调递增）
+        """
+        low, high = 0, len(self.timestamps)
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[middle] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def since(self, timestamp):
+        """
+        返回 timestamp 之后的数据：(时间戳列, [数值列, ...])
+        """
+        first = self.index_since(timestamp)
+        return self.timestamps.values(first), [channel.values(first) for channel in self.channels]
@@ -0,0 +1,80 @@
+"""
+跨进程传递采样的共享内存环形缓冲区：采集工作进程写，主进程读（见 acquisition）。
+不依赖 Qt 和串口，可单独导入
+"""
+import struct
+import time
+from multiprocessing import shared_memory
+
+HEADER_FIELDS = 4  # 容量, 已写入总数, 已读取总数, 因缓冲区满丢弃的数量，均为本机字节序的 uint64
+HEADER_SIZE = HEADER_FIELDS * 8
+NAME_SIZE = 16  # 设备名和通道名 UTF-8 编码后的最大字节数
+RECORD = struct.Struct(f"<d{NAME_SIZE}s{NAME_SIZE}sd")  # 时间戳, 设备, 通道, 数值
+DEFAULT_CAPACITY = 65536  # 每条总线缓冲的采样数，主进程停顿数秒也不会丢失
+
+
+class SampleRing:
+    """
+    共享内存中的单生产者单消费者环形缓冲区：工作进程写，主进程读。
+    写入方只修改写入总数和丢弃数，读取方只修改读取总数，不需要跨进程的锁；缓冲区满时丢弃新采样并计数。
+    计数器通过 uint64 视图整体读写：struct 的标准格式逐字节打包，另一个进程可能读到写了一半的值
+    """
+    def __init__(self, name=None, capacity=DEFAULT_CAPACITY):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RECORD.size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.header = self.memory.buf[:HEADER_SIZE].cast("Q")
+        if name is None:
+            self.header[0] = capacity
+        self.capacity = self.header[0]
+
+    def __getstate__(self):
+        return self.memory.name  # 传给子进程时按名称重新打开
+
+    def __setstate__(self, name):
+        self.__init__(name)
+
+    def counters(self):
+        """
+        :return: (已写入总数, 已读取总数, 丢弃数)
+        """
+        return self.header[1], self.header[2], self.header[3]
+
+    def record(self, device, channel, value, timestamp=None):
+        """
+        与 TelemetryRecorder.record 接口相同；同一时刻只能有一个线程调用，多个线程写入时由调用方加锁
+        """
+        device_bytes, channel_bytes = device.encode(), channel.encode()
+        # struct 会静默截断过长的名称，截在多字节字符中间时读取方解码失败
+        if len(device_bytes) > NAME_SIZE or len(channel_bytes) > NAME_SIZE:
+            raise ValueError(f"设备名或通道名超过 {NAME_SIZE} 字节: {device}/{channel}")
+        header = self.header
+        written = header[1]
+        if written - header[2] >= self.capacity:
+            header[3] += 1
+            return
+        RECORD.pack_into(self.memory.buf, HEADER_SIZE + (written % self.capacity) * RECORD.size,
+                         time.time() if timestamp is None else timestamp,
+                         device_bytes, channel_bytes, float(value))
+        header[1] = written + 1  # 记录写完后才发布
+
+    def drain(self):
+        """
+        取出所有已写入的采样：[(时间戳, 设备, 通道, 数值), ...]
+        """
+        written, read = self.header[1], self.header[2]
+        buffer = self.memory.buf
+        samples = []
+        for index in range(read, written):
+            timestamp, device, channel, value = RECORD.unpack_from(
+                buffer, HEADER_SIZE + (index % self.capacity) * RECORD.size)
+            samples.append((timestamp, device.rstrip(b"\0").decode(), channel.rstrip(b"\0").decode(), value))
+        self.header[2] = written
+        return samples
+
+    def close(self, unlink=False):
+        self.header.release()  # 仍有导出的视图时共享内存无法关闭
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
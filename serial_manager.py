@@ -1,18 +1,49 @@
 import serial
 from threading import Lock
+from concurrent.futures import Future
+from serial_worker import SerialIOWorker, PRIORITY_USER, PRIORITY_POLL
+from bus_stats import BusStatistics
+from modbus_tcp import is_network_url, open_transport, SCHEME_TCP
 
-class SerialManager:
-    def __init__(self):
+# 各类仪器使用各自独立的总线（USB 转 485 适配器）
+ROLE_PUMP = "pump"
+ROLE_HOTPLATE = "hotplate"
+ROLE_SLIDE = "slide"
+ROLE_NAMES = {ROLE_PUMP: "气泵", ROLE_HOTPLATE: "热台", ROLE_SLIDE: "滑台"}
+
+
+class SerialConnection:
+    """
+    单个串口连接，拥有自己的 I/O 工作线程
+    """
+    def __init__(self, name, timeout=0.2):
+        self.name = name
+        self.port = None
         self.serial_port = None
+        self.worker = None
         self.is_connected = False
-        self.lock = Lock()  # 添加锁
+        self.lock = Lock()  # 添加锁，保护连接状态
+        self.baudrate = 9600
+        self.timeout = timeout
+        self.stats = BusStatistics(name)  # 每条总线的事务统计
 
     def connect(self, port, baudrate=9600):
         with self.lock:  # 使用锁保护代码块
             if self.is_connected:
                 return False  # 如果已经连接，返回False
-            self.serial_port = serial.Serial(port, baudrate, timeout=0.2)
+            self.port = port
+            self.baudrate = baudrate
+            if is_network_url(port):
+                # 以太网网关：tcp:// 为 ModBus TCP，rtu+tcp:// 为透明转发的 RTU
+                self.worker, self.serial_port = open_transport(port, self.timeout, self.stats)
+                self.worker.start()
+                self.is_connected = True
+                return True
+            self.serial_port = serial.Serial(port, baudrate, timeout=self.timeout)
             if self.serial_port.is_open:
+                # 串口对象此后只由 I/O 工作线程访问
+                self.worker = SerialIOWorker(self.serial_port, self.timeout, self.stats)
+                self.worker.start()
                 self.is_connected = True
                 return True
             return False
@@ -20,8 +51,12 @@ class SerialManager:
     def disconnect(self):
         with self.lock:  # 使用锁保护代码块
             if self.is_connected:
-                self.serial_port.close()
-                self.is_connected = False
+                self.worker.stop()
+                self.worker.join()
+                self.worker = None
+                self.is_connected = False  # 适配器已被拔出时 close 可能报错，状态仍应复位
+                if self.serial_port is not None:
+                    self.serial_port.close()
                 return True
             return False
 
@@ -29,15 +64,114 @@ class SerialManager:
         with self.lock:  # 使用锁保护
             return self.is_connected  # 返回连接状态
 
-    def send_data(self, data):
+    def submit(self, data, response_length=0, priority=PRIORITY_POLL, timeout=None, flush=False, decoder=None,
+               device=None):
+        """
+        向 I/O 工作线程提交事务，返回 Future；未连接、串口出错（如适配器被拔出）或事务因断开被取消时，
+        Future 的结果为 None，驱动线程按无应答处理，重新连接后继续轮询
+        """
+        result = Future()
+        result.elapsed = 0.0
         with self.lock:  # 使用锁保护
             if self.is_connected:
-                self.serial_port.write(data)
-                return True
-            return False
+                future = self.worker.submit(data, response_length, priority, timeout, flush, decoder, device)
+                future.add_done_callback(lambda f: self.finished(f, result))
+                return result
+        result.set_result(None)
+        return result
 
-    def receive_data(self, num_bytes):
-        with self.lock:  # 使用锁保护
-            if self.is_connected:
-                return self.serial_port.read(num_bytes)
-            return None
+    def finished(self, future, result):
+        result.elapsed = getattr(future, "elapsed", 0.0)
+        if future.cancelled() or future.exception() is not None:
+            result.set_result(None)
+        else:
+            result.set_result(future.result())
+
+    def transact(self, data, response_length=0, priority=PRIORITY_POLL, timeout=None, flush=False, decoder=None,
+                 device=None):
+        """
+        提交事务并等待应答
+        """
+        return self.submit(data, response_length, priority, timeout, flush, decoder, device).result()
+
+    def send_data(self, data, priority=PRIORITY_USER):
+        """
+        以用户优先级排队发送，不等待发送完成
+        """
+        if self.get_connection_status():
+            self.submit(data, priority=priority)
+            return True
+        return False
+
+    def receive_data(self, num_bytes, timeout=None):
+        """
+        读取 num_bytes 字节；timeout 不为 None 时仅对本次读取使用该超时（秒）
+        """
+        return self.transact(b"", num_bytes, timeout=timeout)
+
+    def reset_input_buffer(self):
+        """
+        丢弃接收缓冲区中残留的数据
+        """
+        self.transact(b"", flush=True)
+
+
+class SerialManager:
+    """
+    串口池：按名称（仪器角色）管理多个相互独立的串口连接
+    """
+    def __init__(self):
+        self.connections = {}
+        self.lock = Lock()  # 保护连接字典
+
+    def connection(self, name=ROLE_PUMP):
+        """
+        返回指定名称的连接，不存在时创建（尚未打开串口）
+        """
+        with self.lock:
+            connection = self.connections.get(name)
+            if connection is None:
+                connection = self.connections[name] = SerialConnection(name)
+            return connection
+
+    def connect(self, port, baudrate=9600, name=ROLE_PUMP):
+        """
+        为指定角色打开串口；同一个串口不能同时分配给两个角色，ModBus TCP 网关除外（连接在进程内共用）
+        """
+        shared = port.startswith(SCHEME_TCP + "://")
+        for other in self.connected():
+            if other.port == port and other.name != name and not shared:
+                return False
+        return self.connection(name).connect(port, baudrate)
+
+    def disconnect(self, name=ROLE_PUMP):
+        return self.connection(name).disconnect()
+
+    def disconnect_all(self):
+        for connection in self.connected():
+            connection.disconnect()
+
+    def get_connection_status(self, name=ROLE_PUMP):
+        return self.connection(name).get_connection_status()
+
+    def statistics(self):
+        """
+        所有总线的统计快照
+        """
+        with self.lock:
+            connections = list(self.connections.values())
+        return [connection.stats.snapshot() for connection in connections]
+
+    def reset_statistics(self):
+        with self.lock:
+            connections = list(self.connections.values())
+        for connection in connections:
+            connection.stats.reset()
+
+    def connected(self):
+        """
+        当前已打开的连接列表
+        """
+        with self.lock:
+            connections = list(self.connections.values())
+        return [connection for connection in connections if connection.get_connection_status()]
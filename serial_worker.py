@@ -0,0 +1,128 @@
+"""
+串口 I/O 工作线程：独占 serial.Serial 对象，按优先级依次执行收发事务
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from modbus_rtu import silence_interval
+
+PRIORITY_USER = 0  # 用户操作（设定流量、滑台运动），优先执行
+PRIORITY_POLL = 10  # 后台轮询
+_PRIORITY_STOP = -1  # 停止信号，先于所有事务
+
+
+class SerialIOWorker(threading.Thread):
+    """
+    每个串口一个工作线程。事务按 (优先级, 提交顺序) 出队，因此用户写入会越过排队中的轮询请求；
+    轮询线程每次只提交一个事务并等待结果，用户写入最多等待当前正在执行的那一个事务。
+    """
+    def __init__(self, serial_port, default_timeout, stats=None):
+        super().__init__(daemon=True)
+        self.serial_port = serial_port
+        self.default_timeout = default_timeout
+        self.stats = stats  # BusStatistics，可选
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()
+
+    def submit(self, data, response_length=0, priority=PRIORITY_POLL, timeout=None, flush=False, decoder=None,
+               device=None):
+        """
+        提交一次事务
+        :param data: 要发送的数据，为空时只读取
+        :param response_length: 期望读取的字节数，为 0 时只发送
+        :param priority: 优先级，数值越小越先执行
+        :param timeout: 本次读取的超时（秒），None 使用串口默认值
+        :param flush: 发送前是否丢弃接收缓冲区中的残留数据
+        :param decoder: 增量帧解析器（如 RTUFrameDecoder），给定时按帧读取，忽略 response_length
+        :param device: 统计用的设备标识，默认取请求的第一个字节（从站地址）
+        :return: Future，结果为读取到的字节；完成时 future.elapsed 为发送到读取结束的耗时（秒）
+        """
+        future = Future()
+        self.queue.put((priority, next(self.sequence), (bytes(data), response_length, timeout, flush, decoder, device, future)))
+        return future
+
+    def stop(self):
+        """
+        停止线程，尚未执行的事务会被取消
+        """
+        self.queue.put((_PRIORITY_STOP, next(self.sequence), None))
+
+    def run(self):
+        while True:
+            _, _, transaction = self.queue.get()
+            if transaction is None:
+                break
+            data, response_length, timeout, flush, decoder, device, future = transaction
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                response = self.execute(data, response_length, timeout, flush, decoder, device, future)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(response)
+
+        # 取消停止后仍在排队的事务
+        while True:
+            try:
+                _, _, transaction = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if transaction is not None:
+                transaction[-1].cancel()
+
+    def execute(self, data, response_length, timeout, flush, decoder, device, future):
+        if flush:
+            self.serial_port.reset_input_buffer()
+        started = time.perf_counter()
+        if data:
+            self.serial_port.write(data)
+        response = b""
+        timed_out = False
+        if decoder is not None:
+            response, timed_out = self.read_frame(decoder, self.default_timeout if timeout is None else timeout)
+        elif response_length:
+            self.serial_port.timeout = self.default_timeout if timeout is None else timeout
+            try:
+                response = self.serial_port.read(response_length)
+            finally:
+                self.serial_port.timeout = self.default_timeout
+            timed_out = len(response) < response_length
+        future.elapsed = time.perf_counter() - started
+
+        # 只统计有应答期望的事务
+        if self.stats is not None and data and (decoder is not None or response_length):
+            self.stats.record_transaction(
+                data[0] if device is None else device, future.elapsed, len(data), len(response), timed_out
+            )
+        return response
+
+    def read_frame(self, decoder, timeout):
+        """
+        按到达的字节增量解析，帧完整立即返回；帧长未知时以 3.5 字符静默作为帧结束。
+        解析器丢弃残留数据后缓冲区为空，此时继续等待真正的应答，不按静默结束；
+        超时返回已收到的部分数据
+        :return: (数据, 是否超时)
+        """
+        silence = silence_interval(self.serial_port.baudrate)
+        deadline = time.perf_counter() + timeout
+        last_byte = None
+        self.serial_port.timeout = silence
+        try:
+            while True:
+                chunk = self.serial_port.read(self.serial_port.in_waiting or 1)
+                now = time.perf_counter()
+                if chunk:
+                    frame = decoder.feed(chunk)
+                    if frame is not None:
+                        return frame, False
+                    last_byte = now
+                elif (last_byte is not None and decoder.pending() and decoder.expected_length() is None
+                      and now - last_byte >= silence):
+                    return decoder.pending(), False
+                if now >= deadline:
+                    return decoder.pending(), True
+        finally:
+            self.serial_port.timeout = self.default_timeout
@@ -0,0 +1,90 @@
+"""
+写后延迟保存的 JSON 设置存储：短时间内的多次修改合并为一次写入，
+写入在后台线程中通过临时文件 + 重命名完成，进程崩溃时文件要么是旧内容要么是新内容
+"""
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))  # 与程序同目录，不依赖当前工作目录
+DEFAULT_DELAY = 0.5  # 最后一次修改后延迟写入的时间（秒）
+
+
+class SettingsStore:
+    def __init__(self, path, delay=DEFAULT_DELAY):
+        self.path = path
+        self.delay = delay
+        self.lock = threading.Lock()  # 保护 data、timer 和修改计数
+        self.write_lock = threading.Lock()  # 保证同一时间只有一个写入；先取 write_lock 再取 lock
+        self.timer = None
+        self.dirty = False
+        self.revision = 0  # 每次修改加一，写入完成时据此判断期间是否又有修改
+        self.data = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        """
+        修改若干项并安排延迟写入；值未变化时不写盘
+        """
+        with self.lock:
+            changed = any(self.data.get(key) != value for key, value in values.items())
+            if not changed:
+                return
+            self.data.update(values)
+            self.dirty = True
+            self.revision += 1
+            # 每次修改都重新计时，连续修改只在停下来后写一次
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.start()
+
+    def flush(self):
+        """
+        立即写入尚未保存的修改。取快照和写盘都在 write_lock 内，后取快照的写入一定后完成，
+        不会被较旧的内容覆盖；写入失败时保留 dirty，下一次修改或 close 时重试
+        """
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty:
+                    return
+                content = json.dumps(self.data, ensure_ascii=False, indent=2)
+                revision = self.revision
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".json")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+            with self.lock:
+                # 写盘期间又有修改时仍为 dirty，由那次修改安排的定时器写入
+                if self.revision == revision:
+                    self.dirty = False
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,428 @@
+"""
+本地硬件模拟器：在伪终端上模拟气泵（ModBus RTU 流量计）、热台温控器和滑台步进驱动器
+
+运行后打印每条模拟总线的串口路径，在首页把这些路径分配给对应角色即可，无需改动程序：
+    python simulator.py --mfc 16 --hotplate 2 --slide 1 --latency 5 --jitter 2 --drop 0.01
+    python simulator.py --tcp-port 5502 --rtu-tcp-port 5503   # 另外模拟以太网网关，打印的地址同样可直接填入
+"""
+import argparse
+import os
+import random
+import select
+import socket
+import struct
+import threading
+import time
+import tty
+from modbus_rtu import calculate_checksum
+
+FRAME_END = 0x6B  # 滑台帧尾
+DEVIATION_ALARM = 5.0  # 温控器偏差报警限（°C）
+
+
+class SimulatorConfig:
+    """
+    应答延迟、抖动、错误注入和波特率（用于模拟线上传输时间）
+    """
+    def __init__(self, latency=0.005, jitter=0.0, drop_rate=0.0, corrupt_rate=0.0, baudrate=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.baudrate = baudrate
+        self.random = random.Random(seed)
+
+    def response_delay(self, response_length):
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if self.baudrate:
+            delay += response_length * 11 / self.baudrate
+        return delay
+
+
+# ---- 气泵：ModBus RTU 流量计 ----
+
+class MFCDevice:
+    """
+    寄存器 0x0010 显示流量、0x0011 设定流量、0x0030 量程，线圈 0x0006 单位；显示流量按一阶惯性跟随设定流量
+    """
+    def __init__(self, address, range_value=100, unit=0, time_constant=1.0, noise=2):
+        self.address = address
+        self.registers = {0x0010: 0, 0x0011: 0, 0x0030: range_value}
+        self.coils = {0x0006: unit}
+        self.time_constant = time_constant
+        self.noise = noise
+        self.display = 0.0
+        self.updated = time.monotonic()
+
+    def update(self):
+        now = time.monotonic()
+        factor = min(1.0, (now - self.updated) / self.time_constant)
+        self.updated = now
+        self.display += (self.registers[0x0011] - self.display) * factor
+        value = int(self.display + random.uniform(-self.noise, self.noise))
+        self.registers[0x0010] = max(0, min(0x0FFF, value))
+
+    def exception(self, function, code):
+        frame = bytearray([self.address, function | 0x80, code])
+        return bytes(frame + calculate_checksum(frame))
+
+    def handle(self, frame):
+        if frame[-2:] != calculate_checksum(frame[:-2]):
+            return None  # CRC 错误的请求不应答
+        function = frame[1]
+        start = int.from_bytes(frame[2:4], byteorder='big')
+        value = int.from_bytes(frame[4:6], byteorder='big')
+        self.update()
+        if function == 0x03:
+            if not 1 <= value <= 125:
+                return self.exception(function, 0x03)
+            data = b"".join(self.registers.get(start + i, 0).to_bytes(2, byteorder='big') for i in range(value))
+            reply = bytearray([self.address, function, len(data)]) + data
+        elif function == 0x01:
+            bits = 0
+            for i in range(value):
+                bits |= (self.coils.get(start + i, 0) & 1) << i
+            data = bits.to_bytes((value + 7) // 8, byteorder='little')
+            reply = bytearray([self.address, function, len(data)]) + data
+        elif function == 0x06:
+            if start not in self.registers:
+                return self.exception(function, 0x02)
+            self.registers[start] = value
+            return bytes(frame)  # 写单个寄存器：原样回显
+        else:
+            return self.exception(function, 0x01)
+        return bytes(reply + calculate_checksum(reply))
+
+
+class ModbusProtocol:
+    @staticmethod
+    def frame_length(buffer):
+        if len(buffer) < 2:
+            return None
+        if buffer[1] in (0x0F, 0x10):
+            return 9 + buffer[6] if len(buffer) >= 7 else None
+        return 8
+
+    @staticmethod
+    def address(frame):
+        return frame[0]
+
+
+# ---- 热台：温控器 ----
+
+def hotplate_checksum(command_type, param_code, addr, value=0):
+    """
+    与 retai.calculate_checksum 相同的校验算法（设备侧实现）
+    """
+    if command_type == 0x52:
+        checksum = param_code * 256 + 0x52 + addr
+    else:
+        checksum = param_code * 256 + 0x43 + value + addr
+    return checksum & 0xFFFF
+
+
+class HotPlateDevice:
+    """
+    应答 10 字节：测量值、设定值、输出值 + 报警状态、所读参数值（均为小端），以及校验和
+    """
+    def __init__(self, address, pv=25.0, sv=25.0, heat_rate=2.0):
+        self.address = address
+        self.pv = pv
+        self.sv = sv
+        self.heat_rate = heat_rate  # 每秒最大升温（°C）
+        self.parameters = {0x00: int(sv * 10)}
+        self.alarm = 0
+        self.updated = time.monotonic()
+
+    def update(self):
+        now = time.monotonic()
+        step = self.heat_rate * (now - self.updated)
+        self.updated = now
+        error = self.sv - self.pv
+        self.pv += max(-step, min(step, error)) + random.uniform(-0.05, 0.05)
+        self.output = max(0, min(100, int(error * 10)))
+        # 偏差超过报警限时置正/负偏差报警位
+        self.alarm = (0x04 if -error > DEVIATION_ALARM else 0) | (0x08 if error > DEVIATION_ALARM else 0)
+
+    def handle(self, frame):
+        addr = frame[0] - 0x80
+        command, param_code = frame[2], frame[3]
+        value = frame[4] | frame[5] << 8
+        if (frame[6] | frame[7] << 8) != hotplate_checksum(command, param_code, addr, value):
+            return None
+        if command == 0x43:
+            self.parameters[param_code] = value
+            if param_code == 0x00:
+                self.sv = value / 10.0
+        self.update()
+        pv, sv = int(self.pv * 10) & 0xFFFF, int(self.sv * 10) & 0xFFFF
+        parameter = self.parameters.get(param_code, 0)
+        checksum = (pv + sv + (self.alarm << 8 | self.output) + parameter + addr) & 0xFFFF
+        return bytes([pv & 0xFF, pv >> 8, sv & 0xFF, sv >> 8, self.output, self.alarm,
+                      parameter & 0xFF, parameter >> 8, checksum & 0xFF, checksum >> 8])
+
+
+class HotPlateProtocol:
+    @staticmethod
+    def frame_length(buffer):
+        return 8
+
+    @staticmethod
+    def address(frame):
+        return frame[0] - 0x80 if frame[0] == frame[1] else None
+
+
+# ---- 滑台：步进驱动器 ----
+
+class SlideDevice:
+    """
+    0xFD 位置运动、0x36 读实时位置、0x3A 读状态标志；按转速匀速移动
+    """
+    def __init__(self, address, pulses_per_rev=3200):
+        self.address = address
+        self.pulses_per_rev = pulses_per_rev
+        self.position = 0.0
+        self.target = 0
+        self.speed = 0.0  # 脉冲/秒
+        self.updated = time.monotonic()
+
+    def update(self):
+        now = time.monotonic()
+        step = self.speed * (now - self.updated)
+        self.updated = now
+        error = self.target - self.position
+        self.position = self.target if abs(error) <= step else self.position + (step if error > 0 else -step)
+
+    def handle(self, frame):
+        self.update()
+        command = frame[1]
+        if command == 0xFD:
+            rpm = frame[3] << 8 | frame[4]
+            pulses = int.from_bytes(frame[6:10], byteorder='big')
+            self.target = pulses if frame[2] else -pulses
+            self.speed = rpm * self.pulses_per_rev / 60.0
+            return bytes([self.address, 0xFD, 0x02, FRAME_END])
+        if command == 0x36:
+            units = int(abs(self.position) * 65536 / self.pulses_per_rev)
+            return bytes([self.address, 0x36, 1 if self.position < 0 else 0]) \
+                + units.to_bytes(4, byteorder='big') + bytes([FRAME_END])
+        if command == 0x3A:
+            flags = 0x01 | (0x02 if self.position == self.target else 0)
+            return bytes([self.address, 0x3A, flags, FRAME_END])
+        return bytes([self.address, 0x00, 0xEE, FRAME_END])
+
+
+class SlideProtocol:
+    @staticmethod
+    def frame_length(buffer):
+        if len(buffer) < 2:
+            return None
+        if buffer[1] == 0xFD:
+            return 13
+        if buffer[1] in (0x36, 0x3A):
+            return 3
+        end = buffer.find(bytes([FRAME_END]), 1)
+        return end + 1 if end >= 0 else None
+
+    @staticmethod
+    def address(frame):
+        return frame[0]
+
+
+# ---- 伪终端总线 ----
+
+class SimulatedBus(threading.Thread):
+    """
+    一条模拟总线：一个伪终端，挂若干设备；按协议切分请求帧，找不到对应设备的帧丢弃
+    """
+    def __init__(self, name, protocol, devices, config):
+        super().__init__(daemon=True)
+        self.name = name
+        self.protocol = protocol
+        self.devices = {device.address: device for device in devices}
+        self.config = config
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # 原始模式：不回显、不转换换行
+        self.port = os.ttyname(self.slave)
+        self.running = True
+        self.frames = 0
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        buffer = bytearray()
+        while self.running:
+            readable, _, _ = select.select([self.master], [], [], 0.1)
+            if not readable:
+                buffer.clear()  # 长时间静默，丢弃残缺帧
+                continue
+            buffer += os.read(self.master, 4096)
+            while True:
+                length = self.protocol.frame_length(buffer)
+                if length is None or len(buffer) < length:
+                    break
+                frame = bytes(buffer[:length])
+                del buffer[:length]
+                self.dispatch(frame)
+
+    def dispatch(self, frame):
+        response = respond(self, frame)
+        if response is not None:
+            os.write(self.master, response)
+
+
+def respond(bus, frame):
+    """
+    把请求帧交给对应设备，按配置模拟丢包、校验错误和应答延迟；不应答时返回 None
+    """
+    device = bus.devices.get(bus.protocol.address(frame))
+    if device is None:
+        return None
+    bus.frames += 1
+    response = device.handle(frame)
+    if response is None or bus.config.random.random() < bus.config.drop_rate:
+        return None
+    if bus.config.random.random() < bus.config.corrupt_rate:
+        corrupted = bytearray(response)
+        corrupted[-1] ^= 0xFF
+        response = bytes(corrupted)
+    time.sleep(bus.config.response_delay(len(response)))
+    return response
+
+
+class SimulatedTCPServer(threading.Thread):
+    """
+    模拟以太网网关：mode 为 "tcp" 时按 ModBus TCP（MBAP 报文头）应答，为 "rtu" 时透明转发 RTU 帧；
+    每个客户端一个线程，设备在客户端之间共用
+    """
+    def __init__(self, name, devices, config, mode="tcp", host="127.0.0.1", port=0):
+        super().__init__(daemon=True)
+        self.name = name
+        self.protocol = ModbusProtocol
+        self.devices = {device.address: device for device in devices}
+        self.config = config
+        self.mode = mode
+        self.lock = threading.Lock()  # 设备状态不是线程安全的，同一时刻只处理一个请求
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        scheme = "tcp" if mode == "tcp" else "rtu+tcp"
+        self.port = f"{scheme}://{host}:{self.server.getsockname()[1]}"
+        self.running = True
+        self.frames = 0
+
+    def stop(self):
+        self.running = False
+        self.server.close()
+
+    def run(self):
+        while self.running:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            target = self.serve_tcp if self.mode == "tcp" else self.serve_rtu
+            threading.Thread(target=target, args=(client,), daemon=True).start()
+
+    def serve_tcp(self, client):
+        buffer = bytearray()
+        with client:
+            while self.running:
+                data = client.recv(4096)
+                if not data:
+                    return
+                buffer += data
+                while len(buffer) >= 7:
+                    transaction_id, _, length, unit = struct.unpack_from(">HHHB", buffer)
+                    end = 6 + length
+                    if len(buffer) < end:
+                        break
+                    frame = bytes([unit]) + bytes(buffer[7:end])
+                    del buffer[:end]
+                    with self.lock:
+                        response = respond(self, frame + calculate_checksum(frame))
+                    if response is None or calculate_checksum(response[:-2]) != response[-2:]:
+                        continue  # 网关对校验错误的 RTU 应答同样不转发
+                    pdu = response[1:-2]
+                    client.sendall(struct.pack(">HHHB", transaction_id, 0, len(pdu) + 1, unit) + pdu)
+
+    def serve_rtu(self, client):
+        buffer = bytearray()
+        with client:
+            while self.running:
+                readable, _, _ = select.select([client], [], [], 0.1)
+                if not readable:
+                    buffer.clear()  # 长时间静默，丢弃残缺帧
+                    continue
+                data = client.recv(4096)
+                if not data:
+                    return
+                buffer += data
+                while True:
+                    length = self.protocol.frame_length(buffer)
+                    if length is None or len(buffer) < length:
+                        break
+                    frame = bytes(buffer[:length])
+                    del buffer[:length]
+                    with self.lock:
+                        response = respond(self, frame)
+                    if response is not None:
+                        client.sendall(response)
+
+
+def build_buses(mfc_count=16, hotplate_count=2, slide_count=1, config=None):
+    """
+    创建（尚未启动的）模拟总线列表
+    """
+    config = config or SimulatorConfig()
+    buses = []
+    if mfc_count:
+        buses.append(SimulatedBus("pump", ModbusProtocol,
+                                  [MFCDevice(address) for address in range(1, mfc_count + 1)], config))
+    if hotplate_count:
+        buses.append(SimulatedBus("hotplate", HotPlateProtocol,
+                                  [HotPlateDevice(address) for address in range(1, hotplate_count + 1)], config))
+    if slide_count:
+        buses.append(SimulatedBus("slide", SlideProtocol,
+                                  [SlideDevice(address) for address in range(1, slide_count + 1)], config))
+    return buses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="气泵 / 热台 / 滑台 硬件模拟器")
+    parser.add_argument("--mfc", type=int, default=16, help="流量计数量（地址从 1 开始）")
+    parser.add_argument("--hotplate", type=int, default=2, help="温控器数量")
+    parser.add_argument("--slide", type=int, default=1, help="滑台驱动器数量")
+    parser.add_argument("--latency", type=float, default=5.0, help="应答延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="应答延迟抖动（毫秒）")
+    parser.add_argument("--drop", type=float, default=0.0, help="不应答的概率")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="应答校验错误的概率")
+    parser.add_argument("--baudrate", type=int, default=None, help="按该波特率模拟应答传输时间")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--tcp-port", type=int, default=None, help="另在该端口以 ModBus TCP 网关提供流量计")
+    parser.add_argument("--rtu-tcp-port", type=int, default=None, help="另在该端口以 RTU over TCP 网关提供流量计")
+    args = parser.parse_args()
+
+    config = SimulatorConfig(args.latency / 1000.0, args.jitter / 1000.0, args.drop, args.corrupt,
+                             args.baudrate, args.seed)
+    buses = build_buses(args.mfc, args.hotplate, args.slide, config)
+    for mode, port in (("tcp", args.tcp_port), ("rtu", args.rtu_tcp_port)):
+        if port is not None:
+            buses.append(SimulatedTCPServer(f"pump-{mode}", [MFCDevice(address) for address in range(1, args.mfc + 1)],
+                                            config, mode, port=port))
+    for bus in buses:
+        bus.start()
+        print(f"{bus.name}: {bus.port}", flush=True)
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+滑台闭环运动控制：解析步进驱动器的应答，按设定频率查询实时位置和到位状态，
+多段运动排队执行，上一段到位后立即发出下一段，不再按固定延时等待
+"""
+import threading
+from collections import deque
+from PyQt5.QtCore import QThread, pyqtSignal
+from serial_worker import PRIORITY_USER, PRIORITY_POLL
+
+FRAME_END = 0x6B  # 帧尾校验字节
+
+CMD_POSITION = 0xFD  # 位置模式运动
+CMD_READ_POSITION = 0x36  # 读取实时位置
+CMD_READ_STATUS = 0x3A  # 读取状态标志
+
+ACK_OK = 0x02  # 命令已接收
+ACK_CONDITION = 0xE2  # 条件不满足（如未使能、堵转保护中）
+ACK_ERROR = 0xEE  # 命令错误
+
+FLAG_ENABLED = 0x01  # 电机使能
+FLAG_IN_POSITION = 0x02  # 到位
+FLAG_STALLED = 0x04  # 堵转
+
+POSITION_UNITS_PER_REV = 65536  # 实时位置每圈的计数
+DEFAULT_PULSES_PER_REV = 3200  # 每圈脉冲数（16 细分）
+DEFAULT_SPEED = 0x0050  # 转速（RPM）
+DEFAULT_ACCELERATION = 0x01
+DEFAULT_POLL_INTERVAL = 0.05  # 运动中查询周期（秒）
+DEFAULT_IDLE_INTERVAL = 0.5  # 空闲时查询周期（秒）
+DEFAULT_TOLERANCE = 5  # 到位判定允许的误差（脉冲）
+RESPONSE_TIMEOUT = 0.1
+
+
+def build_position_command(address, position, speed=DEFAULT_SPEED, acceleration=DEFAULT_ACCELERATION):
+    """
+    绝对位置运动指令：地址 FD 方向 速度(2) 加速度 脉冲数(4) 绝对模式 不同步 6B
+    """
+    direction = 0x01 if position >= 0 else 0x00
+    pulses = abs(position)
+    return bytes([address, CMD_POSITION, direction, speed >> 8, speed & 0xFF, acceleration]) \
+        + pulses.to_bytes(4, byteorder='big') + bytes([0x01, 0x00, FRAME_END])
+
+
+def build_query(address, command):
+    return bytes([address, command, FRAME_END])
+
+
+def parse_ack(address, response):
+    """
+    解析运动指令应答，返回应答码，格式不对时返回 None
+    """
+    if response and len(response) == 4 and response[0] == address and response[3] == FRAME_END:
+        return response[2]
+    return None
+
+
+def parse_position(address, response, pulses_per_rev=DEFAULT_PULSES_PER_REV):
+    """
+    解析实时位置应答：地址 36 符号 位置(4) 6B，换算为脉冲数
+    """
+    if not response or len(response) != 8 or response[0] != address or response[1] != CMD_READ_POSITION \
+            or response[7] != FRAME_END:
+        return None
+    value = int.from_bytes(response[3:7], byteorder='big') * pulses_per_rev // POSITION_UNITS_PER_REV
+    return -value if response[2] else value
+
+
+def parse_status(address, response):
+    """
+    解析状态标志应答：地址 3A 标志 6B
+    """
+    if not response or len(response) != 4 or response[0] != address or response[1] != CMD_READ_STATUS \
+            or response[3] != FRAME_END:
+        return None
+    return response[2]
+
+
+class SlideController(QThread):
+    """
+    滑台运动线程：执行排队的目标位置序列，并持续报告实时位置
+    """
+    position_signal = pyqtSignal(int)  # 实时位置（脉冲）
+    arrived_signal = pyqtSignal(int)  # 已到达的目标位置
+    sequence_finished_signal = pyqtSignal()  # 队列中的所有运动已完成
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, connection, address=0x01, poll_interval=DEFAULT_POLL_INTERVAL,
+                 idle_interval=DEFAULT_IDLE_INTERVAL, pulses_per_rev=DEFAULT_PULSES_PER_REV,
+                 tolerance=DEFAULT_TOLERANCE, recorder=None):
+        super().__init__()
+        self.connection = connection
+        self.address = address
+        self.poll_interval = poll_interval
+        self.idle_interval = idle_interval
+        self.pulses_per_rev = pulses_per_rev
+        self.tolerance = tolerance
+        self.recorder = recorder
+        self.speed = DEFAULT_SPEED
+        self.acceleration = DEFAULT_ACCELERATION
+
+        self.pending = deque()  # 等待执行的目标位置
+        self.lock = threading.Lock()  # 保护 pending
+        self.wakeup = threading.Event()  # 有新任务时提前结束等待
+        self.target = None  # 当前运动的目标位置
+        self.running = True
+
+    def move_to(self, position):
+        self.run_sequence([position])
+
+    def run_sequence(self, positions):
+        """
+        追加多段运动，依次执行
+        """
+        with self.lock:
+            self.pending.extend(positions)
+        self.wakeup.set()
+
+    def cancel(self):
+        """
+        清空尚未开始的运动（当前这一段仍会走完）
+        """
+        with self.lock:
+            self.pending.clear()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def run(self):
+        while self.running:
+            if not self.connection.get_connection_status():
+                self.target = None
+                self.wait_for(self.idle_interval)
+                continue
+            try:
+                self.step()
+            except Exception as e:
+                # 通信出错（如适配器刚被拔出）时放弃当前序列，线程继续运行，重连后恢复位置轮询
+                self.abort(f"通信错误: {str(e)}")
+                self.wait_for(self.idle_interval)
+
+    def step(self):
+        """
+        一次循环：开始下一段运动（如有），读取状态和位置，判断是否到位，然后等待下一次轮询
+        """
+        if self.target is None:
+            with self.lock:
+                target = self.pending.popleft() if self.pending else None
+            if target is not None:
+                self.start_move(target)
+
+        status = parse_status(self.address, self.query(CMD_READ_STATUS, 4))
+        position = parse_position(self.address, self.query(CMD_READ_POSITION, 8), self.pulses_per_rev)
+        if position is not None:
+            self.position_signal.emit(position)
+            if self.recorder is not None:
+                self.recorder.record(f"slide/{self.address:02X}", "position", position)
+
+        if self.target is not None and status is not None and position is not None:
+            if status & FLAG_STALLED:
+                self.abort(f"堵转，停在 {position}")
+            elif status & FLAG_IN_POSITION and abs(position - self.target) <= self.tolerance:
+                self.arrived_signal.emit(self.target)
+                self.target = None
+                with self.lock:
+                    finished = not self.pending
+                if finished:
+                    self.sequence_finished_signal.emit()
+                return  # 到位后立即开始下一段
+
+        self.wait_for(self.poll_interval if self.target is not None else self.idle_interval)
+
+    def wait_for(self, seconds):
+        self.wakeup.wait(seconds)
+        self.wakeup.clear()
+
+    def query(self, command, response_length):
+        return self.connection.transact(
+            build_query(self.address, command), response_length, priority=PRIORITY_POLL, timeout=RESPONSE_TIMEOUT
+        )
+
+    def start_move(self, target):
+        frame = build_position_command(self.address, target, self.speed, self.acceleration)
+        response = self.connection.transact(frame, 4, priority=PRIORITY_USER, timeout=RESPONSE_TIMEOUT)
+        ack = parse_ack(self.address, response)
+        if ack == ACK_OK:
+            self.target = target
+            if self.recorder is not None:
+                self.recorder.record(f"slide/{self.address:02X}", "target_position", target)
+        elif ack == ACK_CONDITION:
+            self.abort(f"驱动器拒绝运动到 {target}：条件不满足")
+        elif ack == ACK_ERROR:
+            self.abort(f"驱动器拒绝运动到 {target}：命令错误")
+        else:
+            self.abort(f"运动到 {target} 未收到有效应答")
+
+    def abort(self, message):
+        """
+        当前运动失败时放弃整个序列
+        """
+        self.target = None
+        self.cancel()
+        self.error_signal.emit(message)
@@ -0,0 +1,151 @@
+"""
+采集守护进程的本地流协议：每帧为 4 字节大端长度 + UTF-8 JSON 消息
+
+客户端 -> 守护进程：
+    {"type": "command", "id": 1, "command": "set_flow", "address": 1, "percent": 50}
+    {"type": "subscribe", "devices": ["pump/", "hotplate/01"]}   # 按设备名前缀过滤，空列表表示全部
+守护进程 -> 客户端：
+    {"type": "samples", "samples": [[时间戳, 设备, 通道, 数值], ...]}   # 按批推送
+    {"type": "reply", "id": 1, "ok": true, "result": ...} / {"type": "reply", "id": 1, "ok": false, "error": "..."}
+    {"type": "event", "event": "...", ...}
+地址写作 tcp://host:port 或 unix:///path/to/socket
+"""
+import json
+import socket
+import struct
+import threading
+from concurrent.futures import Future
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # 超过该长度视为协议错误
+DEFAULT_ADDRESS = "tcp://127.0.0.1:5020"
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode(message):
+    payload = json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def receive_exactly(sock, count):
+    """
+    读满 count 字节；对端在帧边界关闭时返回 None
+    """
+    chunks = bytearray()
+    while len(chunks) < count:
+        chunk = sock.recv(count - len(chunks))
+        if not chunk:
+            if chunks:
+                raise ProtocolError("连接在帧中间断开")
+            return None
+        chunks += chunk
+    return bytes(chunks)
+
+
+def read_message(sock):
+    """
+    读取一帧并解码，连接关闭时返回 None
+    """
+    header = receive_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"帧长度 {length} 超过上限")
+    payload = receive_exactly(sock, length) if length else b""
+    if payload is None:
+        raise ProtocolError("连接在帧中间断开")
+    return json.loads(payload.decode("utf-8"))
+
+
+def parse_address(address):
+    """
+    :return: (地址族, 地址)，可直接用于 socket.socket / bind / connect
+    """
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    raise ValueError(f"无法识别的地址: {address}")
+
+
+class StreamClient:
+    """
+    守护进程客户端：后台线程接收推送，样本交给 on_samples 回调，命令应答通过 Future 返回
+    """
+    def __init__(self, address=DEFAULT_ADDRESS, on_samples=None, on_event=None):
+        family, target = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(target)
+        self.on_samples = on_samples
+        self.on_event = on_event
+        self.send_lock = threading.Lock()
+        self.pending = {}  # 命令编号 -> Future
+        self.pending_lock = threading.Lock()
+        self.next_id = 1
+        self.connected = True
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+
+    def send(self, message):
+        with self.send_lock:
+            self.sock.sendall(encode(message))
+
+    def subscribe(self, devices=()):
+        self.send({"type": "subscribe", "devices": list(devices)})
+
+    def command(self, command, **arguments):
+        """
+        发送命令，返回 Future，结果为应答中的 result；守护进程报告失败时以 RuntimeError 结束
+        """
+        future = Future()
+        with self.pending_lock:
+            command_id = self.next_id
+            self.next_id += 1
+            self.pending[command_id] = future
+        self.send(dict(arguments, type="command", id=command_id, command=command))
+        return future
+
+    def call(self, command, timeout=5.0, **arguments):
+        return self.command(command, **arguments).result(timeout)
+
+    def read_loop(self):
+        try:
+            while True:
+                message = read_message(self.sock)
+                if message is None:
+                    break
+                kind = message.get("type")
+                if kind == "samples":
+                    if self.on_samples is not None:
+                        self.on_samples(message["samples"])
+                elif kind == "reply":
+                    with self.pending_lock:
+                        future = self.pending.pop(message.get("id"), None)
+                    if future is not None:
+                        if message.get("ok"):
+                            future.set_result(message.get("result"))
+                        else:
+                            future.set_exception(RuntimeError(message.get("error", "命令失败")))
+                elif kind == "event" and self.on_event is not None:
+                    self.on_event(message)
+        except (OSError, ProtocolError, ValueError):
+            pass
+        finally:
+            self.connected = False
+            with self.pending_lock:
+                pending, self.pending = self.pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError("与守护进程的连接已断开"))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self.reader.join()
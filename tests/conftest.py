@@ -0,0 +1,64 @@
+"""
+测试共用的假串口：不需要 pyserial 和硬件，按脚本在写入后延迟送达应答
+"""
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ScriptedPort:
+    """
+    模拟 serial.Serial 的读写接口。replies 中每一项对应一次写入，为 [(延迟秒, 数据), ...]，
+    leftover 为一开始就在接收缓冲区中的残留数据
+    """
+    def __init__(self, replies=(), leftover=b"", baudrate=9600):
+        self.baudrate = baudrate
+        self.timeout = None
+        self.buffer = bytearray(leftover)
+        self.replies = list(replies)
+        self.scheduled = []
+        self.written = []
+
+    def arrive(self):
+        now = time.perf_counter()
+        for item in [item for item in self.scheduled if item[0] <= now]:
+            self.scheduled.remove(item)
+            self.buffer += item[1]
+
+    @property
+    def in_waiting(self):
+        self.arrive()
+        return len(self.buffer)
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        now = time.perf_counter()
+        if self.replies:
+            for delay, payload in self.replies.pop(0):
+                self.scheduled.append((now + delay, payload))
+
+    def read(self, size=1):
+        deadline = time.perf_counter() + (self.timeout or 0)
+        while True:
+            self.arrive()
+            if self.buffer or time.perf_counter() >= deadline:
+                break
+            time.sleep(0.0005)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self.arrive()
+        self.buffer.clear()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def scripted_port():
+    return ScriptedPort
@@ -0,0 +1,74 @@
+import time
+import modbus_client
+from bus_stats import BusStatistics
+from modbus_client import ModbusClient
+from modbus_rtu import build_read_request, calculate_checksum
+from serial_worker import SerialIOWorker
+
+REQUEST = build_read_request(0x01, 0x0010, 1)
+REPLY = bytes([0x01, 0x03, 0x02, 0x00, 0x64]) + calculate_checksum(bytes([0x01, 0x03, 0x02, 0x00, 0x64]))
+
+
+class WorkerConnection:
+    """
+    只包含 ModbusClient 用到的 SerialConnection 接口
+    """
+    def __init__(self, port):
+        self.stats = BusStatistics("test")
+        self.worker = SerialIOWorker(port, 0.05, self.stats)
+        self.worker.start()
+
+    def submit(self, data, response_length=0, priority=10, timeout=None, flush=False, decoder=None, device=None):
+        return self.worker.submit(data, response_length, priority, timeout, flush, decoder, device)
+
+    def get_connection_status(self):
+        return True
+
+    def counters(self):
+        return self.stats.snapshot()["devices"]["1"]
+
+    def close(self):
+        self.worker.stop()
+        self.worker.join()
+
+
+def test_retry_after_missing_reply(scripted_port):
+    connection = WorkerConnection(scripted_port(replies=[[], [(0.002, REPLY)]]))
+    try:
+        begin = time.perf_counter()
+        response = ModbusClient(connection, retries=2, backoff=0.05).transact(REQUEST)
+        elapsed = time.perf_counter() - begin
+    finally:
+        connection.close()
+    assert response == REPLY
+    assert elapsed >= 0.05 + 0.05  # 第一次超时 + 退避
+    assert connection.counters()["retries"] == 1
+    assert connection.counters()["timeouts"] == 1
+
+
+def test_retries_exhausted_returns_none_with_capped_backoff(scripted_port, monkeypatch):
+    delays = []
+    timer = modbus_client.threading.Timer
+    monkeypatch.setattr(modbus_client.threading, "Timer",
+                        lambda delay, *args: delays.append(delay) or timer(0, *args))
+    connection = WorkerConnection(scripted_port())
+    try:
+        response = ModbusClient(connection, retries=3, backoff=0.01, max_backoff=0.015).transact(REQUEST, timeout=0.01)
+    finally:
+        connection.close()
+    assert response is None
+    assert delays == [0.01, 0.015, 0.015]
+    assert connection.counters()["retries"] == 3
+
+
+def test_corrupted_reply_counts_crc_error_and_retries(scripted_port):
+    corrupted = bytearray(REPLY)
+    corrupted[-2] ^= 0xFF
+    connection = WorkerConnection(scripted_port(replies=[[(0.002, bytes(corrupted))], [(0.002, REPLY)]]))
+    try:
+        response = ModbusClient(connection, backoff=0.001).transact(REQUEST)
+    finally:
+        connection.close()
+    assert response == REPLY
+    counters = connection.counters()
+    assert counters["crc_errors"] == 1 and counters["retries"] == 1 and counters["resyncs"] == 0
@@ -0,0 +1,52 @@
+from modbus_rtu import MatchingFrameDecoder, build_read_request, calculate_checksum
+
+
+def frame(*data):
+    body = bytes(data)
+    return body + calculate_checksum(body)
+
+
+READ_REPLY = frame(0x01, 0x03, 0x02, 0x12, 0x34)
+WRITE_ECHO = frame(0x01, 0x06, 0x00, 0x10, 0x00, 0x64)
+
+
+def test_request_crc_matches_known_frame():
+    assert build_read_request(0x01, 0x0010, 1) == bytes.fromhex("010300100001 85CF".replace(" ", ""))
+
+
+def test_matching_reply_is_returned_whole():
+    decoder = MatchingFrameDecoder(0x01, 0x03)
+    assert decoder.feed(READ_REPLY[:3]) is None
+    assert decoder.feed(READ_REPLY[3:]) == READ_REPLY
+    assert decoder.matched and decoder.discarded == 0 and not decoder.crc_error
+
+
+def test_leftover_echo_is_dropped_and_reply_still_matched():
+    decoder = MatchingFrameDecoder(0x01, 0x03)
+    assert decoder.feed(WRITE_ECHO) is None
+    assert decoder.pending() == b""
+    assert decoder.discarded == len(WRITE_ECHO)
+    assert decoder.feed(READ_REPLY) == READ_REPLY
+    assert not decoder.crc_error
+
+
+def test_noise_and_other_slave_are_skipped():
+    decoder = MatchingFrameDecoder(0x01, 0x03)
+    other = frame(0x02, 0x03, 0x02, 0x00, 0x01)
+    assert decoder.feed(b"\xFF\x00" + other + READ_REPLY) == READ_REPLY
+    assert decoder.discarded == 2 + len(other)
+
+
+def test_exception_reply_matches_request_function():
+    decoder = MatchingFrameDecoder(0x01, 0x03)
+    exception = frame(0x01, 0x83, 0x02)
+    assert decoder.feed(exception) == exception
+
+
+def test_corrupted_reply_is_flagged_as_crc_error():
+    decoder = MatchingFrameDecoder(0x01, 0x03)
+    corrupted = bytearray(READ_REPLY)
+    corrupted[-1] ^= 0xFF
+    assert decoder.feed(bytes(corrupted)) is None
+    assert decoder.crc_error and not decoder.matched
+    assert decoder.feed(READ_REPLY) == READ_REPLY
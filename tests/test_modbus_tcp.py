@@ -0,0 +1,60 @@
+import socket
+import time
+import pytest
+import modbus_tcp
+from modbus_tcp import MBAP, SocketPort, ModbusTCPWorker, POOL, rtu_to_mbap, mbap_to_rtu
+from modbus_rtu import build_read_request
+
+REQUEST = build_read_request(0x01, 0x0010, 1)
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    server.settimeout(2)
+    yield server
+    server.close()
+
+
+def test_mbap_round_trip():
+    packet = rtu_to_mbap(7, REQUEST)
+    transaction_id, protocol, length, unit = MBAP.unpack_from(packet)
+    assert (transaction_id, protocol, length, unit) == (7, 0, 6, 0x01)
+    assert mbap_to_rtu(unit, packet[MBAP.size:]) == REQUEST
+
+
+def test_socket_port_reconnects_after_gateway_drops(listener, monkeypatch):
+    monkeypatch.setattr(modbus_tcp, "RECONNECT_INTERVAL", 0)
+    port = SocketPort(*listener.getsockname(), timeout=0.05)
+    try:
+        connection, _ = listener.accept()
+        connection.close()
+        assert port.read(1) == b""  # 断开后像没有应答的串口一样超时，不抛出异常
+        assert port.sock is None
+
+        assert port.write(REQUEST) == len(REQUEST)
+        connection, _ = listener.accept()
+        with connection:
+            assert connection.recv(64) == REQUEST
+            connection.sendall(b"\x01\x02")
+            assert port.read(2) == b"\x01\x02"
+    finally:
+        port.close()
+
+
+def test_invalid_mbap_length_drops_connection(listener):
+    worker = ModbusTCPWorker(POOL.acquire(*listener.getsockname()), 2.0)
+    connection, _ = listener.accept()
+    try:
+        future = worker.submit(REQUEST, 7)
+        transaction_id = MBAP.unpack_from(connection.recv(64))[0]
+        connection.sendall(MBAP.pack(transaction_id, 0, 0, 0x01) + b"\x03\x02\x00\x64")
+        begin = time.monotonic()
+        assert future.result(1) == b""
+        assert time.monotonic() - begin < 1.0  # 立即结束，不等 2 秒超时
+        assert worker.channel.sock is None
+    finally:
+        connection.close()
+        worker.stop()
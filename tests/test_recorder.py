@@ -0,0 +1,122 @@
+import threading
+import time
+from recorder import TelemetryRecorder, RECORD, SEGMENT_MAGIC
+
+SEGMENT_BYTES = len(SEGMENT_MAGIC) + 10 * 2 * RECORD.size  # 一次会话写入的分段大小
+
+
+def write_session(directory, start, **options):
+    """
+    用一个新的记录器写入 start..start+9 秒的两个序列；每次会话从新的分段开始
+    """
+    recorder = TelemetryRecorder(str(directory), flush_interval=0.01, **options)
+    for offset in range(10):
+        recorder.record("pump/01", "set_flow", offset, start + offset)
+        recorder.record("hotplate/01", "pv", 20 + offset, start + offset)
+    recorder.close()
+    return recorder
+
+
+def test_query_range_spans_segments(tmp_path):
+    for start in (100, 200, 300):
+        recorder = write_session(tmp_path, start)
+    assert [first for first, _ in recorder.segments()] == [100.0, 200.0, 300.0]
+
+    result = recorder.query("pump/01", "set_flow", start=105, end=202)
+    assert result == [(float(t), "set_flow", float(t % 100)) for t in (105, 106, 107, 108, 109, 200, 201, 202)]
+    assert [t for t, _, _ in recorder.query("hotplate/01", start=309)] == [309.0]
+    assert recorder.query("pump/01", end=99) == []
+    assert recorder.query("pump/02") == []
+
+
+def test_series_survive_restart(tmp_path):
+    write_session(tmp_path, 100)
+    recorder = TelemetryRecorder(str(tmp_path), flush_interval=0.01)
+    recorder.close()
+    assert len(recorder.query("hotplate/01", "pv")) == 10
+
+
+def test_retention_by_bytes_deletes_oldest_segments(tmp_path):
+    for start in (100, 200, 300, 400):
+        recorder = write_session(tmp_path, start, max_bytes=2 * SEGMENT_BYTES + 100)
+    # 第四次会话打开新分段时，前三段合计超出上限，只删除最旧的一段
+    assert [first for first, _ in recorder.segments()] == [200.0, 300.0, 400.0]
+    assert recorder.query("pump/01", end=250)[0][0] == 200.0
+
+
+def test_retention_by_age_keeps_segments_with_recent_records(tmp_path):
+    now = time.time()
+    for start in (now - 1000, now - 900, now):
+        recorder = write_session(tmp_path, start, max_age=500)
+    # 第二段的最后一条记录早于 500 秒之前，但下一段从现在开始，无法确定，保留
+    assert len(recorder.segments()) == 2
+    assert recorder.query("pump/01")[0][0] == now - 900
+
+
+def test_retention_never_deletes_current_segment(tmp_path):
+    recorder = write_session(tmp_path, 100, max_bytes=1)
+    recorder = write_session(tmp_path, 200, max_bytes=1)
+    assert [first for first, _ in recorder.segments()] == [200.0]
+    assert len(recorder.query("pump/01")) == 10
+
+
+def test_burst_larger_than_one_batch_is_fully_queryable(tmp_path):
+    # 超过 4096 条的积压在写入循环内分批落盘，新分段必须以该批第一条记录命名
+    recorder = TelemetryRecorder(str(tmp_path), flush_interval=0.01)
+    for index in range(5000):
+        recorder.record("pump/01", "set_flow", index, 1000.0 + index * 0.01)
+    recorder.close()
+    assert recorder.segments()[0][0] == 1000.0
+    assert len(recorder.query("pump/01", start=1000, end=1020)) == 2001
+    assert len(recorder.query("pump/01")) == 5000
+
+
+def test_out_of_order_timestamps_within_a_batch(tmp_path):
+    recorder = TelemetryRecorder(str(tmp_path), flush_interval=0.01)
+    for timestamp in (100.0, 100.5, 101.0, 100.2, 100.7, 101.2, 102.0):
+        recorder.record("pump/01", "set_flow", timestamp, timestamp)
+    recorder.close()
+    assert [t for t, _, _ in recorder.query("pump/01", start=100.6)] == [100.7, 101.0, 101.2, 102.0]
+    assert [t for t, _, _ in recorder.query("pump/01", end=100.3)] == [100.0, 100.2]
+
+
+def test_late_samples_from_another_producer_are_found(tmp_path):
+    # 第二条总线的采样在第一条总线的下一批之后才送达（如多进程采集时依次取出各环形缓冲区）
+    recorder = TelemetryRecorder(str(tmp_path), segment_size=RECORD.size * 50, flush_interval=0.01)
+    for index in range(100):
+        recorder.record("pump/01", "set_flow", index, 1000.0 + index * 0.1)
+    time.sleep(0.1)
+    for index in range(100):
+        recorder.record("pump2/01", "set_flow", index, 1000.05 + index * 0.1)
+    recorder.close()
+    assert len(recorder.segments()) >= 2  # 第二批的分段名早于第一批的大部分记录
+    for device in ("pump/01", "pump2/01"):
+        everything = recorder.query(device)
+        assert len(everything) == 100
+        assert recorder.query(device, start=1002.0, end=1005.0) == \
+            [item for item in everything if 1002.0 <= item[0] <= 1005.0]
+
+
+def test_interleaved_producer_threads(tmp_path):
+    recorder = TelemetryRecorder(str(tmp_path), segment_size=RECORD.size * 200, flush_interval=0.005)
+    start = time.time()
+
+    def produce(device):
+        for index in range(500):
+            recorder.record(device, "value", index)  # 时间戳在各自线程中生成
+            if index % 50 == 0:
+                time.sleep(0.002)
+
+    threads = [threading.Thread(target=produce, args=(f"pump/{n:02X}",)) for n in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorder.close()
+    for n in range(1, 5):
+        everything = recorder.query(f"pump/{n:02X}")
+        assert [v for _, _, v in everything] == [float(i) for i in range(500)]
+        middle = everything[250][0]
+        expected = [item for item in everything if item[0] >= middle]
+        assert recorder.query(f"pump/{n:02X}", start=middle) == expected
+    assert recorder.query("pump/01", end=start - 1) == []
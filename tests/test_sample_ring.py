@@ -0,0 +1,70 @@
+import multiprocessing
+import time
+import pytest
+from sample_ring import SampleRing
+
+PRODUCED = 20000
+
+
+@pytest.fixture
+def ring():
+    ring = SampleRing(capacity=4)
+    yield ring
+    ring.close(unlink=True)
+
+
+def test_drain_returns_samples_in_order(ring):
+    ring.record("pump/01", "set_flow", 1, 100.0)
+    ring.record("hotplate/01", "pv", 25.5, 101.0)
+    assert ring.drain() == [(100.0, "pump/01", "set_flow", 1.0), (101.0, "hotplate/01", "pv", 25.5)]
+    assert ring.drain() == []
+    assert ring.counters() == (2, 2, 0)
+
+
+def test_wraps_around_capacity(ring):
+    for round_ in range(3):
+        for index in range(3):
+            ring.record("pump/01", "set_flow", round_ * 3 + index, 0.0)
+        assert [value for _, _, _, value in ring.drain()] == [round_ * 3 + index for index in range(3)]
+    assert ring.counters() == (9, 9, 0)
+
+
+def test_full_ring_drops_new_samples(ring):
+    for index in range(6):
+        ring.record("pump/01", "set_flow", index, 0.0)
+    assert [value for _, _, _, value in ring.drain()] == [0, 1, 2, 3]
+    assert ring.counters() == (4, 4, 2)
+
+
+def produce(ring, count):
+    for index in range(count):
+        while ring.counters()[0] - ring.counters()[1] >= ring.capacity:
+            time.sleep(0)  # 等主进程取走，测试只验证顺序和完整性，不测丢弃
+        ring.record("pump/01", "set_flow", index, float(index))
+    ring.close()
+
+
+def test_samples_cross_process_without_gaps_or_duplicates():
+    ring = SampleRing(capacity=64)
+    try:
+        process = multiprocessing.get_context("spawn").Process(target=produce, args=(ring, PRODUCED))
+        process.start()
+        received = []
+        deadline = time.monotonic() + 30
+        while len(received) < PRODUCED and time.monotonic() < deadline:
+            received.extend(value for _, _, _, value in ring.drain())
+        process.join(5)
+        assert received == [float(index) for index in range(PRODUCED)]
+        assert ring.counters() == (PRODUCED, PRODUCED, 0)
+    finally:
+        ring.close(unlink=True)
+
+
+def test_names_longer_than_a_slot_are_rejected(ring):
+    ring.record("hotplate12/01", "温度设定值", 1, 0.0)  # 15 字节
+    with pytest.raises(ValueError):
+        ring.record("hotplate/01", "温度设定值上限", 1, 0.0)  # 21 字节，截断会落在多字节字符中间
+    with pytest.raises(ValueError):
+        ring.record("pump/" + "0" * 12, "set_flow", 1, 0.0)
+    assert ring.drain() == [(0.0, "hotplate12/01", "温度设定值", 1.0)]
+    assert ring.counters() == (1, 1, 0)
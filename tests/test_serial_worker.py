@@ -0,0 +1,36 @@
+from modbus_rtu import MatchingFrameDecoder, build_read_request, calculate_checksum
+from serial_worker import SerialIOWorker
+
+REQUEST = build_read_request(0x01, 0x0010, 1)
+REPLY = bytes([0x01, 0x03, 0x02, 0x00, 0x64]) + calculate_checksum(bytes([0x01, 0x03, 0x02, 0x00, 0x64]))
+LATE_ECHO = bytes([0x01, 0x06, 0x00, 0x10, 0x00, 0x64]) + calculate_checksum(bytes([0x01, 0x06, 0x00, 0x10, 0x00, 0x64]))
+
+
+def run(port, **options):
+    worker = SerialIOWorker(port, 0.2)
+    worker.start()
+    try:
+        decoder = MatchingFrameDecoder(0x01, 0x03)
+        return worker.submit(REQUEST, decoder=decoder, **options).result(2), decoder
+    finally:
+        worker.stop()
+        worker.join()
+
+
+def test_reply_after_leftover_frame_is_read_in_same_transaction(scripted_port):
+    # 残留的写回显被丢弃后缓冲区为空，不能按静默结束，要继续等 15 ms 后到达的应答
+    port = scripted_port(replies=[[(0.015, REPLY)]], leftover=LATE_ECHO)
+    response, decoder = run(port)
+    assert response == REPLY
+    assert decoder.matched and decoder.discarded == len(LATE_ECHO)
+
+
+def test_no_reply_times_out(scripted_port):
+    response, decoder = run(scripted_port(replies=[[]]), timeout=0.05)
+    assert response == b"" and not decoder.matched
+
+
+def test_flush_drops_leftover(scripted_port):
+    port = scripted_port(replies=[[(0.002, REPLY)]], leftover=LATE_ECHO)
+    response, decoder = run(port, flush=True)
+    assert response == REPLY and decoder.discarded == 0
@@ -0,0 +1,55 @@
+import json
+import os
+import pytest
+from settings_store import SettingsStore
+
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_changes_are_coalesced_and_written_on_close(tmp_path):
+    path = str(tmp_path / "settings.json")
+    store = SettingsStore(path, delay=60)
+    store.set("feed_position", 100)
+    store.set("feed_position", 200)
+    assert not os.path.exists(path)
+    store.close()
+    assert read(path) == {"feed_position": 200}
+    assert SettingsStore(path).get("feed_position") == 200
+
+
+def test_failed_write_keeps_changes_for_the_next_flush(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    store = SettingsStore(path, delay=60)
+    store.set("feed_position", 100)
+
+    def fail(source, target):
+        raise OSError("磁盘已满")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, "replace", fail)
+        with pytest.raises(OSError):
+            store.flush()
+    assert [name for name in os.listdir(tmp_path)] == []  # 临时文件已删除
+    store.close()
+    assert read(path) == {"feed_position": 100}
+
+
+def test_change_during_write_is_not_lost(tmp_path, monkeypatch):
+    path = str(tmp_path / "settings.json")
+    store = SettingsStore(path, delay=60)
+    store.set("feed_position", 100)
+    replace = os.replace
+
+    def replace_then_modify(source, target):
+        replace(source, target)
+        monkeypatch.setattr(os, "replace", replace)
+        store.set("feed_position", 300)  # 写盘期间的修改
+
+    monkeypatch.setattr(os, "replace", replace_then_modify)
+    store.flush()
+    assert read(path) == {"feed_position": 100}
+    store.close()
+    assert read(path) == {"feed_position": 300}
@@ -0,0 +1,85 @@
+import socket
+import threading
+import pytest
+import stream_protocol
+from stream_protocol import HEADER, ProtocolError, StreamClient, encode, read_message, parse_address
+
+
+class ChunkedSocket:
+    """
+    按给定的块大小逐次返回数据，模拟 TCP 把一帧拆成多次 recv
+    """
+    def __init__(self, data, chunk=1):
+        self.data = bytearray(data)
+        self.chunk = chunk
+
+    def recv(self, size):
+        part = bytes(self.data[:min(size, self.chunk)])
+        del self.data[:len(part)]
+        return part
+
+
+def test_round_trip_split_across_reads():
+    messages = [{"type": "samples", "samples": [[1.5, "pump/01", "set_flow", 2048.0]]},
+                {"type": "event", "event": "温度到达"}, {}]
+    sock = ChunkedSocket(b"".join(encode(message) for message in messages), chunk=3)
+    assert [read_message(sock) for _ in messages] == messages
+    assert read_message(sock) is None  # 在帧边界关闭
+
+
+def test_close_inside_frame_is_protocol_error():
+    frame = encode({"type": "reply", "id": 1, "ok": True})
+    with pytest.raises(ProtocolError):
+        read_message(ChunkedSocket(frame[:-1], chunk=64))
+    with pytest.raises(ProtocolError):
+        read_message(ChunkedSocket(frame[:2], chunk=64))
+
+
+def test_oversized_frame_is_rejected(monkeypatch):
+    monkeypatch.setattr(stream_protocol, "MAX_FRAME_SIZE", 16)
+    with pytest.raises(ProtocolError):
+        read_message(ChunkedSocket(HEADER.pack(17) + b"{}" * 9))
+
+
+def test_parse_address():
+    assert parse_address("tcp://127.0.0.1:5020") == (socket.AF_INET, ("127.0.0.1", 5020))
+    assert parse_address("tcp://:5020") == (socket.AF_INET, ("127.0.0.1", 5020))
+    assert parse_address("unix:///tmp/daq.sock") == (socket.AF_UNIX, "/tmp/daq.sock")
+    with pytest.raises(ValueError):
+        parse_address("udp://127.0.0.1:5020")
+
+
+def test_client_matches_replies_and_fails_pending_on_disconnect():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    received = []
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            first = read_message(conn)
+            second = read_message(conn)
+            # 乱序应答，并在两者之间推送样本
+            conn.sendall(encode({"type": "reply", "id": second["id"], "ok": False, "error": "未连接"}))
+            conn.sendall(encode({"type": "samples", "samples": [[1.0, "pump/01", "set_flow", 5.0]]}))
+            conn.sendall(encode({"type": "reply", "id": first["id"], "ok": True, "result": 42}))
+            read_message(conn)  # 第三条命令不应答，直接断开
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    host, port = server.getsockname()
+    client = StreamClient(f"tcp://{host}:{port}", on_samples=received.extend)
+    try:
+        status = client.command("status")
+        move = client.command("move", positions=[100])
+        assert status.result(2) == 42
+        with pytest.raises(RuntimeError, match="未连接"):
+            move.result(2)
+        assert received == [[1.0, "pump/01", "set_flow", 5.0]]
+        with pytest.raises(ConnectionError):
+            client.command("cancel").result(2)
+    finally:
+        thread.join(2)
+        client.close()
+        server.close()